@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+"""
+End-to-end benchmark suite: times loading (.csv / .npy), FFT/PSD, every filter, decimation and offscreen
+rendering on generated datasets, recording wall time and peak memory in a JSON history.
+
+Examples:
+    python benchmark_suite.py run --sizes 10000 100000 1000000 10000000 --label "before refactor"
+    python benchmark_suite.py compare                 # latest run vs. the one before
+    python benchmark_suite.py compare --baseline 0    # latest run vs. the first recorded run
+    python benchmark_suite.py compression --sizes 1000000 --files pozyx_ranging_runs/*.csv
+"""
+
+# Import Python-native modules
+import argparse
+import sys
+
+# Import custom modules
+from pozyx_helpers.benchmarks import (
+    BENCHMARKS,
+    DEFAULT_SIZES,
+    DEFAULT_DATA_DIR,
+    DEFAULT_HISTORY_FILE,
+    DEFAULT_REGRESSION_THRESHOLD,
+    run_benchmarks,
+    append_history,
+    load_history,
+    compare_runs,
+    benchmark_compression,
+    prepare_dataset,
+)
+from pozyx_helpers.supplemental_functions import nice_print
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pozyx benchmark suite")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_FILE, help="JSON history file")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Run the benchmarks and append them to the history")
+    run_parser.add_argument("--sizes", type=lambda text: int(float(text)), nargs="+", default=list(DEFAULT_SIZES),
+                            help="Dataset sizes in samples (10^4 to 10^8)")
+    run_parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=None,
+                            help="Benchmarks to run (defaults to all)")
+    run_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Directory of the generated datasets")
+    run_parser.add_argument("--repeats", type=int, default=3, help="Timed repeats (the best one is kept)")
+    run_parser.add_argument("--label", default=None, help="Label stored with the run")
+
+    compare_parser = subparsers.add_parser("compare", help="Compare two recorded runs and flag regressions")
+    compare_parser.add_argument("--baseline", type=int, default=-2, help="History index of the baseline run")
+    compare_parser.add_argument("--current", type=int, default=-1, help="History index of the compared run")
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                                help="Relative slowdown / memory growth counted as a regression")
+
+    compression_parser = subparsers.add_parser(
+        "compression", help="Compare compression ratio and throughput of gzip / zstd on run files"
+    )
+    compression_parser.add_argument("--files", nargs="+", default=[], help="Recorded run .csv files")
+    compression_parser.add_argument("--sizes", type=lambda text: int(float(text)), nargs="*", default=[10 ** 6],
+                                    help="Sizes of the generated runs in samples (none for recorded runs only)")
+    compression_parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="Directory of the generated datasets")
+    compression_parser.add_argument("--repeats", type=int, default=1, help="Timed repeats (the best one is kept)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        nice_print(f"Running {len(args.benchmarks or BENCHMARKS)} benchmarks on sizes {args.sizes}")
+        results = run_benchmarks(args.sizes, args.benchmarks, args.data_dir, args.repeats)
+        entry = append_history(results, args.history, args.label)
+        print(f"---> Recorded in '{args.history}' (commit {entry['commit']})")
+
+    elif args.command == "compare":
+        history = load_history(args.history)
+        if len(history) < 2:
+            sys.exit(f"Need at least two runs in '{args.history}' to compare")
+        try:
+            baseline, current = history[args.baseline], history[args.current]
+        except IndexError:
+            sys.exit(f"'{args.history}' only has {len(history)} runs")
+
+        nice_print(f"{current['timestamp']} ({current['commit']}) vs. {baseline['timestamp']} ({baseline['commit']})")
+        comparisons = compare_runs(baseline, current, args.threshold)
+        for comparison in comparisons:
+            flag = "REGRESSION" if comparison["regression"] else ""
+            print(f"{comparison['name']:>20} {comparison['size']:>11d} samples: "
+                  f"time x{comparison['wall_ratio']:6.2f} \t memory x{comparison['peak_ratio']:6.2f} \t {flag}")
+
+        num_regressions = sum(comparison["regression"] for comparison in comparisons)
+        print(f"Regressions: {num_regressions} of {len(comparisons)}")
+        sys.exit(1 if num_regressions else 0)
+
+    elif args.command == "compression":
+        filepaths = list(args.files) + [prepare_dataset(size, args.data_dir)["csv"] for size in args.sizes]
+        if not filepaths:
+            sys.exit("Nothing to benchmark, give --files or --sizes")
+        nice_print(f"Compression benchmark on {len(filepaths)} runs")
+        benchmark_compression(filepaths, output_dir=args.data_dir, repeats=args.repeats)
@@ -24,6 +24,12 @@ from pypozyx.tools.version_check import perform_latest_version_check
 # from pozyx_helpers.PozyxClasses import Pozyx1dCapture
 from pozyx_helpers.Pozyx1DCapture import Pozyx1DCapture, convertDataListsToCSV, convertErrorListsToCSV
 from pozyx_helpers.supplemental_functions import nice_print
+from pozyx_helpers.frequency_tracking import SlidingDftTracker
+from pozyx_helpers.kalman import KalmanFilter1D, DEFAULT_MEASUREMENT_VAR
+from pozyx_helpers.pipeline import FilterPipeline, HampelStage, IirStage, DecimateStage
+from pozyx_helpers.running_stats import save_run_stats
+from pozyx_helpers.metrics import serve_metrics
+from pozyx_helpers.error_bursts import ErrorBurstAggregator, convertErrorBurstsToCSV
 
 if __name__ == "__main__":
     # Check for the latest PyPozyx version.
@@ -63,15 +69,66 @@ if __name__ == "__main__":
     ranging_protocol = PozyxConstants.RANGE_PROTOCOL_PRECISION
     # ranging_protocol = PozyxConstants.RANGE_PROTOCOL_FAST
 
+    ###########################################
+    # Live dominant frequency tracking
+    # (nominal_sample_rate is the expected pulse rate of the protocol)
+    ###########################################
+    track_frequency = False
+    nominal_sample_rate = 62  # Hz
+    frequency_tracker = SlidingDftTracker(fs=nominal_sample_rate) if track_frequency else None
+
+    ###########################################
+    # Live Kalman filtering of the distances
+    # (measurement_var can be estimated from static runs with kalman.estimate_measurement_variance)
+    ###########################################
+    filter_distances = False
+    measurement_var = DEFAULT_MEASUREMENT_VAR  # mm^2
+    kalman_filter = KalmanFilter1D(measurement_var=measurement_var) if filter_distances else None
+
+    ###########################################
+    # Live filter pipeline (tune it offline with FilterPipeline.process() on a saved run first)
+    ###########################################
+    run_pipeline = False
+    filter_pipeline = None
+    if run_pipeline:
+        filter_pipeline = FilterPipeline(
+            [HampelStage(), IirStage("lowpass", 4, 5, nominal_sample_rate), DecimateStage(2)]
+        )
+
+    ###########################################
+    # Error-burst aggregation: runs of identical errors (e.g. the anchor out of range) are kept as
+    # (first, last, code, count) bursts instead of one row per pulse, and the error code is read less often
+    ###########################################
+    aggregate_errors = False
+    error_bursts = ErrorBurstAggregator() if aggregate_errors else None
+
+    ###########################################
+    # Compress the run files on the fly: None, "gzip" (.csv.gz) or "zstd" (.csv.zst, needs zstandard)
+    ###########################################
+    compression = None
+
     # Create a Pozyx1dCapture object
     pozyx1d = Pozyx1DCapture(
         pozyx=pozyx,
         destination_id=destination_id,
         protocol=ranging_protocol,
         remote_id=remote_id,
+        frequency_tracker=frequency_tracker,
+        kalman_filter=kalman_filter,
+        filter_pipeline=filter_pipeline,
+        error_bursts=error_bursts,
+        compression=compression,
     )
     pozyx1d.setup()
 
+    ###########################################
+    # Serve the capture health (pulses, errors per code, write latency, pulse rate) for scraping
+    # (e.g. curl http://127.0.0.1:9464/metrics), None to disable
+    ###########################################
+    metrics_port = None
+    if metrics_port is not None:
+        serve_metrics(pozyx1d, port=metrics_port)
+
     # Run the script for 10 seconds
     duration_s = 10
     start_time = time.time()
@@ -82,6 +139,8 @@ if __name__ == "__main__":
     nice_print(f"Ran for {duration_s} seconds using {pozyx1d.protocol_name} protocol.")
     print(f"---> Run file: {pozyx1d.datafile}")
     print(f"---> Error file: {pozyx1d.errorfile}")
+    if filter_pipeline is not None:
+        print(f"---> Pipeline file: {pozyx1d.pipelinefile}")
 
     # Compute the number of samples per second
     data_samples = pozyx1d.num_data_samples
@@ -108,5 +167,18 @@ if __name__ == "__main__":
     )
 
     # Convert the data and error lists to CSV files
-    convertDataListsToCSV(pozyx1d.timestamp_list, pozyx1d.data_list, pozyx1d.datafile)
-    convertErrorListsToCSV(pozyx1d.error_timestamp_list, pozyx1d.error_list, pozyx1d.errorfile)
+    convertDataListsToCSV(
+        pozyx1d.timestamp_list, pozyx1d.data_list, pozyx1d.datafile, pozyx1d.host_timestamp_list,
+        filtered_data_list=pozyx1d.filtered_data_list if pozyx1d.kalman_filter is not None else None,
+    )
+    if filter_pipeline is not None:
+        pozyx1d.flush_filter_pipeline()
+        convertDataListsToCSV(pozyx1d.pipeline_timestamp_list, pozyx1d.pipeline_data_list, pozyx1d.pipelinefile)
+    if error_bursts is not None:
+        error_bursts.close()
+        convertErrorBurstsToCSV(error_bursts.bursts, pozyx1d.errorfile)
+    else:
+        convertErrorListsToCSV(pozyx1d.error_timestamp_list, pozyx1d.error_list, pozyx1d.errorfile)
+
+    # Persist the distance statistics next to the run, so viewers don't have to recompute them
+    save_run_stats(pozyx1d.datafile, pozyx1d.stats, distributions=pozyx1d.distributions)
@@ -1,5 +1,5 @@
 import csv
-import math
+import numpy as np
 
 
 def sine_wave_values(frequency, duration):
@@ -8,30 +8,25 @@ def sine_wave_values(frequency, duration):
 
     :param frequency: Frequency of the sine wave (in Hz)
     :param duration: Duration for which sine wave values need to be generated (in seconds)
-    :return: List of (time, value) pairs
+    :return: (n, 2) array of (time, value) rows
     """
     sample_rate = 1000  # samples per second
-    values = []
 
-    for t in range(int(sample_rate * duration)):
-        time = t / sample_rate
-        value = math.sin(2 * math.pi * frequency * time)
-        values.append((time, value))
-
-    return values
+    times = np.arange(int(sample_rate * duration)) / sample_rate
+    return np.column_stack((times, np.sin(2 * np.pi * frequency * times)))
 
 
 def write_to_csv(data, filename="sine_wave.csv"):
     """
     Write data to a CSV file.
 
-    :param data: List of data to be written to the CSV
+    :param data: (n, 2) array of (time, value) rows
     :param filename: Name of the CSV file
     """
     with open(filename, "w", newline="") as csvfile:
         writer = csv.writer(csvfile)
         writer.writerow(["Time", "Value"])  # Header
-        writer.writerows(data)
+        writer.writerows(np.asarray(data).tolist())
 
 
 def main():
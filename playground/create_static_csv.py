@@ -1,18 +1,20 @@
 import csv
+import numpy as np
 
 
 def create_csv(frequency, constant_distance, number_of_secs=10, filename="output.csv"):
     timestep_interval = 1000 / frequency  # Convert frequency (Hz) to interval (ms)
     total_data_points = int(frequency * number_of_secs)  # how many seconds worth of data points
 
+    # Timesteps accumulated with one cumsum rather than a Python loop, adding the interval one step at a time
+    # like before, so the values match earlier files digit for digit (the first one is the integer 0)
+    # (for large static runs with noise etc. see generate_synthetic_run.py)
+    timesteps = [0] + np.cumsum(np.full(max(total_data_points - 1, 0), timestep_interval)).tolist()
+
     with open(filename, "w", newline="") as file:
         writer = csv.writer(file)
         writer.writerow(["Timesteps (ms)", "Distance (mm)"])
-
-        total_time = 0
-        for _ in range(total_data_points):
-            writer.writerow([total_time, constant_distance])
-            total_time += timestep_interval
+        writer.writerows((timestep, constant_distance) for timestep in timesteps[:total_data_points])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+"""
+Expands the error file of a capture that aggregated its errors into bursts (first and last timestamp, error code,
+message and count per run of identical errors) back into one row per failed ranging. The pulses of a burst are
+spread evenly between its first and last timestamp.
+
+The replay and timeline tools read burst files directly, this is for other tools that expect one row per error.
+
+Example:
+    python expand_error_bursts.py pozyx_error_runs/error_2024-03-01_12-00-00_PRECISION.csv
+"""
+
+# Import Python-native modules
+import argparse
+
+# Import custom modules
+from pozyx_helpers.error_bursts import expand_error_burst_file, is_error_burst_file
+from pozyx_helpers.supplemental_functions import nice_print
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Expand an error burst file to one row per failed ranging")
+    parser.add_argument("burstfile", help="Error .csv file written with error-burst aggregation")
+    parser.add_argument("--output", default=None, help="Output .csv file (defaults to <burst file>_expanded.csv)")
+    args = parser.parse_args()
+
+    if not is_error_burst_file(args.burstfile):
+        parser.error(f"'{args.burstfile}' isn't an error burst file")
+
+    output_file = expand_error_burst_file(args.burstfile, args.output)
+    nice_print(f"Expanded '{args.burstfile}'")
+    print(f"---> Error file: {output_file}")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+"""
+Generates large synthetic Pozyx runs (multi-tone motion, noise, multipath spikes, dropouts and timestamp jitter)
+for testing the viewers and filters at scale. Chunks are streamed straight to a .csv or binary .npy file.
+
+Example:
+    python generate_synthetic_run.py synthetic_run.npy --samples 100000000 --noise-std 8 --seed 3
+"""
+
+# Import Python-native modules
+import argparse
+
+# Import custom modules
+from pozyx_helpers.synthetic import SyntheticRunGenerator, write_synthetic_run, DEFAULT_TONES
+from pozyx_helpers.run_io import DEFAULT_CHUNK_SIZE
+from pozyx_helpers.supplemental_functions import nice_print
+
+
+def parse_tone(text):
+    """
+    Parses a "frequency:amplitude" tone (Hz:mm).
+    """
+    frequency, amplitude = text.split(":")
+    return float(frequency), float(amplitude)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic Pozyx run generator")
+    parser.add_argument("output", help="Output .csv or .npy file")
+    parser.add_argument("--samples", type=int, default=1_000_000, help="Number of recorded samples")
+    parser.add_argument("--sample-rate", type=float, default=62.0, help="Pulse rate (Hz)")
+    parser.add_argument("--base-distance", type=float, default=1800.0, help="Center distance (mm)")
+    parser.add_argument("--tone", type=parse_tone, action="append", default=None,
+                        help="Motion tone as frequency:amplitude (Hz:mm), repeatable")
+    parser.add_argument("--noise-std", type=float, default=5.0, help="Gaussian noise (mm)")
+    parser.add_argument("--spike-rate", type=float, default=0.002, help="Fraction of samples with a multipath spike")
+    parser.add_argument("--spike-scale", type=float, default=300.0, help="Mean spike size (mm)")
+    parser.add_argument("--dropout-rate", type=float, default=0.005, help="Probability of a dropout burst per sample")
+    parser.add_argument("--dropout-length", type=float, default=3.0, help="Mean failed pulses per burst")
+    parser.add_argument("--jitter-std", type=float, default=1.0, help="Timestamp jitter (ms)")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE, help="Samples generated at a time")
+    args = parser.parse_args()
+
+    generator = SyntheticRunGenerator(
+        sample_rate=args.sample_rate,
+        base_distance=args.base_distance,
+        tones=DEFAULT_TONES if args.tone is None else args.tone,
+        noise_std=args.noise_std,
+        spike_rate=args.spike_rate,
+        spike_scale=args.spike_scale,
+        dropout_rate=args.dropout_rate,
+        dropout_length=args.dropout_length,
+        jitter_std_ms=args.jitter_std,
+        seed=args.seed,
+    )
+    num_bytes, elapsed = write_synthetic_run(args.output, args.samples, generator, args.chunksize)
+
+    nice_print(f"Wrote {args.samples} samples to '{args.output}'")
+    print(f"Size: {num_bytes / 1e6:.1f} MB \t Time: {elapsed:.2f} s \t Throughput: {num_bytes / 1e6 / elapsed:.1f} MB/s")
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Runs a filter pipeline (outlier rejection -> low-pass IIR -> decimation) over a saved Pozyx run, once vectorized and
+once sample by sample as the capture loop would, and checks that both modes give the same output.
+
+Example:
+    python pipeline_demo.py pozyx_ranging_runs/data.csv --cutoff 5 --decimate 2
+"""
+
+# Import Python-native modules
+import argparse
+import time
+
+# Import custom modules
+from pozyx_helpers.pipeline import (
+    FilterPipeline,
+    HampelStage,
+    IirStage,
+    DecimateStage,
+    compare_batch_and_streaming,
+)
+from pozyx_helpers.resampling import estimate_sample_rate
+from pozyx_helpers.run_io import load_run
+from pozyx_helpers.supplemental_functions import nice_print
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch vs streaming filter pipeline check")
+    parser.add_argument("run", help="Run .csv file")
+    parser.add_argument("--window", type=int, default=7, help="Hampel window (samples, odd)")
+    parser.add_argument("--order", type=int, default=4, help="Low-pass filter order")
+    parser.add_argument("--cutoff", type=float, default=5.0, help="Low-pass cutoff (Hz)")
+    parser.add_argument("--decimate", type=int, default=2, help="Decimation factor")
+    args = parser.parse_args()
+
+    timesteps, distances = load_run(args.run)
+    fs = estimate_sample_rate(timesteps)
+    pipeline = FilterPipeline(
+        [HampelStage(args.window), IirStage("lowpass", args.order, args.cutoff, fs), DecimateStage(args.decimate)]
+    )
+
+    start_time = time.perf_counter()
+    max_value_diff, max_timestamp_diff = compare_batch_and_streaming(pipeline, timesteps, distances)
+    elapsed = time.perf_counter() - start_time
+
+    nice_print(f"{len(distances)} samples at {fs:.2f} Hz through {len(pipeline.stages)} stages ({elapsed:.2f} s)")
+    print(f"Max distance difference (mm): {max_value_diff:.3e}")
+    print(f"Max timestamp difference (ms): {max_timestamp_diff:.3e}")
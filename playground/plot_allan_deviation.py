@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+"""
+Computes the overlapping Allan deviation of static Pozyx captures, to separate white noise (slope -1/2)
+from bias instability and drift. Writes a log-log .png and a .csv table per run and prints the table.
+
+Example:
+    python plot_allan_deviation.py static_capture.csv --output-dir reports/ --chunksize 1000000
+"""
+
+# Import Python-native modules
+import argparse
+import os
+
+# Import custom modules
+from pozyx_helpers.allan_deviation import (
+    allan_deviation_of_run, format_allan_table, save_allan_plot, DEFAULT_TAUS_PER_DECADE
+)
+from pozyx_helpers.run_io import DEFAULT_CHUNK_SIZE
+from pozyx_helpers.supplemental_functions import nice_print
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Allan deviation of static Pozyx captures")
+    parser.add_argument("runs", nargs="+", help="Run .csv (or .npy) files")
+    parser.add_argument("--output-dir", default="reports/", help="Directory for the .png and .csv files")
+    parser.add_argument("--taus-per-decade", type=int, default=DEFAULT_TAUS_PER_DECADE,
+                        help="Number of log-spaced averaging times per decade")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_SIZE, help="Rows read at a time")
+    parser.add_argument("--max-cluster-size", type=int, default=None,
+                        help="Largest averaging window in samples (defaults to the chunk size)")
+    args = parser.parse_args()
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    for run in args.runs:
+        taus, deviations, counts = allan_deviation_of_run(
+            run, args.taus_per_decade, args.chunksize, args.max_cluster_size
+        )
+        png_filename, csv_filename = save_allan_plot(taus, deviations, run, args.output_dir)
+
+        nice_print(f"Allan deviation of '{run}'")
+        print(format_allan_table(taus, deviations, counts))
+        print(f"Saved '{png_filename}' and '{csv_filename}'")
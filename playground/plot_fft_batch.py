@@ -0,0 +1,14 @@
+# Import Python-native modules
+import sys
+from PyQt5.QtWidgets import QApplication
+
+# Import custom modules
+from pozyx_helpers.QtPlotFftBatch import QtPlotFftBatch
+
+if __name__ == "__main__":
+    """
+    Launch a Qt application that compares the FFT magnitudes of many runs (overlay and heat-map).
+    """
+    app = QApplication(sys.argv)
+    ex = QtPlotFftBatch()
+    sys.exit(app.exec_())
@@ -2,6 +2,7 @@
 import datetime
 import os
 import csv
+import time
 
 # Import Pozyx-specific modules
 from pypozyx import (
@@ -14,6 +15,12 @@ from pypozyx import (
 
 # Import custom modules
 from .supplemental_functions import nice_print
+from .running_stats import RunningStats
+from .quantile_sketch import RunDistributions
+from .timeline import unwrap_device_timestamps, TimestampUnwrapper
+from .profiling import profiled
+from .metrics import CaptureMetrics
+from .run_io import open_run_file, compression_extension
 
 
 class Pozyx1DCapture(object):
@@ -28,6 +35,11 @@ class Pozyx1DCapture(object):
                  remote_id=None,
                  data_dir='pozyx_ranging_runs/',
                  error_dir='pozyx_error_runs/',
+                 frequency_tracker=None,
+                 kalman_filter=None,
+                 filter_pipeline=None,
+                 error_bursts=None,
+                 compression=None,
     ):
 
         self.pozyx = pozyx      # Attach a PozyxSerial object to the Pozyx1DCapture object
@@ -41,18 +53,33 @@ class Pozyx1DCapture(object):
 
         self.data_dir = data_dir    # Directory to save data files
         self.error_dir = error_dir  # Directory to save error files
+        self.frequency_tracker = frequency_tracker  # Optional SlidingDftTracker for the live dominant frequency
+        self.kalman_filter = kalman_filter  # Optional KalmanFilter1D for live filtered distances
+        self.filter_pipeline = filter_pipeline  # Optional FilterPipeline run sample by sample
+        self.error_bursts = error_bursts  # Optional ErrorBurstAggregator, errors are then kept as bursts
 
         self.original_timestamp = 0
         self.run_timestamp = datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S') # Timestamp for file naming
 
-        self.datafile = self.data_dir + 'data_' + self.run_timestamp + self.protocol_name + '.csv'
-        self.errorfile = self.error_dir + 'error_' + self.run_timestamp + self.protocol_name + '.csv'
+        # compression ("gzip" or "zstd") writes .csv.gz / .csv.zst files
+        extension = '.csv' + compression_extension(compression)
+        self.datafile = self.data_dir + 'data_' + self.run_timestamp + self.protocol_name + extension
+        self.errorfile = self.error_dir + 'error_' + self.run_timestamp + self.protocol_name + extension
+        self.pipelinefile = self.data_dir + 'data_' + self.run_timestamp + self.protocol_name + '_pipeline' + extension
         self.num_data_samples = 0 # Used to track the number of data samples taken
         self.num_err_samples = 0 # Used to track the number of error samples taken
         self.num_pozyx_pulses = 0 # Used to track the number of Pozyx pulses (should align with data and error samples)
+        self.stats = RunningStats() # Distance count/mean/variance/min/max, updated per sample (see save_run_stats)
+        self.distributions = RunDistributions() # Distance and sample interval quantile sketches, updated per sample
+        self.timestamp_unwrapper = TimestampUnwrapper() # Device timestamps as written by convertDataListsToCSV
+        self.metrics = CaptureMetrics() # Error codes, write latency and pulse rate (see metrics.serve_metrics)
 
         self.timestamp_list = []
+        self.host_timestamp_list = []  # Host clock (ms since the epoch) of every sample, to align errors and drift
         self.data_list = []
+        self.filtered_data_list = []  # Kalman filtered distances (only with kalman_filter, see convertDataListsToCSV)
+        self.pipeline_timestamp_list = []  # Filter pipeline output (only with filter_pipeline, see flush_filter_pipeline)
+        self.pipeline_data_list = []
         self.error_timestamp_list = []
         self.error_list = []
 
@@ -88,7 +115,7 @@ class Pozyx1DCapture(object):
         # Check if datafile exists, otherwise create it and write the header
         if not os.path.exists(self.datafile):
             print(f"Creating file: '{self.datafile}'")
-            with open(self.datafile, 'w', newline='') as file:
+            with open_run_file(self.datafile, 'w') as file:
                 writer = csv.writer(file)
                 writer.writerow(['Timestamp (ms)', 'Distance (mm)'])
 
@@ -100,11 +127,12 @@ class Pozyx1DCapture(object):
         # Check if errorfile exists, otherwise create it and write the header
         if not os.path.exists(self.errorfile):
             print(f"Creating file: '{self.errorfile}'")
-            with open(self.errorfile, 'w', newline='') as file:
+            with open_run_file(self.errorfile, 'w') as file:
                 writer = csv.writer(file)
                 writer.writerow(['Timestamp (ms)', 'Error Message'])
 
 
+    @profiled
     def loop(self):
         """
         Performs continuous ranging and saves the data to a .csv file
@@ -115,15 +143,49 @@ class Pozyx1DCapture(object):
         status = self.pozyx.doRanging(self.destination_id, device_range, self.remote_id)
 
         if status == POZYX_SUCCESS:
+            if self.error_bursts is not None:
+                self.error_bursts.close()
+
             # If ranging was successful, save the data to a .csv file
             # self.write_data_to_csv(device_range)
             self.timestamp_list.append(device_range.timestamp)
+            self.host_timestamp_list.append(round(datetime.datetime.now().timestamp() * 1000))
             self.data_list.append(device_range.distance)
+            self.stats.update(device_range.distance)
+            # Unwrapped, so a counter wrap doesn't look like a step back in time to the sketches and filters
+            device_timestamp = self.timestamp_unwrapper.unwrap_sample(device_range.timestamp)
+            self.distributions.update(device_timestamp, device_range.distance)
             self.num_data_samples += 1
 
             print(f"-----------------------------------------------------------------------------------")
             print(f"Timestamp (ms): {device_range.timestamp} \t Distance (mm): {device_range.distance}")
 
+            # Update the live dominant frequency (O(1) per sample, no full FFT)
+            if self.frequency_tracker is not None:
+                self.frequency_tracker.update(device_range.distance)
+                dominant_freq, dominant_magnitude = self.frequency_tracker.dominant()
+                if dominant_freq is not None:
+                    print(f"Dominant Frequency (Hz): {dominant_freq:.2f} \t Magnitude: {dominant_magnitude:.2f}")
+
+            # Filter with the real interval since the last good sample (error pulses are never fed in)
+            if self.kalman_filter is not None:
+                filtered_distance = self.kalman_filter.update(device_timestamp, device_range.distance)
+                self.filtered_data_list.append(filtered_distance)
+                print(f"Filtered Distance (mm): {filtered_distance:.1f}")
+
+            # The pipeline may hold samples back (e.g. Hampel window) or drop them (decimation)
+            if self.filter_pipeline is not None:
+                for timestamp, distance in self.filter_pipeline.update(device_timestamp, device_range.distance):
+                    self.pipeline_timestamp_list.append(timestamp)
+                    self.pipeline_data_list.append(distance)
+                    print(f"Pipeline Timestamp (ms): {timestamp} \t Pipeline Distance (mm): {distance:.1f}")
+
+        elif self.error_bursts is not None and not self.error_bursts.needs_code():
+            # Still the same burst of errors, skip the error code round-trip
+            self.error_bursts.add_repeat(datetime.datetime.now())
+            self.num_err_samples += 1
+            self.metrics.record_error(self.error_bursts.code)
+
         else:
             # If ranging was unsuccessful, save the error to a .csv file
             error_code = SingleRegister()
@@ -131,9 +193,7 @@ class Pozyx1DCapture(object):
             if status == POZYX_SUCCESS:
                 error_msg = "ERROR Ranging, local %s" % self.pozyx.getErrorMessage(error_code)
                 # self.write_error_to_csv(error_msg)
-                self.error_timestamp_list.append(datetime.datetime.now())
-                self.error_list.append(error_msg)
-                self.num_err_samples += 1
+                self.record_error(error_msg, error_code.value)
 
                 print(f"-----------------------------------------------------------------------------------")
                 print(f"Timestamp (ms): {device_range.timestamp} \t Error Message: {error_msg}")
@@ -141,22 +201,58 @@ class Pozyx1DCapture(object):
             else:
                 error_msg = "ERROR Ranging, couldn't retrieve local error"
                 # self.write_error_to_csv(error_msg)
-                self.error_timestamp_list.append(datetime.datetime.now())
-                self.error_list.append(error_msg)
-                self.num_err_samples += 1
+                self.record_error(error_msg)
 
                 print(f"-----------------------------------------------------------------------------------")
                 print(f"Timestamp (ms): {device_range.timestamp} \t Error Message: {error_msg}")
 
         self.num_pozyx_pulses += 1
+        self.metrics.record_pulse()
+
+    def record_error(self, error_msg, error_code=None):
+        """
+        Keeps a failed ranging (as a row or in the current error burst)
+
+        :param error_code: Device error code, None when it couldn't be retrieved
+        """
+        timestamp = datetime.datetime.now()
+        if self.error_bursts is not None:
+            self.error_bursts.add_error(timestamp, error_code, error_msg)
+        else:
+            self.error_timestamp_list.append(timestamp)
+            self.error_list.append(error_msg)
+        self.num_err_samples += 1
+        self.metrics.record_error(error_code)
+
+    def flush_filter_pipeline(self):
+        """
+        Adds the samples the filter pipeline still holds back (e.g. the end of the Hampel window) to its output,
+        call at the end of the run before writing pipeline_timestamp_list / pipeline_data_list to pipelinefile
+        """
+        for timestamp, distance in self.filter_pipeline.flush():
+            self.pipeline_timestamp_list.append(timestamp)
+            self.pipeline_data_list.append(distance)
+
+    @property
+    def pending_writes(self):
+        """
+        Number of rows held in memory until convertDataListsToCSV() / convertErrorListsToCSV() (or
+        convertErrorBurstsToCSV()) at the end of the run
+        """
+        num_error_rows = len(self.error_list)
+        if self.error_bursts is not None:
+            num_error_rows += len(self.error_bursts.bursts) + self.error_bursts.in_burst
+        return len(self.timestamp_list) + len(self.pipeline_timestamp_list) + num_error_rows
 
     def write_data_to_csv(self, device_range):
         """
         Writes the data to a .csv file
         """
-        with open(self.datafile, 'a', newline='') as file:
+        start_time = time.perf_counter()
+        with open_run_file(self.datafile, 'a') as file:
             writer = csv.writer(file)
             writer.writerow([device_range.timestamp, device_range.distance])
+        self.metrics.record_write(time.perf_counter() - start_time)
 
         # Increment the number of data samples
         self.num_data_samples += 1
@@ -165,33 +261,55 @@ class Pozyx1DCapture(object):
         """
         Writes the error message to a .csv file
         """
-        with open(self.errorfile, 'a', newline='') as file:
+        start_time = time.perf_counter()
+        with open_run_file(self.errorfile, 'a') as file:
             writer = csv.writer(file)
             writer.writerow([datetime.datetime.now(), error_msg])
+        self.metrics.record_write(time.perf_counter() - start_time)
 
         # Increment the number of error samples
         self.num_err_samples += 1
 
 
-def convertDataListsToCSV(timestamp_list, data_list, filename='data.csv'):
+def convertDataListsToCSV(timestamp_list, data_list, filename='data.csv', host_timestamp_list=None,
+                          filtered_data_list=None):
     """
-    Converts the timestamp and data lists to a .csv file
+    Converts the timestamp and data lists to a .csv file (compressed when filename ends with .gz or .zst)
+
+    The device timestamps are unwrapped first, so a counter wrap doesn't send them backwards. Host timestamps
+    (ms since the epoch) are written as an extra column when given (see timeline.rebuild_run_timeline), and so
+    are the live Kalman filtered distances.
     """
     if len(timestamp_list) != len(data_list):
         print(f"Timestamp list length: {len(timestamp_list)}")
         print(f"Data list length: {len(data_list)}")
         raise ValueError("The timestamp and data lists must be the same length.")
+    if filtered_data_list is not None and len(filtered_data_list) != len(data_list):
+        raise ValueError("The filtered and data lists must be the same length.")
+
+    timestamp_list = unwrap_device_timestamps(timestamp_list).tolist()
 
     # Save the value of the first entry in the timestamp list
     first_timestamp = timestamp_list[0]
 
+    header = ['Timestamp (ms)', 'Distance (mm)', 'Timestamp Difference (ms)']
+    if host_timestamp_list is not None:
+        header.append('Host Timestamp (ms)')
+    if filtered_data_list is not None:
+        header.append('Filtered Distance (mm)')
+
     # Write the data to a .csv file (timestamp should be relative to the first timestamp)
-    with open(filename, 'w', newline='') as file:
+    with open_run_file(filename, 'w') as file:
         writer = csv.writer(file)
-        writer.writerow(['Timestamp (ms)', 'Distance (mm)', 'Timestamp Difference (ms)'])
+        writer.writerow(header)
         prior_timestamp = first_timestamp
         for i in range(len(timestamp_list)):
-            writer.writerow([timestamp_list[i] - first_timestamp, data_list[i], timestamp_list[i] - prior_timestamp])
+            row = [timestamp_list[i] - first_timestamp, data_list[i], timestamp_list[i] - prior_timestamp]
+            if host_timestamp_list is not None:
+                row.append(host_timestamp_list[i])
+            if filtered_data_list is not None:
+                row.append(filtered_data_list[i])
+            writer.writerow(row)
             prior_timestamp = timestamp_list[i]
 
 def convertErrorListsToCSV(error_timestamp_list, error_list, filename='error.csv'):
@@ -204,7 +322,7 @@ def convertErrorListsToCSV(error_timestamp_list, error_list, filename='error.csv
         raise ValueError("The timestamp and data lists must be the same length.")
 
     # Write the errors to a .csv file
-    with open(filename, 'w', newline='') as file:
+    with open_run_file(filename, 'w') as file:
         writer = csv.writer(file)
         writer.writerow(['Timestamp (ms)', 'Error Message'])
         for i in range(len(error_timestamp_list)):
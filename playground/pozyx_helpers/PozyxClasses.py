@@ -2,6 +2,8 @@
 import datetime
 import os
 import csv
+import time
+import contextlib
 
 # Import Pozyx-specific modules
 from pypozyx import (
@@ -14,6 +16,13 @@ from pypozyx import (
 
 # Import custom modules
 from .supplemental_functions import nice_print
+from .running_stats import RunningStats
+from .quantile_sketch import RunDistributions
+from .timeline import TimestampUnwrapper
+from .profiling import profiled
+from .metrics import CaptureMetrics
+from .error_bursts import ERROR_BURST_HEADER, error_burst_row
+from .run_io import open_run_file, run_compression, compression_extension
 
 
 class Pozyx1dCapture(object):
@@ -29,6 +38,11 @@ class Pozyx1dCapture(object):
         remote_id=None,
         data_dir="pozyx_ranging_runs/",
         error_dir="pozyx_error_runs/",
+        frequency_tracker=None,
+        kalman_filter=None,
+        filter_pipeline=None,
+        error_bursts=None,
+        compression=None,
     ):
         self.pozyx = pozyx
         self.destination_id = destination_id
@@ -43,16 +57,29 @@ class Pozyx1dCapture(object):
 
         self.data_dir = data_dir
         self.error_dir = error_dir
+        self.frequency_tracker = frequency_tracker  # Optional SlidingDftTracker
+        self.kalman_filter = kalman_filter  # Optional KalmanFilter1D, its output is an extra data file column
+        self.filter_pipeline = filter_pipeline  # Optional FilterPipeline, its output is written to pipelinefile
+        self.error_bursts = error_bursts  # Optional ErrorBurstAggregator, errors are then written as bursts
+        self.stats = RunningStats()  # Distance statistics, updated per sample (see save_run_stats)
+        self.distributions = RunDistributions()  # Distance and sample interval quantile sketches
+        self.metrics = CaptureMetrics()  # Error codes, write latency and pulse rate (see metrics.serve_metrics)
+        self.timestamp_unwrapper = TimestampUnwrapper()  # Device timestamps fed to the live filters
         self.timestamp_difference = 0
         self.original_timestamp = datetime.datetime.now()
         self.old_timestamp = self.original_timestamp
         self.run_timestamp = self.original_timestamp.strftime("%Y-%m-%d_%H-%M-%S")
+        extension = ".csv" + compression_extension(compression)  # "gzip" or "zstd" writes .csv.gz / .csv.zst
         self.datafile = (
-            self.data_dir + "data_" + self.run_timestamp + self.protocol_name + ".csv"
+            self.data_dir + "data_" + self.run_timestamp + self.protocol_name + extension
         )
         self.errorfile = (
-            self.error_dir + "error_" + self.run_timestamp + self.protocol_name + ".csv"
+            self.error_dir + "error_" + self.run_timestamp + self.protocol_name + extension
         )
+        self.pipelinefile = (
+            self.data_dir + "data_" + self.run_timestamp + self.protocol_name + "_pipeline" + extension
+        )
+        self.open_files = {}  # Compressed files stay open between rows, see close()
         self.num_data_samples = 0  # Used to track the number of data samples taken
         self.num_err_samples = 0  # Used to track the number of error samples taken
         self.num_pozyx_pulses = 0
@@ -74,6 +101,7 @@ class Pozyx1dCapture(object):
 
         self.pozyx.setRangingProtocol(self.protocol, self.remote_id)
 
+    @profiled
     def loop(self):
         """
         Performs ranging and saves the data to a .csv file.
@@ -83,6 +111,9 @@ class Pozyx1dCapture(object):
         status = self.pozyx.doRanging(self.destination_id, device_range, self.remote_id)
 
         if status == POZYX_SUCCESS:
+            if self.error_bursts is not None:
+                self.flush_error_bursts()
+
             # Get the current timestamp
             current_timestamp = datetime.datetime.now()
 
@@ -103,7 +134,42 @@ class Pozyx1dCapture(object):
                 + f"Timestamp (ms): {current_timestamp} \t Timestamp difference (ms): {self.timestamp_difference:.4f}\t"
                 + f"Pozyx Timestamp: {device_range.timestamp}"
             )
-            self.write_timestep_distance_to_csv(self.datafile, device_range.distance, device_range.timestamp)
+            # Unwrapped, so a counter wrap doesn't look like a step back in time to the filters
+            device_timestamp = self.timestamp_unwrapper.unwrap_sample(device_range.timestamp)
+
+            # Filter with the real interval since the last good sample (error pulses are never fed in)
+            filtered_distance = None
+            if self.kalman_filter is not None:
+                filtered_distance = self.kalman_filter.update(device_timestamp, device_range.distance)
+                print(f"Filtered Distance (mm): {filtered_distance:.1f}")
+
+            self.write_timestep_distance_to_csv(
+                self.datafile, device_range.distance, device_range.timestamp, filtered_distance
+            )
+            self.stats.update(device_range.distance)
+            # Intervals on the host clock, the "Timestep (ms)" column the file readers sketch
+            self.distributions.update(self.absolute_timestamp, device_range.distance)
+
+            # Update the live dominant frequency (O(1) per sample, no full FFT)
+            if self.frequency_tracker is not None:
+                self.frequency_tracker.update(device_range.distance)
+                dominant_freq, dominant_magnitude = self.frequency_tracker.dominant()
+                if dominant_freq is not None:
+                    print(f"Dominant Frequency (Hz): {dominant_freq:.2f} \t Magnitude: {dominant_magnitude:.2f}")
+
+            # The pipeline may hold samples back (e.g. Hampel window) or drop them (decimation)
+            if self.filter_pipeline is not None:
+                samples = self.filter_pipeline.update(device_timestamp, device_range.distance)
+                for timestamp, distance in samples:
+                    print(f"Pipeline Timestamp (ms): {timestamp} \t Pipeline Distance (mm): {distance:.1f}")
+                self.write_pipeline_samples_to_csv(self.pipelinefile, samples)
+        elif self.error_bursts is not None and not self.error_bursts.needs_code():
+            # Still the same burst of errors, skip the error code round-trip
+            self.error_bursts.add_repeat(
+                self.get_timestamp_difference_ms(self.original_timestamp, datetime.datetime.now())
+            )
+            self.num_err_samples += 1
+            self.metrics.record_error(self.error_bursts.code)
         else:
             error_code = SingleRegister()
             status = self.pozyx.getErrorCode(error_code)
@@ -116,16 +182,77 @@ class Pozyx1dCapture(object):
                 nice_print(error_msg)
                 print("")
 
-                self.write_error_msg_to_csv(self.errorfile, error_msg)
+                self.record_error(error_msg, error_code.value)
             else:
                 error_msg = "ERROR Ranging, couldn't retrieve local error"
                 print("")
                 nice_print(error_msg)
                 print("")
 
-                self.write_error_msg_to_csv(self.errorfile, error_msg)
+                self.record_error(error_msg)
 
         self.num_pozyx_pulses += 1
+        self.metrics.record_pulse()
+
+    def record_error(self, error_msg, error_code=None):
+        """
+        Writes a failed ranging (as a row, or to the current error burst).
+
+        :param error_code: Device error code, None when it couldn't be retrieved
+        """
+        self.metrics.record_error(error_code)
+        if self.error_bursts is None:
+            self.write_error_msg_to_csv(self.errorfile, error_msg)
+            return
+
+        timestamp = self.get_timestamp_difference_ms(self.original_timestamp, datetime.datetime.now())
+        closed_burst = self.error_bursts.add_error(timestamp, error_code, error_msg)
+        if closed_burst is not None:
+            self.write_error_burst_to_csv(self.errorfile, closed_burst)
+        self.num_err_samples += 1
+
+    def flush_error_bursts(self):
+        """
+        Writes the open error burst, call at the end of the run when errors are aggregated.
+        """
+        closed_burst = self.error_bursts.close()
+        if closed_burst is not None:
+            self.write_error_burst_to_csv(self.errorfile, closed_burst)
+
+    def flush_filter_pipeline(self):
+        """
+        Writes the samples the filter pipeline still holds back (e.g. the end of the Hampel window), call at
+        the end of the run when a filter_pipeline is given.
+        """
+        self.write_pipeline_samples_to_csv(self.pipelinefile, self.filter_pipeline.flush())
+
+    def open_csv(self, filename):
+        """
+        Opens a .csv file to append a row to.
+
+        Plain files are opened for every row, so each row is on disk right away. Compressed files are opened
+        once and stay open until close(), a compressed stream per row would be larger than the plain file.
+        """
+        if run_compression(filename) is None:
+            return open(filename, "a", newline="")
+        if filename not in self.open_files:
+            self.open_files[filename] = open_run_file(filename, "a")
+        return contextlib.nullcontext(self.open_files[filename])
+
+    def close(self):
+        """
+        Flushes and closes the compressed data and error files, call at the end of the run.
+        """
+        for file in self.open_files.values():
+            file.close()
+        self.open_files = {}
+
+    @property
+    def pending_writes(self):
+        """
+        Rows are written as they are captured, only the open error burst is held back.
+        """
+        return int(self.error_bursts is not None and self.error_bursts.in_burst)
 
     def get_timestamp_difference_ms(self, timestamp1, timestamp2):
         """
@@ -133,54 +260,77 @@ class Pozyx1dCapture(object):
         """
         return (timestamp2 - timestamp1).total_seconds() * 1000
 
-    def write_timestep_distance_to_csv(self, filename, distance, timestamp):
+    def write_timestep_distance_to_csv(self, filename, distance, timestamp, filtered_distance=None):
         """
         Appends data to a .csv file.
+
+        :param filtered_distance: Live Kalman filtered distance (its column is only written with a kalman_filter)
         """
+        start_time = time.perf_counter()
 
         # Check if self.data_dir exists, otherwise create it
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
 
-        file_exists = True
-        try:
-            with open(filename, "r"):
-                pass
-        except FileNotFoundError:
-            file_exists = False
+        file_exists = os.path.exists(filename)
 
         # Write data to csv file
-        with open(filename, "a", newline="") as csvfile:
+        with self.open_csv(filename) as csvfile:
             fieldnames = ["Timestep (ms)", "Distance (mm)", "Pozyx Timestamp (ms)"]
+            if self.kalman_filter is not None:
+                fieldnames.append("Filtered Distance (mm)")
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
             # Write the header if the file is newly created
             if not file_exists:
                 writer.writeheader()
 
-            writer.writerow(
-                {"Timestep (ms)": self.absolute_timestamp, "Distance (mm)": distance, "Pozyx Timestamp (ms)": timestamp}
-            )
+            row = {"Timestep (ms)": self.absolute_timestamp, "Distance (mm)": distance, "Pozyx Timestamp (ms)": timestamp}
+            if self.kalman_filter is not None:
+                row["Filtered Distance (mm)"] = filtered_distance
+            writer.writerow(row)
             self.num_data_samples += 1
+        self.metrics.record_write(time.perf_counter() - start_time)
+
+    def write_pipeline_samples_to_csv(self, filename, samples):
+        """
+        Appends the (timestamp, distance) samples put out by the filter pipeline to a .csv file.
+        """
+        if not samples:
+            return
+        start_time = time.perf_counter()
+
+        # Check if self.data_dir exists, otherwise create it
+        if not os.path.exists(self.data_dir):
+            os.makedirs(self.data_dir)
+
+        file_exists = os.path.exists(filename)
+
+        # Write the samples to csv file
+        with self.open_csv(filename) as csvfile:
+            writer = csv.writer(csvfile)
+
+            # Write the header if the file is newly created
+            if not file_exists:
+                writer.writerow(["Pozyx Timestamp (ms)", "Distance (mm)"])
+
+            writer.writerows(samples)
+        self.metrics.record_write(time.perf_counter() - start_time)
 
     def write_error_msg_to_csv(self, filename, error_msg):
         """
         Appends error message to a .csv file.
         """
+        start_time = time.perf_counter()
 
         # Check if self.error_dir exists, otherwise create it
         if not os.path.exists(self.error_dir):
             os.makedirs(self.error_dir)
 
-        file_exists = True
-        try:
-            with open(filename, "r"):
-                pass
-        except FileNotFoundError:
-            file_exists = False
+        file_exists = os.path.exists(filename)
 
         # Write error_msg to csv file
-        with open(filename, "a", newline="") as csvfile:
+        with self.open_csv(filename) as csvfile:
             fieldnames = ["Timestep (ms)", "Error Message"]
             writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
 
@@ -189,6 +339,34 @@ class Pozyx1dCapture(object):
                 writer.writeheader()
 
             writer.writerow(
-                {"Timestep (ms)": self.absolute_timestamp, "Error Message": error_msg}
+                {
+                    # Time of the failed ranging, not of the last sample (absolute_timestamp)
+                    "Timestep (ms)": self.get_timestamp_difference_ms(self.original_timestamp, datetime.datetime.now()),
+                    "Error Message": error_msg,
+                }
             )
             self.num_err_samples += 1
+        self.metrics.record_write(time.perf_counter() - start_time)
+
+    def write_error_burst_to_csv(self, filename, burst):
+        """
+        Appends an error burst to a .csv file.
+        """
+        start_time = time.perf_counter()
+
+        # Check if self.error_dir exists, otherwise create it
+        if not os.path.exists(self.error_dir):
+            os.makedirs(self.error_dir)
+
+        file_exists = os.path.exists(filename)
+
+        # Write the burst to csv file
+        with self.open_csv(filename) as csvfile:
+            writer = csv.writer(csvfile)
+
+            # Write the header if the file is newly created
+            if not file_exists:
+                writer.writerow(ERROR_BURST_HEADER)
+
+            writer.writerow(error_burst_row(burst))
+        self.metrics.record_write(time.perf_counter() - start_time)
@@ -23,8 +23,16 @@ from PyQt5.QtWidgets import (
     QGridLayout,
     QSizePolicy,
     QTabWidget,
+    QComboBox,
+    QSpinBox,
+    QDoubleSpinBox,
 )
 
+# Import custom modules
+from .plot_backends import create_plot_pane
+from .filters import FILTER_TYPES, filter_run
+from .profiling import profiled
+
 
 def plot_csv_data(csv_file):
     """
@@ -107,6 +115,7 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
         if filename:
             self.plotCsvFile(filename)
 
+    @profiled
     def plotCsvFile(self, filename):
         """
         Plots the data from a .csv file.
@@ -119,12 +128,15 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
 
 
 class QtChooseDoubleWindow(QtWidgets.QWidget):
-    def __init__(self):
+    def __init__(self, plot_backend=None):
         """
         A Qt window that plots data from two .csv files (prefereably unfiltered and filtered data).
         """
         super().__init__()
 
+        # "matplotlib" or "pyqtgraph" (defaults to the POZYX_PLOT_BACKEND environment variable)
+        self.plot_backend = plot_backend
+
         # Set fixed button width and height
         self.button_width = 150
         self.button_height = 40
@@ -132,6 +144,15 @@ class QtChooseDoubleWindow(QtWidgets.QWidget):
         # Initialize the plot index dictionary (used for naming subplots)
         self.plot_index_dict = {0: "Unfiltered", 1: "Filtered"}
 
+        # Unfiltered (timesteps, distances, column names) from CSV file 1, fed through the filter
+        self.unfiltered_data = None
+
+        # (timesteps, distances, column names) from CSV file 2, shown in the right pane instead of the filter output
+        self.second_data = None
+
+        # What the right pane shows (the filter controls only apply to the first mode)
+        self.right_pane_modes = ["Filtered from CSV 1", "CSV File 2"]
+
         # Initialize the UI
         self.initUI()
 
@@ -139,8 +160,8 @@ class QtChooseDoubleWindow(QtWidgets.QWidget):
         """
         Initializes the UI of the Qt window.
         """
-        self.figure, self.ax = plt.subplots(1, 2, figsize=(10, 5))
-        self.canvas = FigureCanvas(self.figure)
+        # One plot pane per data set (unfiltered on the left, filtered on the right)
+        self.panes = [create_plot_pane(self.plot_backend) for _ in self.plot_index_dict]
 
         # Create two buttons to select .csv files
 
@@ -149,7 +170,7 @@ class QtChooseDoubleWindow(QtWidgets.QWidget):
         self.button1.clicked.connect(lambda: self.loadCsvFile(0))
         self.button1.setFixedSize(self.button_width, self.button_height)
 
-        # Second csv file
+        # Second csv file (switches the right pane to showing it)
         self.button2 = QtWidgets.QPushButton("Select CSV File 2")
         self.button2.clicked.connect(lambda: self.loadCsvFile(1))
         self.button2.setFixedSize(self.button_width, self.button_height)
@@ -167,21 +188,79 @@ class QtChooseDoubleWindow(QtWidgets.QWidget):
         button_layout.addWidget(self.button1)
         button_layout.addWidget(self.button2)
 
-        # Layout our window widgets: title, buttons, and plot
+        # Layout our window widgets: title, buttons, filter controls and plot
         layout = QtWidgets.QVBoxLayout()
         layout.addWidget(title_label)
         layout.addLayout(button_layout)
-        layout.addWidget(self.canvas)
+        layout.addLayout(self.createFilterControls())
+        plot_layout = QtWidgets.QHBoxLayout()
+        for pane in self.panes:
+            plot_layout.addWidget(pane.widget)
+        layout.addLayout(plot_layout)
 
         # Stretch factors for the layout during resizing
         layout.setStretch(0, 1)  # Title stretch factor
         layout.setStretch(1, 1)  # Button layout stretch factor
-        layout.setStretch(2, 8)  # Plot stretch factor
+        layout.setStretch(2, 1)  # Filter controls stretch factor
+        layout.setStretch(3, 8)  # Plot stretch factor
 
         # Set the layout and title of the window
         self.setLayout(layout)
         self.setWindowTitle("Pozyx Unfiltered/Filtered 1-D Data")
 
+    def createFilterControls(self):
+        """
+        Creates the right pane mode and filter controls, every filter edit re-filters CSV file 1 into the right
+        pane while it is in the "Filtered from CSV 1" mode.
+        """
+        filter_layout = QtWidgets.QHBoxLayout()
+        filter_layout.addStretch(1)
+
+        self.rightPaneModeComboBox = QComboBox()
+        self.rightPaneModeComboBox.addItems(self.right_pane_modes)
+        self.rightPaneModeComboBox.currentTextChanged.connect(self.updateRightPane)
+        filter_layout.addWidget(self.rightPaneModeComboBox)
+
+        self.filterTypeComboBox = QComboBox()
+        self.filterTypeComboBox.addItems(FILTER_TYPES)
+        self.filterTypeComboBox.currentTextChanged.connect(self.filterData)
+        filter_layout.addWidget(self.filterTypeComboBox)
+
+        filter_layout.addWidget(QLabel("Order:"))
+        self.filterOrderSpinBox = QSpinBox()
+        self.filterOrderSpinBox.setRange(1, 12)
+        self.filterOrderSpinBox.setValue(4)
+        self.filterOrderSpinBox.valueChanged.connect(self.filterData)
+        filter_layout.addWidget(self.filterOrderSpinBox)
+
+        # Low/high-pass filters only use the first cutoff
+        filter_layout.addWidget(QLabel("Cutoff / Low (Hz):"))
+        self.cutoffLowSpinBox = QDoubleSpinBox()
+        self.cutoffLowSpinBox.setDecimals(3)
+        self.cutoffLowSpinBox.setRange(0.001, 1e6)
+        self.cutoffLowSpinBox.setValue(5)
+        self.cutoffLowSpinBox.valueChanged.connect(self.filterData)
+        filter_layout.addWidget(self.cutoffLowSpinBox)
+
+        filter_layout.addWidget(QLabel("High (Hz):"))
+        self.cutoffHighSpinBox = QDoubleSpinBox()
+        self.cutoffHighSpinBox.setDecimals(3)
+        self.cutoffHighSpinBox.setRange(0.001, 1e6)
+        self.cutoffHighSpinBox.setValue(10)
+        self.cutoffHighSpinBox.valueChanged.connect(self.filterData)
+        filter_layout.addWidget(self.cutoffHighSpinBox)
+
+        # Label to display filter errors (e.g. a cutoff above the Nyquist rate)
+        self.filterStatusLabel = QLabel("")
+        filter_layout.addWidget(self.filterStatusLabel)
+
+        self.filter_controls = [
+            self.filterTypeComboBox, self.filterOrderSpinBox, self.cutoffLowSpinBox, self.cutoffHighSpinBox
+        ]
+
+        filter_layout.addStretch(1)
+        return filter_layout
+
     def loadCsvFile(self, plot_index):
         """
         Opens a file dialog to select a .csv file.
@@ -200,14 +279,82 @@ class QtChooseDoubleWindow(QtWidgets.QWidget):
         Plots the data from a .csv file.
         """
 
-        # Read the .csv file and plot the data
+        # Read the .csv file
         df = pd.read_csv(filename)
-        self.ax[plot_index].clear()
-        self.ax[plot_index].plot(df[df.columns[0]], df[df.columns[1]])
-        self.ax[plot_index].set_title(
-            f"1-D Pozyx {self.plot_index_dict[plot_index]} Data"
+        timesteps = df[df.columns[0]].to_numpy(dtype=np.float64)
+        distances = df[df.columns[1]].to_numpy(dtype=np.float64)
+
+        data = (timesteps, distances, df.columns[0], df.columns[1])
+        if plot_index == 0:
+            # CSV file 1 also feeds the filtered plot
+            self.unfiltered_data = data
+            self.plotSeries(0, *data)
+            self.filterData()
+        else:
+            self.second_data = data
+            if self.rightPaneModeComboBox.currentText() == "CSV File 2":
+                self.updateRightPane()
+            else:
+                self.rightPaneModeComboBox.setCurrentText("CSV File 2")  # Re-plots through updateRightPane()
+
+    def plotSeries(self, plot_index, timesteps, distances, xlabel, ylabel, title=None):
+        """
+        Plots one series in the unfiltered (0) or filtered (1) pane.
+
+        :param title: Pane title (defaults to the pane's name in plot_index_dict)
+        """
+        if title is None:
+            title = f"1-D Pozyx {self.plot_index_dict[plot_index]} Data"
+        pane = self.panes[plot_index]
+        pane.clear()
+        pane.plot(timesteps, distances)
+        pane.set_labels(title, xlabel, ylabel)
+        pane.draw()
+
+    def updateRightPane(self):
+        """
+        Shows the filtered CSV file 1 or the loaded CSV file 2 in the right pane, depending on its mode.
+        """
+        filtering = self.rightPaneModeComboBox.currentText() == "Filtered from CSV 1"
+        for control in self.filter_controls:
+            control.setEnabled(filtering)
+
+        if filtering:
+            self.filterData()
+            return
+
+        self.filterStatusLabel.setText("")
+        if self.second_data is None:
+            self.panes[1].clear()
+            self.panes[1].draw()
+        else:
+            self.plotSeries(1, *self.second_data, title="1-D Pozyx Data (CSV File 2)")
+
+    def filterData(self):
+        """
+        Zero-phase filters the data from CSV file 1 and plots it in the right pane, unless that shows CSV file 2.
+        """
+        if self.unfiltered_data is None or self.rightPaneModeComboBox.currentText() != "Filtered from CSV 1":
+            return
+
+        timesteps, distances, xlabel, ylabel = self.unfiltered_data
+        filter_type = self.filterTypeComboBox.currentText()
+        cutoff = self.cutoffLowSpinBox.value()
+        if filter_type in ("bandpass", "notch"):
+            cutoff = (cutoff, self.cutoffHighSpinBox.value())
+
+        try:
+            filtered_timesteps, filtered_distances = filter_run(
+                timesteps, distances, filter_type, self.filterOrderSpinBox.value(), cutoff
+            )
+        except ValueError as e:
+            self.filterStatusLabel.setText(str(e))
+            return
+
+        self.filterStatusLabel.setText("")
+        self.plotSeries(
+            1, filtered_timesteps, filtered_distances, xlabel, ylabel, "1-D Pozyx Data (Filtered from CSV 1)"
         )
-        self.canvas.draw()
 
 
 class QtPlotFftMagnitudePhase(QMainWindow):
@@ -301,6 +448,7 @@ class QtPlotFftMagnitudePhase(QMainWindow):
             self.filenameLabel.setText(filename)  # Set the filename label
             self.plotFFT(filepath)
 
+    @profiled
     def plotFFT(self, filePath):
         # Load the data from the CSV file
         data = np.genfromtxt(filePath, delimiter=",", skip_header=1)
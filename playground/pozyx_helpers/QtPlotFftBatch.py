@@ -0,0 +1,150 @@
+# Import Python-native modules
+import time
+import numpy as np
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QFont
+from PyQt5.QtWidgets import (
+    QMainWindow,
+    QFileDialog,
+    QVBoxLayout,
+    QPushButton,
+    QWidget,
+    QLabel,
+    QHBoxLayout,
+    QComboBox,
+)
+
+# Import custom modules
+from .plot_backends import create_plot_pane
+from .spectral_analysis import load_batch_spectra, BATCH_LENGTH_MODES
+
+# Only label (and add to the legend) individual runs up to this many runs
+MAX_LABELLED_RUNS = 10
+
+
+class QtPlotFftBatch(QMainWindow):
+    """
+    A Qt window that compares the FFT magnitude (w/o DC offset) of many runs at once.
+    """
+
+    def __init__(self, plot_backend=None):
+        super().__init__()
+
+        self.button_width = 150
+        self.button_height = 40
+
+        # "matplotlib" or "pyqtgraph" (defaults to the POZYX_PLOT_BACKEND environment variable)
+        self.plot_backend = plot_backend
+
+        # Dictionary to describe the length modes in the summary label
+        self.length_dict = {"trim": "trimmed", "pad": "padded"}
+
+        self.initUI()
+
+    def initUI(self):
+        mainLayout = QVBoxLayout()
+
+        ########################################
+        # Title label
+        ########################################
+        titleLabel = QLabel("Batch FFT Comparison")
+        font = QFont()
+        font.setPointSize(16)
+        font.setBold(True)
+        titleLabel.setFont(font)
+        titleLabel.setAlignment(Qt.AlignCenter)
+        mainLayout.addWidget(titleLabel)
+        self.titleLabel = titleLabel
+
+        ########################################
+        # Load CSVs button, length mode and label
+        ########################################
+        loadCsvLayout = QHBoxLayout()
+        loadCsvLayout.addStretch(1)
+
+        # Trim every run to the shortest one, or zero pad to the longest one
+        self.lengthComboBox = QComboBox()
+        self.lengthComboBox.addItems(BATCH_LENGTH_MODES)
+        loadCsvLayout.addWidget(self.lengthComboBox)
+
+        btnLoadCSVs = QPushButton("Load CSVs")
+        btnLoadCSVs.setFixedSize(self.button_width, self.button_height)
+        btnLoadCSVs.clicked.connect(self.loadCSVs)
+        loadCsvLayout.addWidget(btnLoadCSVs)
+
+        # Label to display a summary of the loaded runs
+        self.summaryLabel = QLabel("No CSV files loaded")
+        loadCsvLayout.addWidget(self.summaryLabel)
+
+        loadCsvLayout.addStretch(1)
+        mainLayout.addLayout(loadCsvLayout)
+
+        ########################################
+        # Overlay and heat-map plots
+        ########################################
+        plotLayout = QHBoxLayout()
+        self.pane_overlay = create_plot_pane(self.plot_backend)
+        plotLayout.addWidget(self.pane_overlay.widget)
+        self.pane_heatmap = create_plot_pane(self.plot_backend)
+        plotLayout.addWidget(self.pane_heatmap.widget)
+        mainLayout.addLayout(plotLayout)
+
+        mainWidget = QWidget()
+        mainWidget.setLayout(mainLayout)
+        self.setCentralWidget(mainWidget)
+
+        # Set stretch factors
+        mainLayout.setStretch(0, 1)  # Stretch factor for title
+        mainLayout.setStretch(1, 1)  # Stretch factor for button
+        mainLayout.setStretch(2, 8)  # Stretch factor for plots
+
+        self.show()
+
+    def loadCSVs(self):
+        options = QFileDialog.Options()
+        filepaths, _ = QFileDialog.getOpenFileNames(
+            self, "Select CSV Files", "", "CSV Files (*.csv *.csv.gz *.csv.zst)", options=options
+        )
+        if filepaths:
+            self.plotBatchFFT(filepaths, self.lengthComboBox.currentText())
+
+    def plotBatchFFT(self, filePaths, length="trim"):
+        start_time = time.perf_counter()
+        batch = load_batch_spectra(filePaths, length=length)
+        magnitudes = batch.magnitudes()
+        elapsed = time.perf_counter() - start_time
+
+        ########################################
+        # Overlay of every run's magnitude
+        ########################################
+        label_runs = len(batch.names) <= MAX_LABELLED_RUNS
+        self.pane_overlay.clear()
+        self.pane_overlay.set_labels("Magnitude Spectra w/o DC Offset", "Frequency (Hz)", "Magnitude")
+        for name, run_magnitudes in zip(batch.names, magnitudes):
+            self.pane_overlay.plot(
+                batch.frequencies, run_magnitudes, label=name if label_runs else None
+            )
+        if label_runs:
+            self.pane_overlay.legend()
+        self.pane_overlay.draw()
+
+        ########################################
+        # Heat-map of magnitude (dB) per run
+        ########################################
+        self.pane_heatmap.clear()
+        self.pane_heatmap.set_labels("Magnitude per Run (dB)", "Frequency (Hz)", "Run")
+        self.pane_heatmap.image(
+            20 * np.log10(magnitudes + np.finfo(float).tiny),
+            (batch.frequencies[0], batch.frequencies[-1], -0.5, len(batch.names) - 0.5),
+        )
+        self.pane_heatmap.draw()
+
+        max_magnitudes, max_frequencies = batch.max_magnitudes()
+        for name, max_magnitude, max_frequency in zip(batch.names, max_magnitudes, max_frequencies):
+            print(f"{name}: Max Magnitude: {max_magnitude:.4f} at {max_frequency:.4f} Hz")
+
+        self.summaryLabel.setText(
+            f"Runs: {len(batch.names)} ({self.length_dict[length]} to {batch.n} samples)\n"
+            + f"Sample Rate: {batch.fs:.2f} Hz\n"
+            + f"Load + FFT time: {elapsed:.2f} s"
+        )
@@ -1,9 +1,6 @@
 # Import Python-native modules
 import os
 import numpy as np
-from scipy.fftpack import fft
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
@@ -15,16 +12,28 @@ from PyQt5.QtWidgets import (
     QLabel,
     QHBoxLayout,
     QTabWidget,
+    QCheckBox,
 )
 
+# Import custom modules
+from .plot_backends import create_plot_pane
+from .spectral_analysis import load_spectrum
+from .profiling import profiled
+
 
 class QtPlotFftMagnitudePhase(QMainWindow):
-    def __init__(self):
+    def __init__(self, plot_backend=None):
         super().__init__()
 
         self.button_width = 150
         self.button_height = 40
 
+        # "matplotlib" or "pyqtgraph" (defaults to the POZYX_PLOT_BACKEND environment variable)
+        self.plot_backend = plot_backend
+
+        # Path of the loaded file (re-plotted when the outlier toggle changes)
+        self.filePath = None
+
         self.initUI()
 
     def initUI(self):
@@ -63,6 +72,11 @@ class QtPlotFftMagnitudePhase(QMainWindow):
         self.filenameLabel = QLabel("No CSV file loaded")
         loadCsvLayout.addWidget(self.filenameLabel)
 
+        # Replace multipath spikes (Hampel filter) before the FFT
+        self.outlierCheckBox = QCheckBox("Reject Outliers")
+        self.outlierCheckBox.stateChanged.connect(self.replotFFT)
+        loadCsvLayout.addWidget(self.outlierCheckBox)
+
         loadCsvLayout.addStretch(
             1
         )  # Add stretchable space after button and label to center it
@@ -102,125 +116,91 @@ class QtPlotFftMagnitudePhase(QMainWindow):
     def loadCSV(self):
         options = QFileDialog.Options()
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Select CSV File", "", "CSV Files (*.csv)", options=options
+            self, "Select CSV File", "", "CSV Files (*.csv *.csv.gz *.csv.zst)", options=options
         )
         if filepath:
             filename = os.path.basename(filepath)  # Extract filename from filepath
             self.filenameLabel.setText(filename)  # Set the filename label
             self.plotFFT(filepath)
 
-    def plotFFT(self, filePath):
-        # Load the data from the CSV file
-        data = np.genfromtxt(filePath, delimiter=",", skip_header=1)
-        timesteps = data[:, 0]
+    def replotFFT(self):
+        if self.filePath:
+            self.plotFFT(self.filePath)
 
-        # Define the frequencies
-        frequencies = np.fft.fftfreq(len(timesteps), np.diff(timesteps)[0])
+    @profiled
+    def plotFFT(self, filePath):
+        # Load the data and its spectrum (a single rfft, memoized per file)
+        self.filePath = filePath
+        spectrum = load_spectrum(filePath, reject_outliers=self.outlierCheckBox.isChecked())
+        timesteps = spectrum.timesteps
+        distances = spectrum.distances
 
-        # When performing FFT on real-valued input, the output is symmetric about the zero frequency
-        # Therefore, we only need to plot the positive frequencies
-        positive_freq_components = len(frequencies) // 2
+        # rfft only returns the positive frequencies of the real-valued input
+        # (in Hz, using the sample rate estimated from every interval rather than the first one)
+        frequencies = spectrum.frequencies
 
         ########################################
         # Plot the raw data
         ########################################
-        ax = self.canvas_raw_data_tab1.figure.subplots()
-        ax.set_title("Raw Pozyx Data")
-        ax.set_xlabel("Time (ms)")
-        ax.set_ylabel("Distance (mm)")
-        ax.plot(timesteps, data[:, 1])
-        self.canvas_raw_data_tab1.draw()
-        ax = self.canvas_raw_data_tab2.figure.subplots()
-        ax.set_title("Raw Pozyx Data")
-        ax.set_xlabel("Time (ms)")
-        ax.set_ylabel("Distance (mm)")
-        ax.plot(timesteps, data[:, 1])
-        self.canvas_raw_data_tab2.draw()
+        self.pane_raw_data_tab1.clear()
+        self.pane_raw_data_tab1.set_labels("Raw Pozyx Data", "Time (ms)", "Distance (mm)")
+        self.pane_raw_data_tab1.plot(timesteps, distances)
+        self.pane_raw_data_tab1.draw()
+        self.pane_raw_data_tab2.clear()
+        self.pane_raw_data_tab2.set_labels("Raw Pozyx Data", "Time (ms)", "Distance (mm)")
+        self.pane_raw_data_tab2.plot(timesteps, distances)
+        self.pane_raw_data_tab2.draw()
 
         ########################################
         # Plot the Magnitude w/ DC Offset
         ########################################
-        distances_w_dc = data[:, 1]
-
-        # Perform the FFT using SciPy FFT
-        transformed_w_dc = fft(distances_w_dc)
-
         # We normalize the magnitudes by dividing by the number of samples
         # This is because the magnitude is proportional to the number of samples
-        magnitudes_w_dc = np.abs(transformed_w_dc) / len(distances_w_dc)
-        phase_w_dc = np.angle(transformed_w_dc)
+        magnitudes_w_dc = spectrum.magnitude(dc=True)
+        phase_w_dc = spectrum.phase(dc=True)
 
         # Plot the normalized magnitude
-        ax = self.canvas_magnitude_tab1.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            magnitudes_w_dc[:positive_freq_components],
-        )
-        ax.set_title("Magnitude w/ DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Magnitude")
-        self.canvas_magnitude_tab1.draw()
+        self.pane_magnitude_tab1.clear()
+        self.pane_magnitude_tab1.set_labels("Magnitude w/ DC Offset", "Frequency (Hz)", "Magnitude")
+        self.pane_magnitude_tab1.plot(frequencies, magnitudes_w_dc)
+        self.pane_magnitude_tab1.draw()
 
         ########################################
         # Plot the Phase w/ DC Offset
         ########################################
-        ax = self.canvas_phase_tab1.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            phase_w_dc[:positive_freq_components],
-        )
-        ax.set_title("Phase w/ DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Phase (radians)")
-        self.canvas_phase_tab1.draw()
+        self.pane_phase_tab1.clear()
+        self.pane_phase_tab1.set_labels("Phase w/ DC Offset", "Frequency (Hz)", "Phase (radians)")
+        self.pane_phase_tab1.plot(frequencies, phase_w_dc)
+        self.pane_phase_tab1.draw()
 
         ########################################
         # Plot the Magnitude w/o DC Offset
         ########################################
-        # Since there is a significant DC offset, we need to remove it by subtracting the mean
-        distances_wo_dc = data[:, 1] - np.mean(data[:, 1])
-
-        # Perform the FFT using SciPy FFT
-        transformed_wo_dc = fft(distances_wo_dc)
-
-        # We normalize the magnitudes by dividing by the number of samples
-        # This is because the magnitude is proportional to the number of samples
-        magnitudes_wo_dc = np.abs(transformed_wo_dc) / len(distances_wo_dc)
-        phase_wo_dc = np.angle(transformed_wo_dc)
+        # Since there is a significant DC offset, we remove it (derived from the same transform)
+        magnitudes_wo_dc = spectrum.magnitude(dc=False)
+        phase_wo_dc = spectrum.phase(dc=False)
 
         # Plot the normalized magnitude
-        ax = self.canvas_magnitude_tab2.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            magnitudes_wo_dc[:positive_freq_components],
-        )
-        ax.set_title("Magnitude Spectrum w/o DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Magnitude")
-        self.canvas_magnitude_tab2.draw()
+        self.pane_magnitude_tab2.clear()
+        self.pane_magnitude_tab2.set_labels("Magnitude Spectrum w/o DC Offset", "Frequency (Hz)", "Magnitude")
+        self.pane_magnitude_tab2.plot(frequencies, magnitudes_wo_dc)
+        self.pane_magnitude_tab2.draw()
 
         ########################################
         # Plot the Phase w/o DC Offset
         ########################################
-        ax = self.canvas_phase_tab2.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            phase_wo_dc[:positive_freq_components],
-        )
-        ax.set_title("Phase Spectrum w/o DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Phase (radians)")
-        self.canvas_phase_tab2.draw()
+        self.pane_phase_tab2.clear()
+        self.pane_phase_tab2.set_labels("Phase Spectrum w/o DC Offset", "Frequency (Hz)", "Phase (radians)")
+        self.pane_phase_tab2.plot(frequencies, phase_wo_dc)
+        self.pane_phase_tab2.draw()
 
         ################################################################
         # Find the maximum magnitude and the corresponding frequency
         ################################################################
-        max_magnitude_w_dc = np.max(magnitudes_w_dc[:positive_freq_components])
-        max_magnitude_wo_dc = np.max(magnitudes_wo_dc[:positive_freq_components])
-        max_magnitude_index_w_dc = np.argmax(magnitudes_w_dc[:positive_freq_components])
-        max_magnitude_index_wo_dc = np.argmax(
-            magnitudes_wo_dc[:positive_freq_components]
-        )
+        max_magnitude_w_dc = np.max(magnitudes_w_dc)
+        max_magnitude_wo_dc = np.max(magnitudes_wo_dc)
+        max_magnitude_index_w_dc = np.argmax(magnitudes_w_dc)
+        max_magnitude_index_wo_dc = np.argmax(magnitudes_wo_dc)
 
         print(f"max_magnitude_index_w_dc: {max_magnitude_index_w_dc}")
         print(f"max_magnitude_index_wo_dc: {max_magnitude_index_wo_dc}")
@@ -232,7 +212,9 @@ class QtPlotFftMagnitudePhase(QMainWindow):
         self.label_max_magnitude.setText(
             f"Max Magnitude (w/o DC): {max_magnitude_wo_dc:.2f}\n"
             + f"Max Magnitude (w DC): {max_magnitude_w_dc:.2f}\n"
-            + f"Frequency: {max_magnitude_freq:.2f} Hz"
+            + f"Frequency: {max_magnitude_freq:.2f} Hz\n"
+            + f"Sample Rate: {spectrum.fs:.2f} Hz"
+            + (f"\nOutliers Replaced: {spectrum.num_replaced}" if self.outlierCheckBox.isChecked() else "")
         )
 
     def computeFFT(self, timesteps, data):
@@ -250,24 +232,21 @@ class QtPlotFftMagnitudePhase(QMainWindow):
         return PSD, freq, L
 
     def createPlots(self, layout, tabNumber):
-        figure_raw_data = Figure()
-        canvas_raw_data = FigureCanvas(figure_raw_data)
-        layout.addWidget(canvas_raw_data)
+        pane_raw_data = create_plot_pane(self.plot_backend)
+        layout.addWidget(pane_raw_data.widget)
 
-        figure_magnitude = Figure()
-        canvas_magnitude = FigureCanvas(figure_magnitude)
-        layout.addWidget(canvas_magnitude)
+        pane_magnitude = create_plot_pane(self.plot_backend)
+        layout.addWidget(pane_magnitude.widget)
 
-        figure_phase = Figure()
-        canvas_phase = FigureCanvas(figure_phase)
-        layout.addWidget(canvas_phase)
+        pane_phase = create_plot_pane(self.plot_backend)
+        layout.addWidget(pane_phase.widget)
 
-        # Store the canvases and figures
+        # Store the plot panes
         if tabNumber == 1:
-            self.canvas_raw_data_tab1 = canvas_raw_data
-            self.canvas_magnitude_tab1 = canvas_magnitude
-            self.canvas_phase_tab1 = canvas_phase
+            self.pane_raw_data_tab1 = pane_raw_data
+            self.pane_magnitude_tab1 = pane_magnitude
+            self.pane_phase_tab1 = pane_phase
         elif tabNumber == 2:
-            self.canvas_raw_data_tab2 = canvas_raw_data
-            self.canvas_magnitude_tab2 = canvas_magnitude
-            self.canvas_phase_tab2 = canvas_phase
+            self.pane_raw_data_tab2 = pane_raw_data
+            self.pane_magnitude_tab2 = pane_magnitude
+            self.pane_phase_tab2 = pane_phase
@@ -1,7 +1,7 @@
 # Import Python-native modules
 import os
 import numpy as np
-from scipy.fftpack import fft
+import pandas as pd
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
 from PyQt5.QtWidgets import (
@@ -13,21 +13,43 @@ from PyQt5.QtWidgets import (
     QLabel,
     QHBoxLayout,
     QTabWidget,
+    QCheckBox,
+    QDoubleSpinBox,
+    QComboBox,
 )
-from matplotlib.figure import Figure
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 
 # Import custom modules
 # from .supplemental_functions import create_two_figs_in_tab
+from .plot_backends import create_plot_pane
+from .spectral_analysis import load_spectrum, stream_welch
+from .profiling import profiled
+
+# Longest run (in samples) the whole-run FFT tabs are computed for, longer runs only get the streamed Welch
+# PSD and spectrogram, which use bounded memory
+MAX_FULL_SPECTRUM_SAMPLES = 5_000_000
 
 
 class QtPlotFftThruIfft(QMainWindow):
-    def __init__(self):
+    def __init__(self, plot_backend=None):
         super().__init__()
 
         self.button_width = 150
         self.button_height = 40
 
+        # "matplotlib" or "pyqtgraph" (defaults to the POZYX_PLOT_BACKEND environment variable)
+        self.plot_backend = plot_backend
+
+        # Path of the loaded file (re-plotted when the outlier toggle changes)
+        self.filePath = None
+
+        # Cached forward spectrum of the loaded file (filter edits only run an irfft)
+        self.spectrum = None
+        self.filtered_timesteps = None
+        self.filtered_distances = None
+
+        # Dictionary to convert the band mask combo box to Spectrum.frequency_mask() modes
+        self.band_mode_dict = {"Band Off": None, "Band-Pass": "pass", "Band-Stop": "stop"}
+
         self.initUI()
 
     def initUI(self):
@@ -66,6 +88,11 @@ class QtPlotFftThruIfft(QMainWindow):
         self.filenameLabel = QLabel("No CSV file loaded")
         loadCsvLayout.addWidget(self.filenameLabel)
 
+        # Replace multipath spikes (Hampel filter) before the FFT
+        self.outlierCheckBox = QCheckBox("Reject Outliers")
+        self.outlierCheckBox.stateChanged.connect(self.replotFFT)
+        loadCsvLayout.addWidget(self.outlierCheckBox)
+
         loadCsvLayout.addStretch(
             1
         )  # Add stretchable space after button and label to center it
@@ -97,6 +124,24 @@ class QtPlotFftThruIfft(QMainWindow):
         tab2.setLayout(tab2Layout)
         self.tabs.addTab(tab2, "Without DC Offset")
 
+        # Create tab3 - Welch PSD and spectrogram (streamed in segments)
+        tab3 = QWidget()
+        tab3Layout = QHBoxLayout()
+        self.createPlots(tab3Layout, 3)
+        tab3.setLayout(tab3Layout)
+        self.tabs.addTab(tab3, "Spectrogram")
+
+        # Create tab4 - frequency mask controls, filtered signal (through the IFFT) and kept PSD
+        tab4 = QWidget()
+        tab4Layout = QVBoxLayout()
+        tab4Layout.addLayout(self.createFilterControls())
+        tab4PlotLayout = QHBoxLayout()
+        self.createPlots(tab4PlotLayout, 4)
+        tab4Layout.addLayout(tab4PlotLayout)
+        tab4Layout.setStretch(1, 8)
+        tab4.setLayout(tab4Layout)
+        self.tabs.addTab(tab4, "Filtered (IFFT)")
+
         # Add tabs to tab widget
         mainWidget = QWidget()
         mainWidget.setLayout(mainLayout)
@@ -112,136 +157,233 @@ class QtPlotFftThruIfft(QMainWindow):
     def loadCSV(self):
         options = QFileDialog.Options()
         filepath, _ = QFileDialog.getOpenFileName(
-            self, "Select CSV File", "", "CSV Files (*.csv)", options=options
+            self, "Select CSV File", "", "CSV Files (*.csv *.csv.gz *.csv.zst)", options=options
         )
         if filepath:
             filename = os.path.basename(filepath)  # Extract filename from filepath
             self.filenameLabel.setText(filename)  # Set the filename label
             self.plotFFT(filepath)
 
-    def plotFFT(self, filePath):
-        # Load the data from the CSV file
-        data = np.genfromtxt(filePath, delimiter=",", skip_header=1)
-        timesteps = data[:, 0]
+    def replotFFT(self):
+        if self.filePath:
+            self.plotFFT(self.filePath)
+
+    def createFilterControls(self):
+        """
+        Creates the PSD threshold and band mask controls (every edit re-renders the filtered signal).
+        """
+        controlsLayout = QHBoxLayout()
+        controlsLayout.addStretch(1)
+
+        controlsLayout.addWidget(QLabel("PSD Threshold:"))
+        self.thresholdSpinBox = QDoubleSpinBox()
+        self.thresholdSpinBox.setDecimals(6)
+        self.thresholdSpinBox.setRange(0, 1e12)
+        self.thresholdSpinBox.setSpecialValueText("Off")
+        self.thresholdSpinBox.valueChanged.connect(self.updateFilter)
+        controlsLayout.addWidget(self.thresholdSpinBox)
+
+        self.bandModeComboBox = QComboBox()
+        self.bandModeComboBox.addItems(self.band_mode_dict.keys())
+        self.bandModeComboBox.currentTextChanged.connect(self.updateFilter)
+        controlsLayout.addWidget(self.bandModeComboBox)
+
+        controlsLayout.addWidget(QLabel("Low (Hz):"))
+        self.bandLowSpinBox = QDoubleSpinBox()
+        self.bandLowSpinBox.setDecimals(3)
+        self.bandLowSpinBox.setRange(0, 1e6)
+        self.bandLowSpinBox.valueChanged.connect(self.updateFilter)
+        controlsLayout.addWidget(self.bandLowSpinBox)
+
+        controlsLayout.addWidget(QLabel("High (Hz):"))
+        self.bandHighSpinBox = QDoubleSpinBox()
+        self.bandHighSpinBox.setDecimals(3)
+        self.bandHighSpinBox.setRange(0, 1e6)
+        self.bandHighSpinBox.valueChanged.connect(self.updateFilter)
+        controlsLayout.addWidget(self.bandHighSpinBox)
+
+        btnExport = QPushButton("Export Filtered CSV")
+        btnExport.setFixedSize(self.button_width, self.button_height)
+        btnExport.clicked.connect(self.exportFiltered)
+        controlsLayout.addWidget(btnExport)
+
+        controlsLayout.addStretch(1)
+        return controlsLayout
+
+    def updateFilter(self):
+        """
+        Masks the cached spectrum and rebuilds the filtered time signal with an irfft.
+        """
+        if self.spectrum is None:
+            return
+
+        band_mode = self.band_mode_dict[self.bandModeComboBox.currentText()]
+        band = None
+        if band_mode is not None:
+            band = (self.bandLowSpinBox.value(), self.bandHighSpinBox.value())
+
+        mask = self.spectrum.frequency_mask(
+            psd_threshold=self.thresholdSpinBox.value(), band=band, band_mode=band_mode or "pass"
+        )
+        self.filtered_timesteps, self.filtered_distances = self.spectrum.filtered_signal(mask)
+
+        ########################################
+        # Plot the raw and filtered signals
+        ########################################
+        self.pane_filtered_tab4.clear()
+        self.pane_filtered_tab4.set_labels("Filtered Pozyx Data (IFFT)", "Time (ms)", "Distance (mm)")
+        self.pane_filtered_tab4.plot(self.spectrum.timesteps, self.spectrum.distances, color="gray", label="Raw")
+        self.pane_filtered_tab4.plot(self.filtered_timesteps, self.filtered_distances, color="blue", label="Filtered")
+        self.pane_filtered_tab4.legend()
+        self.pane_filtered_tab4.draw()
 
-        # Define the frequencies
-        frequencies = np.fft.fftfreq(len(timesteps), np.diff(timesteps)[0])
+        ########################################
+        # Plot the PSD and the bins that are kept
+        ########################################
+        psd_wo_dc = self.spectrum.psd(dc=False)
+        self.pane_mask_tab4.clear()
+        self.pane_mask_tab4.set_labels(
+            f"PSD w/o DC Offset ({np.count_nonzero(mask[1:])} of {len(mask) - 1} bins kept)",
+            "Frequency (Hz)",
+            "PSD",
+        )
+        self.pane_mask_tab4.plot(self.spectrum.frequencies, psd_wo_dc, color="gray", label="PSD")
+        self.pane_mask_tab4.plot(self.spectrum.frequencies, psd_wo_dc * mask, color="blue", label="Kept")
+        self.pane_mask_tab4.legend()
+        self.pane_mask_tab4.draw()
+
+    def exportFiltered(self):
+        """
+        Saves the filtered signal as a .csv file.
+        """
+        if self.filtered_distances is None:
+            return
+
+        options = QFileDialog.Options()
+        filename, _ = QFileDialog.getSaveFileName(
+            self, "Save Filtered CSV", "", "CSV Files (*.csv)", options=options
+        )
+        if filename:
+            pd.DataFrame(
+                {"Timestep (ms)": self.filtered_timesteps, "Distance (mm)": self.filtered_distances}
+            ).to_csv(filename, index=False)
 
-        # When performing FFT on real-valued input, the output is symmetric about the zero frequency
-        # Therefore, we only need to plot the positive frequencies
-        positive_freq_components = len(frequencies) // 2
+    @profiled
+    def plotFFT(self, filePath):
+        self.filePath = filePath
+
+        ########################################
+        # Welch PSD and spectrogram (streamed, this also counts the samples)
+        ########################################
+        spectrogram_note = ""
+        try:
+            welch = self.plotSpectrogram(filePath)
+        except ValueError as e:
+            # Don't leave the previous file's spectra next to this file's plots
+            welch = None
+            spectrogram_note = f"\nNo Welch PSD / spectrogram: {e}"
+            for pane in (self.pane_welch_tab3, self.pane_spectrogram_tab3):
+                pane.clear()
+                pane.draw()
+
+        if welch is not None and welch.num_samples > MAX_FULL_SPECTRUM_SAMPLES:
+            # Too long to hold in memory, only keep the streamed spectra
+            self.spectrum = None
+            self.filtered_timesteps = self.filtered_distances = None
+            for pane in (
+                self.pane_raw_data_tab0, self.pane_PSD_tab0, self.pane_magnitude_tab1, self.pane_phase_tab1,
+                self.pane_magnitude_tab2, self.pane_phase_tab2, self.pane_filtered_tab4, self.pane_mask_tab4,
+            ):
+                pane.clear()
+                pane.draw()
+            self.label_max_magnitude.setText(
+                f"{welch.num_samples} samples, too long for the whole-run FFT\n"
+                + "(only the Welch PSD and spectrogram are shown)\n"
+                + f"Sample Rate: {welch.fs:.4f} Hz"
+            )
+            self.tabs.setCurrentIndex(3)
+            return
+
+        # Load the data and its spectrum (a single rfft, memoized per file)
+        spectrum = load_spectrum(filePath, reject_outliers=self.outlierCheckBox.isChecked())
+        self.spectrum = spectrum
+        timesteps = spectrum.timesteps
+        distances = spectrum.distances
+
+        # rfft only returns the positive frequencies of the real-valued input
+        # (in Hz, using the sample rate estimated from every interval rather than the first one)
+        frequencies = spectrum.frequencies
 
         ########################################
         # Plot the raw data
         ########################################
-        ax = self.canvas_raw_data_tab0.figure.subplots()
-        ax.set_title("Raw Pozyx Data")
-        ax.set_xlabel("Time (ms)")
-        ax.set_ylabel("Distance (mm)")
-        ax.plot(timesteps, data[:, 1])
-        self.canvas_raw_data_tab0.draw()
+        self.pane_raw_data_tab0.clear()
+        self.pane_raw_data_tab0.set_labels("Raw Pozyx Data", "Time (ms)", "Distance (mm)")
+        self.pane_raw_data_tab0.plot(timesteps, distances)
+        self.pane_raw_data_tab0.draw()
 
         ########################################
         # Plot the Magnitude w/ DC Offset
         ########################################
-        distances_w_dc = data[:, 1]
-
-        # Perform the FFT using SciPy FFT
-        transformed_w_dc = fft(distances_w_dc)
-
         # We normalize the magnitudes by dividing by the number of samples
         # This is because the magnitude is proportional to the number of samples
-        magnitudes_w_dc = np.abs(transformed_w_dc) / len(distances_w_dc)
-        phase_w_dc = np.angle(transformed_w_dc)
+        magnitudes_w_dc = spectrum.magnitude(dc=True)
+        phase_w_dc = spectrum.phase(dc=True)
 
         # Plot the normalized magnitude
-        ax = self.canvas_magnitude_tab1.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            magnitudes_w_dc[:positive_freq_components],
-        )
-        ax.set_title("Magnitude w/ DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Magnitude")
-        self.canvas_magnitude_tab1.draw()
+        self.pane_magnitude_tab1.clear()
+        self.pane_magnitude_tab1.set_labels("Magnitude w/ DC Offset", "Frequency (Hz)", "Magnitude")
+        self.pane_magnitude_tab1.plot(frequencies, magnitudes_w_dc)
+        self.pane_magnitude_tab1.draw()
 
         ########################################
         # Plot the Phase w/ DC Offset
         ########################################
-        ax = self.canvas_phase_tab1.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            phase_w_dc[:positive_freq_components],
-        )
-        ax.set_title("Phase w/ DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Phase (radians)")
-        self.canvas_phase_tab1.draw()
+        self.pane_phase_tab1.clear()
+        self.pane_phase_tab1.set_labels("Phase w/ DC Offset", "Frequency (Hz)", "Phase (radians)")
+        self.pane_phase_tab1.plot(frequencies, phase_w_dc)
+        self.pane_phase_tab1.draw()
 
         ########################################
         # Plot the Magnitude w/o DC Offset
         ########################################
-        # Since there is a significant DC offset, we need to remove it by subtracting the mean
-        distances_wo_dc = data[:, 1] - np.mean(data[:, 1])
-
-        # Perform the FFT using SciPy FFT
-        transformed_wo_dc = fft(distances_wo_dc)
-
-        # We normalize the magnitudes by dividing by the number of samples
-        # This is because the magnitude is proportional to the number of samples
-        magnitudes_wo_dc = np.abs(transformed_wo_dc) / len(distances_wo_dc)
-        phase_wo_dc = np.angle(transformed_wo_dc)
+        # Since there is a significant DC offset, we remove it (derived from the same transform)
+        magnitudes_wo_dc = spectrum.magnitude(dc=False)
+        phase_wo_dc = spectrum.phase(dc=False)
 
         # Plot the normalized magnitude
-        ax = self.canvas_magnitude_tab2.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            magnitudes_wo_dc[:positive_freq_components],
-        )
-        ax.set_title("Magnitude Spectrum w/o DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Magnitude")
-        self.canvas_magnitude_tab2.draw()
+        self.pane_magnitude_tab2.clear()
+        self.pane_magnitude_tab2.set_labels("Magnitude Spectrum w/o DC Offset", "Frequency (Hz)", "Magnitude")
+        self.pane_magnitude_tab2.plot(frequencies, magnitudes_wo_dc)
+        self.pane_magnitude_tab2.draw()
 
         ########################################
         # Plot the Phase w/o DC Offset
         ########################################
-        ax = self.canvas_phase_tab2.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            phase_wo_dc[:positive_freq_components],
-        )
-        ax.set_title("Phase Spectrum w/o DC Offset")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("Phase (radians)")
-        self.canvas_phase_tab2.draw()
+        self.pane_phase_tab2.clear()
+        self.pane_phase_tab2.set_labels("Phase Spectrum w/o DC Offset", "Frequency (Hz)", "Phase (radians)")
+        self.pane_phase_tab2.plot(frequencies, phase_wo_dc)
+        self.pane_phase_tab2.draw()
 
         ########################################
         # Compute the Power Spectral Density (PSD)
         ########################################
         # The PSD is the square of the magnitude spectrum
-        psd_wo_dc = np.square(magnitudes_wo_dc)
+        psd_wo_dc = spectrum.psd(dc=False)
 
         # Plot the PSD
-        ax = self.canvas_PSD_tab0.figure.subplots()
-        ax.plot(
-            frequencies[:positive_freq_components],
-            psd_wo_dc[:positive_freq_components],
-        )
-        ax.set_title("Power Spectral Density (w/o DC Offset)")
-        ax.set_xlabel("Frequency (Hz)")
-        ax.set_ylabel("PSD")
-        self.canvas_PSD_tab0.draw()
+        self.pane_PSD_tab0.clear()
+        self.pane_PSD_tab0.set_labels("Power Spectral Density (w/o DC Offset)", "Frequency (Hz)", "PSD")
+        self.pane_PSD_tab0.plot(frequencies, psd_wo_dc)
+        self.pane_PSD_tab0.draw()
 
         ################################################################
         # Find the maximum magnitude and the corresponding frequency
         ################################################################
-        max_magnitude_w_dc = np.max(magnitudes_w_dc[:positive_freq_components])
-        max_magnitude_wo_dc = np.max(magnitudes_wo_dc[:positive_freq_components])
-        max_magnitude_index_w_dc = np.argmax(magnitudes_w_dc[:positive_freq_components])
-        max_magnitude_index_wo_dc = np.argmax(
-            magnitudes_wo_dc[:positive_freq_components]
-        )
+        max_magnitude_w_dc = np.max(magnitudes_w_dc)
+        max_magnitude_wo_dc = np.max(magnitudes_wo_dc)
+        max_magnitude_index_w_dc = np.argmax(magnitudes_w_dc)
+        max_magnitude_index_wo_dc = np.argmax(magnitudes_wo_dc)
 
         print(f"max_magnitude_index_w_dc: {max_magnitude_index_w_dc}")
         print(f"max_magnitude_index_wo_dc: {max_magnitude_index_wo_dc}")
@@ -253,8 +395,49 @@ class QtPlotFftThruIfft(QMainWindow):
         self.label_max_magnitude.setText(
             f"Max Magnitude (w/o DC): {max_magnitude_wo_dc:.4f}\n"
             + f"Max Magnitude (w DC): {max_magnitude_w_dc:.4f}\n"
-            + f"Frequency: {max_magnitude_freq:.4f} Hz"
+            + f"Frequency: {max_magnitude_freq:.4f} Hz\n"
+            + f"Sample Rate: {spectrum.fs:.4f} Hz"
+            + (f"\nOutliers Replaced: {spectrum.num_replaced}" if self.outlierCheckBox.isChecked() else "")
+            + spectrogram_note
+        )
+
+        ########################################
+        # Filtered signal (through the IFFT)
+        ########################################
+        self.updateFilter()
+
+    def plotSpectrogram(self, filePath, nperseg=256):
+        """
+        Plots the Welch-averaged PSD and the STFT spectrogram, streaming the run in overlapping segments
+        (resampled onto a uniform grid on the way).
+
+        :return: The StreamingWelch
+        """
+        welch = stream_welch(filePath, nperseg=nperseg)
+
+        ########################################
+        # Plot the Welch PSD
+        ########################################
+        frequencies, psd = welch.psd()
+        self.pane_welch_tab3.clear()
+        self.pane_welch_tab3.set_labels(
+            f"Welch PSD ({welch.num_segments} segments)", "Frequency (Hz)", "PSD (dB mm^2/Hz)"
+        )
+        self.pane_welch_tab3.plot(frequencies[1:], 10 * np.log10(psd[1:]))
+        self.pane_welch_tab3.draw()
+
+        ########################################
+        # Plot the spectrogram
+        ########################################
+        times, frequencies, power = welch.spectrogram()
+        self.pane_spectrogram_tab3.clear()
+        self.pane_spectrogram_tab3.set_labels("Spectrogram", "Time (s)", "Frequency (Hz)")
+        self.pane_spectrogram_tab3.image(
+            10 * np.log10(power + np.finfo(float).tiny),
+            (times[0], times[-1], frequencies[0], frequencies[-1]),
         )
+        self.pane_spectrogram_tab3.draw()
+        return welch
 
     """
     def computeFFT(self, timesteps, data):
@@ -274,23 +457,27 @@ class QtPlotFftThruIfft(QMainWindow):
 
     def createPlots(self, layout, tabNumber):
 
-        figure_plot0 = Figure()
-        canvas_plot0 = FigureCanvas(figure_plot0)
-        layout.addWidget(canvas_plot0)
+        pane_plot0 = create_plot_pane(self.plot_backend)
+        layout.addWidget(pane_plot0.widget)
 
-        figure_plot1= Figure()
-        canvas_plot1 = FigureCanvas(figure_plot1)
-        layout.addWidget(canvas_plot1)
+        pane_plot1 = create_plot_pane(self.plot_backend)
+        layout.addWidget(pane_plot1.widget)
 
-        # Store the canvases and figures
+        # Store the plot panes
         if tabNumber == 0:
-            self.canvas_raw_data_tab0 = canvas_plot0
-            self.canvas_PSD_tab0 = canvas_plot1
+            self.pane_raw_data_tab0 = pane_plot0
+            self.pane_PSD_tab0 = pane_plot1
         elif tabNumber == 1:
-            self.canvas_magnitude_tab1 = canvas_plot0
-            self.canvas_phase_tab1 = canvas_plot1
+            self.pane_magnitude_tab1 = pane_plot0
+            self.pane_phase_tab1 = pane_plot1
         elif tabNumber == 2:
-            self.canvas_magnitude_tab2 = canvas_plot0
-            self.canvas_phase_tab2 = canvas_plot1
+            self.pane_magnitude_tab2 = pane_plot0
+            self.pane_phase_tab2 = pane_plot1
+        elif tabNumber == 3:
+            self.pane_welch_tab3 = pane_plot0
+            self.pane_spectrogram_tab3 = pane_plot1
+        elif tabNumber == 4:
+            self.pane_filtered_tab4 = pane_plot0
+            self.pane_mask_tab4 = pane_plot1
         else:
             raise ValueError("Invalid tab number")
@@ -1,20 +1,54 @@
+import time
 import pandas as pd
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from PyQt5 import QtWidgets
+from PyQt5.QtCore import QTimer
 from PyQt5.QtWidgets import QFileDialog
 
+# Import custom modules
+from .plot_backends import create_plot_pane
+from .outliers import hampel_filter
+from .running_stats import RunningStats, RunTail, save_run_stats
+from .ground_truth import compare_to_ground_truth, ERROR_PERCENTILES
+from .profiling import profiled
+
+# How often a followed data file is checked for new rows
+FOLLOW_INTERVAL_MS = 500
+
+# Shortest time between two re-plots of a followed data file (new rows are parsed on every check)
+FOLLOW_REPLOT_INTERVAL_S = 2.0
+
 class QtSinglePlotWindow(QtWidgets.QWidget):
     """
     A Qt window that plots data from a .csv file (input filename within the script).
     """
 
-    def __init__(self):
+    def __init__(self, plot_backend=None):
         super().__init__()
 
         self.button_width = 150
         self.button_height = 40
 
+        # "matplotlib" or "pyqtgraph" (defaults to the POZYX_PLOT_BACKEND environment variable)
+        self.plot_backend = plot_backend
+
+        # Loaded files (re-plotted when the outlier toggle changes)
+        self.data_filename = None
+        self.ground_truth_filename = None
+
+        # Data file reader, only parses rows appended since the last read (see the follow checkbox)
+        self.data_tail = None
+
+        # Plotted data and ground truth (timesteps, distances), compared once both are loaded
+        self.plotted_data = None
+        self.plotted_ground_truth = None
+
+        # Rows read by follow checks since the last re-plot, and when that was (time.monotonic())
+        self.follow_pending_rows = 0
+        self.last_follow_replot = 0.0
+
+        self.follow_timer = QTimer(self)
+        self.follow_timer.timeout.connect(self.followDataCsvFile)
+
         self.initUI()  # Initialize the UI
 
     def initUI(self):
@@ -25,9 +59,12 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
         # Set window title
         self.setWindowTitle("Pozyx 1-D Plotter")
 
-        # Create a figure and canvas
-        self.figure, self.ax = plt.subplots()
-        self.canvas = FigureCanvas(self.figure)
+        # Create a plot pane (Matplotlib or pyqtgraph canvas)
+        self.pane = create_plot_pane(self.plot_backend)
+
+        # Create a second pane for the error against the ground truth, and a label for its summary
+        self.error_pane = create_plot_pane(self.plot_backend)
+        self.error_label = QtWidgets.QLabel("Load data and ground truth to compute the error")
 
         # Create a button to select a .csv file
         self.data_button = QtWidgets.QPushButton("Select Data CSV File")
@@ -56,6 +93,26 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
             lambda: self.savePlot()
         )
 
+        # Create a checkbox to replace multipath spikes (Hampel filter) in the data
+        self.outlier_checkbox = QtWidgets.QCheckBox("Reject Outliers")
+        self.outlier_checkbox.stateChanged.connect(
+            lambda: self.replotCsvFiles()
+        )
+
+        # Create a checkbox to follow a data file that is still being captured
+        self.follow_checkbox = QtWidgets.QCheckBox("Follow Data File")
+        self.follow_checkbox.stateChanged.connect(
+            lambda: self.toggleFollow()
+        )
+
+        # Create a combo box to choose how ground truth points are matched to the data samples
+        self.align_combo_box = QtWidgets.QComboBox()
+        self.align_combo_box.addItem("Interpolate GT", "interp")
+        self.align_combo_box.addItem("Latest GT (as-of)", "asof")
+        self.align_combo_box.currentIndexChanged.connect(
+            lambda: self.plotGroundTruthError()
+        )
+
         # Create a vertical box layout
         layout = QtWidgets.QVBoxLayout()
 
@@ -64,7 +121,7 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
         layout.addWidget(self.ground_truth_button)
         layout.addWidget(self.clear_button)
         layout.addWidget(self.save_button)
-        layout.addWidget(self.canvas)
+        layout.addWidget(self.pane.widget)
         """
         topButtonLayout = QtWidgets.QHBoxLayout()
         topButtonLayout.addWidget(self.data_button)
@@ -73,25 +130,35 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
         bottomButtonLayout = QtWidgets.QHBoxLayout()
         bottomButtonLayout.addWidget(self.clear_button)
         bottomButtonLayout.addWidget(self.save_button)
+        bottomButtonLayout.addWidget(self.outlier_checkbox)
+        bottomButtonLayout.addWidget(self.follow_checkbox)
+        bottomButtonLayout.addWidget(self.align_combo_box)
 
         layout.addLayout(topButtonLayout)
         layout.addLayout(bottomButtonLayout)
 
-        layout.addWidget(self.canvas)
+        layout.addWidget(self.pane.widget, stretch=3)
+        layout.addWidget(self.error_pane.widget, stretch=1)
+        layout.addWidget(self.error_label)
 
         # Set the layout of the window
         self.setLayout(layout)
 
-        # Add large and bold title
-        self.ax.set_title("1-D Pozyx Data", fontsize=16, fontweight="bold")
+        # Add large and bold title, and the x and y labels
+        self.setPlotLabels()
 
-        # Set the x and y labels
-        self.ax.set_xlabel("Timesteps (ms)")
-        self.ax.set_ylabel("Distance (mm)")
+    def setPlotLabels(self):
+        """
+        Sets the title and axis labels of the plot.
+        """
+        self.pane.set_labels(
+            "1-D Pozyx Data", "Timesteps (ms)", "Distance (mm)", fontsize=16, fontweight="bold"
+        )
+        self.error_pane.set_labels("Error vs. Ground Truth", "Timesteps (ms)", "Error (mm)")
 
     def savePlot(self):
         """
-        Saves the plot as a .png file.
+        Saves the plot as a .png file (always rendered with Matplotlib).
         """
         options = QFileDialog.Options()
 
@@ -102,22 +169,79 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
 
         # Save the plot
         if filename:
-            self.figure.savefig(filename)
+            self.pane.export_png(filename)
 
     def clearPlots(self):
         """
         Clears the plots.
         """
-        self.ax.clear()
+        self.pane.clear()
+        self.error_pane.clear()
+        self.error_label.setText("Load data and ground truth to compute the error")
+        self.data_filename = None
+        self.ground_truth_filename = None
+        self.plotted_data = None
+        self.plotted_ground_truth = None
 
-        # Add large and bold title
-        self.ax.set_title("1-D Pozyx Data", fontsize=16, fontweight="bold")
+        # Add large and bold title, and the x and y labels
+        self.setPlotLabels()
 
-        # Set the x and y labels
-        self.ax.set_xlabel("Timesteps (ms)")
-        self.ax.set_ylabel("Distance (mm)")
+        self.pane.draw()
 
-        self.canvas.draw()
+    def replotCsvFiles(self):
+        """
+        Re-plots the loaded data and ground truth files (e.g. after toggling outlier rejection).
+        """
+        data_filename = self.data_filename
+        ground_truth_filename = self.ground_truth_filename
+        if data_filename is None and ground_truth_filename is None:
+            return
+
+        self.clearPlots()
+        if data_filename:
+            self.plotDataCsvFile(data_filename)
+        if ground_truth_filename:
+            self.plotGroundTruthCsvFile(ground_truth_filename)
+
+        self.pane.legend()
+        self.pane.draw()
+        self.error_pane.draw()
+
+    def toggleFollow(self):
+        """
+        Starts or stops checking the data file for new rows.
+        """
+        if self.follow_checkbox.isChecked():
+            self.follow_timer.start(FOLLOW_INTERVAL_MS)
+        else:
+            self.follow_timer.stop()
+            self.followDataCsvFile(force=True)  # Plot the rows that are still pending
+            self.saveDataStats()
+
+    def followDataCsvFile(self, force=False):
+        """
+        Re-plots when rows were appended to the data file (only the new rows are parsed), at most once
+        every FOLLOW_REPLOT_INTERVAL_S.
+
+        :param force: Re-plot pending rows right away
+        """
+        if self.data_tail is None or not self.data_filename:
+            return
+        self.follow_pending_rows += self.data_tail.read_new()
+        now = time.monotonic()
+        if self.follow_pending_rows and (force or now - self.last_follow_replot >= FOLLOW_REPLOT_INTERVAL_S):
+            self.follow_pending_rows = 0
+            self.last_follow_replot = now
+            self.replotCsvFiles()
+
+    def saveDataStats(self):
+        """
+        Persists the statistics of the rows read from the data file next to it (see save_run_stats).
+        """
+        if self.data_tail is not None:
+            save_run_stats(
+                self.data_tail.filepath, self.data_tail.stats, self.data_tail.offset, self.data_tail.distributions
+            )
 
     def loadCsvFile(self, button_type):
         """
@@ -127,7 +251,7 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
 
         # Open a file dialog to select a .csv file, filters for .csv files
         filename, _ = QFileDialog.getOpenFileName(
-            self, "Select CSV File", "", "CSV Files (*.csv)", options=options
+            self, "Select CSV File", "", "CSV Files (*.csv *.csv.gz *.csv.zst)", options=options
         )
 
         # Plot the .csv file
@@ -137,23 +261,48 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
             self.plotGroundTruthCsvFile(filename)
 
         # Add a legend
-        self.ax.legend(loc="upper left", bbox_to_anchor=(1, 1), fontsize='large')
+        self.pane.legend()
+        self.pane.draw()
 
 
 
 
+    @profiled
     def plotDataCsvFile(self, filename):
         """
         Plots the data from a .csv file.
         """
-        df = pd.read_csv(filename)
-
-        # Calculate the mean of the data
-        data_mean = df[df.columns[1]].mean()
-
-        # Calculate the data which deviates the most from the mean
-        data_max_deviation = df[df.columns[1]].max() - data_mean
-        data_min_deviation = data_mean - df[df.columns[1]].min()
+        self.data_filename = filename
+
+        # Only parse the rows that are new since the last read of this file, the statistics are
+        # updated in the same pass. They are persisted next to the run when it is loaded and when following
+        # stops, not on every follow check.
+        if self.data_tail is None or self.data_tail.filepath != filename:
+            if self.follow_checkbox.isChecked():
+                self.saveDataStats()  # Rows the previous file got while it was followed
+            self.data_tail = RunTail(filename)
+            self.follow_pending_rows = 0
+            self.data_tail.read_new()
+            self.saveDataStats()
+        else:
+            self.data_tail.read_new()
+
+        timesteps = self.data_tail.timesteps
+        distances = self.data_tail.distances
+        stats = self.data_tail.stats
+        data_label = 'Pozyx Data'
+
+        # Replace multipath spikes first, so they don't dominate the max deviation
+        if self.outlier_checkbox.isChecked():
+            distances, replaced = hampel_filter(distances)
+            stats = RunningStats.from_values(distances)
+            data_label = f'Pozyx Data ({replaced.sum()} outliers replaced)'
+            print(f"Outliers replaced: {replaced.sum()}")
+
+        # Mean of the data and how far the max and min deviate from it
+        data_mean = stats.mean
+        data_max_deviation = stats.max_deviation
+        data_min_deviation = stats.min_deviation
         data_deviation_diff = max(data_max_deviation, data_min_deviation)
 
         print(f"Data mean: {data_mean:.2f}")
@@ -162,7 +311,7 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
         print(f"Data deviation diff: {data_deviation_diff:.2f}")
 
         # Plot the mean and the max deviation lines
-        self.ax.axhline(y=data_mean, color='green', label='Mean', linewidth=1)
+        self.pane.axhline(data_mean, color='green', label='Mean', linewidth=1)
 
         # Determine whether the max or min deviation is greater (used to plot line above or below the mean)
         if data_max_deviation < data_min_deviation:
@@ -170,35 +319,72 @@ class QtSinglePlotWindow(QtWidgets.QWidget):
         else:
             diff_line = data_mean + data_deviation_diff
 
-        self.ax.axhline(y=diff_line, color='red', label='Max Deviation', linewidth=1)
+        self.pane.axhline(diff_line, color='red', label='Max Deviation', linewidth=1)
 
         # Annotate the mean and max deviation lines
-        self.ax.annotate(f'Mean: {data_mean:.2f}', xy=(1, data_mean), xycoords=('axes fraction', 'data'), textcoords='offset points', xytext=(-10,-10), ha='right')
-        self.ax.annotate(f'Deviation Value: {diff_line:.2f} || Difference: {data_deviation_diff:.2f}', xy=(1, diff_line), xycoords=('axes fraction', 'data'), textcoords='offset points', xytext=(-10,10), ha='right')
+        self.pane.annotate(f'Mean: {data_mean:.2f}', data_mean, above=False)
+        self.pane.annotate(f'Deviation Value: {diff_line:.2f} || Difference: {data_deviation_diff:.2f}', diff_line, above=True)
 
         # Plot the data
-        self.ax.plot(df[df.columns[0]], df[df.columns[1]], color='blue', label='Pozyx Data', linewidth=1)
+        self.pane.plot(timesteps, distances, color='blue', label=data_label, linewidth=1)
+        self.plotted_data = (timesteps, distances)
 
         # Draw the plot
-        self.canvas.draw()
+        self.pane.draw()
+        self.plotGroundTruthError()
 
     def plotGroundTruthCsvFile(self, filename):
         """
         Plots the data from a .csv file.
         """
+        self.ground_truth_filename = filename
         df = pd.read_csv(filename)
 
         # Calculate the mean of GT
         gt_mean = df[df.columns[1]].mean()
 
         # Plot the mean line
-        self.ax.axhline(y=gt_mean, color='purple', label='GT Mean', linewidth=1)
+        self.pane.axhline(gt_mean, color='purple', label='GT Mean', linewidth=1)
 
         # Annotate the mean line
-        self.ax.annotate(f'GT Mean: {gt_mean:.2f}', xy=(1, gt_mean), xycoords=('axes fraction', 'data'), textcoords='offset points', xytext=(-10,-10), ha='right')
+        self.pane.annotate(f'GT Mean: {gt_mean:.2f}', gt_mean, above=False)
 
         # Plot the data
-        self.ax.plot(df[df.columns[0]], df[df.columns[1]], color='orange', label='Ground Truth', linewidth=3)
+        self.pane.plot(df[df.columns[0]].to_numpy(), df[df.columns[1]].to_numpy(), color='orange', label='Ground Truth', linewidth=3)
+        self.plotted_ground_truth = (df[df.columns[0]].to_numpy(), df[df.columns[1]].to_numpy())
 
         # Draw the plot
-        self.canvas.draw()
\ No newline at end of file
+        self.pane.draw()
+        self.plotGroundTruthError()
+
+    def plotGroundTruthError(self):
+        """
+        Plots the per-sample error of the data against the ground truth and shows its summary.
+        """
+        if self.plotted_data is None or self.plotted_ground_truth is None:
+            return
+
+        self.error_pane.clear()
+        self.error_pane.set_labels("Error vs. Ground Truth", "Timesteps (ms)", "Error (mm)")
+        try:
+            timesteps, errors, metrics = compare_to_ground_truth(
+                *self.plotted_data, *self.plotted_ground_truth, method=self.align_combo_box.currentData()
+            )
+        except ValueError as e:
+            self.error_label.setText(str(e))
+            self.error_pane.draw()
+            return
+
+        self.error_pane.axhline(0, color='black', linewidth=1)
+        self.error_pane.axhline(metrics["bias"], color='green', label='Bias', linewidth=1)
+        self.error_pane.plot(timesteps, errors, color='red', label='Error', linewidth=1)
+        self.error_pane.legend()
+        self.error_pane.draw()
+
+        percentiles = " | ".join(f"P{p}: {metrics[f'p{p}']:.2f}" for p in ERROR_PERCENTILES)
+        summary = (
+            f"Samples: {metrics['count']} | Bias: {metrics['bias']:.2f} | RMSE: {metrics['rmse']:.2f} | "
+            f"MAE: {metrics['mae']:.2f} | Max: {metrics['max_error']:.2f} | |Error| {percentiles} (mm)"
+        )
+        self.error_label.setText(summary)
+        print(summary)
\ No newline at end of file
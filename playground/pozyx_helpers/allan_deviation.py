@@ -0,0 +1,169 @@
+# Import Python-native modules
+import os
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Import custom modules
+from .run_io import iter_run_chunks, count_run_rows, run_name, DEFAULT_CHUNK_SIZE
+from .resampling import estimate_sample_rate
+
+# Number of log-spaced averaging times per decade
+DEFAULT_TAUS_PER_DECADE = 10
+
+
+def log_spaced_cluster_sizes(num_samples, taus_per_decade=DEFAULT_TAUS_PER_DECADE, max_cluster_size=None):
+    """
+    Returns log-spaced cluster sizes m (averaging time tau = m / fs) from 1 up to half the samples.
+
+    :param max_cluster_size: Largest cluster size (bounds the history kept when processing in chunks)
+    """
+    largest = num_samples // 2
+    if max_cluster_size is not None:
+        largest = min(largest, max_cluster_size)
+    if largest < 1:
+        raise ValueError("At least two samples are needed to compute the Allan deviation")
+
+    num_taus = int(np.ceil(np.log10(largest) * taus_per_decade)) + 1
+    return np.unique(np.round(np.logspace(0, np.log10(largest), num_taus)).astype(np.int64))
+
+
+class AllanDeviation(object):
+    """
+    Overlapping Allan deviation of a static capture, accumulated one chunk of samples at a time.
+
+    The samples are integrated into a phase series x with a cumulative sum, so every cluster size m costs a
+    single vectorized second difference x[i + 2m] - 2 x[i + m] + x[i] (O(n) per tau). Only the last 2 * max(m)
+    phase values are kept between chunks, so memory is bounded by the largest cluster size, not the capture.
+
+    The samples are taken as evenly spaced at the nominal interval tau0 (dropped pulses are not filled in).
+    """
+
+    def __init__(self, tau0, cluster_sizes):
+        """
+        :param tau0: Nominal sample interval (s)
+        :param cluster_sizes: Cluster sizes m (see log_spaced_cluster_sizes())
+        """
+        self.tau0 = tau0
+        self.cluster_sizes = np.asarray(cluster_sizes, dtype=np.int64)
+        self.sums = np.zeros(len(self.cluster_sizes))  # Sums of the squared second differences
+        self.counts = np.zeros(len(self.cluster_sizes), dtype=np.int64)
+        self.offset = None  # First sample, removed so the phase stays small (cancels in the differences)
+        self.phase_tail = None
+
+    def update(self, values):
+        """
+        Adds the next chunk of samples.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        if self.offset is None:
+            self.offset = values[0]
+            self.phase_tail = np.zeros(1)
+
+        num_old = len(self.phase_tail)
+        phase = np.concatenate((self.phase_tail, self.phase_tail[-1] + np.cumsum(values - self.offset) * self.tau0))
+        for index, m in enumerate(self.cluster_sizes):
+            # Second differences ending in the new phase values
+            start = max(num_old - 2 * m, 0)
+            if len(phase) - 2 * m <= start:
+                continue
+            differences = phase[start + 2 * m:] - 2 * phase[start + m:len(phase) - m] + phase[start:len(phase) - 2 * m]
+            self.sums[index] += np.dot(differences, differences)
+            self.counts[index] += len(differences)
+
+        self.phase_tail = phase[-2 * int(self.cluster_sizes.max()):]
+
+    def result(self):
+        """
+        :return: (taus (s), Allan deviations (units of the samples), number of terms averaged per tau),
+            only for the taus that have at least one term
+        """
+        valid = self.counts > 0
+        m = self.cluster_sizes[valid]
+        taus = m * self.tau0
+        variances = self.sums[valid] / (2 * taus ** 2 * self.counts[valid])
+        return taus, np.sqrt(variances), self.counts[valid]
+
+
+def allan_deviation(timesteps, distances, taus_per_decade=DEFAULT_TAUS_PER_DECADE, cluster_sizes=None):
+    """
+    Computes the overlapping Allan deviation of a static capture held in memory.
+
+    :param timesteps: Sample times (ms), used for the nominal sample rate
+    :param distances: Distances (mm)
+    :return: (taus (s), Allan deviations (mm), number of terms averaged per tau)
+    """
+    if cluster_sizes is None:
+        cluster_sizes = log_spaced_cluster_sizes(len(distances), taus_per_decade)
+    accumulator = AllanDeviation(1.0 / estimate_sample_rate(timesteps), cluster_sizes)
+    accumulator.update(distances)
+    return accumulator.result()
+
+
+def allan_deviation_of_run(
+    filepath, taus_per_decade=DEFAULT_TAUS_PER_DECADE, chunksize=DEFAULT_CHUNK_SIZE, max_cluster_size=None
+):
+    """
+    Computes the overlapping Allan deviation of a run file chunksize rows at a time.
+
+    The nominal sample rate is estimated from the first chunk.
+
+    :param max_cluster_size: Largest cluster size (defaults to chunksize, so at most 2 * chunksize phase
+        values are held on top of the chunk)
+    :return: (taus (s), Allan deviations (mm), number of terms averaged per tau)
+    """
+    if max_cluster_size is None:
+        max_cluster_size = chunksize
+    cluster_sizes = log_spaced_cluster_sizes(count_run_rows(filepath), taus_per_decade, max_cluster_size)
+
+    accumulator = None
+    for timesteps, distances in iter_run_chunks(filepath, chunksize):
+        if accumulator is None:
+            accumulator = AllanDeviation(1.0 / estimate_sample_rate(timesteps), cluster_sizes)
+        accumulator.update(distances)
+    return accumulator.result()
+
+
+def format_allan_table(taus, deviations, counts):
+    """
+    Formats Allan deviation results as a plain text table.
+    """
+    lines = [f"{'Tau (s)':>12} {'ADEV (mm)':>12} {'Terms':>10}"]
+    for tau, deviation, count in zip(taus, deviations, counts):
+        lines.append(f"{tau:>12.4g} {deviation:>12.4g} {count:>10d}")
+    return "\n".join(lines)
+
+
+def save_allan_plot(taus, deviations, filepath, output_dir, dpi=100):
+    """
+    Renders the Allan deviation of a run as a log-log .png (Agg, no windows) and writes its table as .csv.
+
+    White noise falls with a slope of -1/2, the flat bottom is the bias instability and a rising tail is drift.
+
+    :return: (.png file, .csv file)
+    """
+    name = run_name(filepath)
+
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.subplots()
+    ax.set_title(f"Overlapping Allan Deviation ({name})", fontsize=16, fontweight="bold")
+    ax.set_xlabel("Averaging Time Tau (s)")
+    ax.set_ylabel("Allan Deviation (mm)")
+    ax.loglog(taus, deviations, marker="o", markersize=3, color="blue", linewidth=1, label="ADEV")
+
+    # White noise reference line through the first point
+    ax.loglog(taus, deviations[0] * np.sqrt(taus[0] / taus), color="gray", linestyle="--",
+              linewidth=1, label="White Noise (slope -1/2)")
+    ax.grid(True, which="both", alpha=0.3)
+    ax.legend()
+
+    png_filename = os.path.join(output_dir, f"{name}_allan.png")
+    figure.savefig(png_filename, dpi=dpi, bbox_inches="tight")
+
+    csv_filename = os.path.join(output_dir, f"{name}_allan.csv")
+    np.savetxt(csv_filename, np.column_stack((taus, deviations)), delimiter=",",
+               header="Tau (s),Allan Deviation (mm)", comments="")
+    return png_filename, csv_filename
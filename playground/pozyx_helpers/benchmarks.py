@@ -0,0 +1,264 @@
+# Import Python-native modules
+import io
+import os
+import gc
+import json
+import time
+import datetime
+import platform
+import subprocess
+import tracemalloc
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Import custom modules
+from .run_io import load_run, iter_run_chunks, open_run_file, run_name, compression_extension, zstandard
+from .synthetic import SyntheticRunGenerator, write_synthetic_run
+from .spectral_analysis import compute_spectrum
+from .filters import filter_run
+from .kalman import kalman_filter
+from .outliers import hampel_filter
+from .pipeline import FilterPipeline, HampelStage, IirStage, DecimateStage
+
+# Dataset sizes (samples) run by default, 10 ** 7 and 10 ** 8 have to be asked for (minutes and GBs each)
+DEFAULT_SIZES = (10 ** 4, 10 ** 5, 10 ** 6)
+
+# Where generated datasets are kept between runs, and the results history
+DEFAULT_DATA_DIR = "benchmark_data/"
+DEFAULT_HISTORY_FILE = "benchmark_history.json"
+
+# A result counts as a regression when it is this much slower (or uses this much more memory) than the baseline
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+# Slowdowns smaller than this (s) are timer noise, not regressions
+MIN_REGRESSION_SECONDS = 0.01
+
+# Nominal sample rate of the generated datasets (Hz)
+BENCHMARK_SAMPLE_RATE = 62.0
+
+# Codecs and levels compared by the compression benchmark (zstd is skipped without the zstandard package)
+COMPRESSION_LEVELS = {"gzip": (1, 6, 9), "zstd": (1, 3, 9)}
+
+# Bytes written at a time by the compression benchmark
+COMPRESSION_BLOCK_SIZE = 1024 * 1024
+
+
+def _render_figure(timesteps, distances):
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.subplots()
+    ax.plot(timesteps, distances, color="blue", linewidth=1)
+    figure.savefig(io.BytesIO(), format="png", dpi=100)
+
+
+def _filter_fft(timesteps, distances):
+    spectrum = compute_spectrum(timesteps, distances, workers=1)
+    spectrum.filtered_signal(spectrum.frequency_mask(band=(0, 5)))
+
+
+def _pipeline_decimate(timesteps, distances):
+    pipeline = FilterPipeline(
+        [HampelStage(), IirStage("lowpass", 4, 5, BENCHMARK_SAMPLE_RATE), DecimateStage(4)]
+    )
+    pipeline.process(timesteps, distances)
+
+
+# Benchmark name -> function(paths, timesteps, distances), paths maps "csv" / "npy" to the dataset files
+BENCHMARKS = {
+    "load_csv": lambda paths, t, d: load_run(paths["csv"]),
+    "load_npy": lambda paths, t, d: load_run(paths["npy"]),
+    "fft_psd": lambda paths, t, d: compute_spectrum(t, d, workers=1).psd(dc=False),
+    "filter_iir": lambda paths, t, d: filter_run(t, d, "lowpass", 4, 5),
+    "filter_kalman": lambda paths, t, d: kalman_filter(t, d),
+    "filter_hampel": lambda paths, t, d: hampel_filter(d),
+    "filter_fft": lambda paths, t, d: _filter_fft(t, d),
+    "pipeline_decimate": lambda paths, t, d: _pipeline_decimate(t, d),
+    "render_figure": lambda paths, t, d: _render_figure(t, d),
+}
+
+
+def prepare_dataset(num_samples, data_dir=DEFAULT_DATA_DIR):
+    """
+    Generates (or reuses) the .csv and .npy synthetic runs of one size.
+
+    :return: Dictionary of "csv" / "npy" -> file path
+    """
+    os.makedirs(data_dir, exist_ok=True)
+    paths = {}
+    for extension in ("csv", "npy"):
+        paths[extension] = os.path.join(data_dir, f"bench_{num_samples}.{extension}")
+        if not os.path.exists(paths[extension]):
+            write_synthetic_run(paths[extension], num_samples, SyntheticRunGenerator(sample_rate=BENCHMARK_SAMPLE_RATE))
+    return paths
+
+
+def measure(function, repeats=3):
+    """
+    Times a function (best of repeats) and measures its peak traced memory in a separate call, so tracing
+    doesn't slow the timed calls down.
+
+    :return: (wall time (s), peak memory (MB))
+    """
+    wall_times = []
+    for _ in range(repeats):
+        gc.collect()
+        start_time = time.perf_counter()
+        function()
+        wall_times.append(time.perf_counter() - start_time)
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return min(wall_times), peak / 1e6
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, names=None, data_dir=DEFAULT_DATA_DIR, repeats=3):
+    """
+    Runs the benchmarks on generated datasets of every size.
+
+    :param names: Benchmarks to run (defaults to all of BENCHMARKS)
+    :return: List of {"name", "size", "wall_s", "peak_mb"} results
+    """
+    names = list(BENCHMARKS) if names is None else names
+    for name in names:
+        if name not in BENCHMARKS:
+            raise ValueError(f"Invalid benchmark '{name}', expected one of {tuple(BENCHMARKS)}")
+
+    results = []
+    for size in sizes:
+        paths = prepare_dataset(size, data_dir)
+        timesteps, distances = load_run(paths["npy"])
+        for name in names:
+            wall_s, peak_mb = measure(lambda: BENCHMARKS[name](paths, timesteps, distances), repeats)
+            results.append({"name": name, "size": size, "wall_s": wall_s, "peak_mb": peak_mb})
+            print(f"{name:>20} {size:>11d} samples: {wall_s:10.4f} s {peak_mb:10.1f} MB")
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(history_file=DEFAULT_HISTORY_FILE):
+    """
+    Returns the list of recorded benchmark runs (oldest first).
+    """
+    if not os.path.exists(history_file):
+        return []
+    with open(history_file) as file:
+        return json.load(file)
+
+
+def append_history(results, history_file=DEFAULT_HISTORY_FILE, label=None):
+    """
+    Records a benchmark run (with its commit and environment) in the JSON history.
+
+    :return: The recorded entry
+    """
+    entry = {
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "label": label,
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "machine": platform.machine(),
+        "results": results,
+    }
+    history = load_history(history_file)
+    history.append(entry)
+    with open(history_file, "w") as file:
+        json.dump(history, file, indent=2)
+    return entry
+
+
+def compare_runs(baseline, current, threshold=DEFAULT_REGRESSION_THRESHOLD, min_seconds=MIN_REGRESSION_SECONDS):
+    """
+    Compares the results of two history entries benchmark by benchmark.
+
+    :return: List of {"name", "size", "wall_ratio", "peak_ratio", "regression"} (ratios are current / baseline)
+    """
+    baseline_results = {(result["name"], result["size"]): result for result in baseline["results"]}
+    comparisons = []
+    for result in current["results"]:
+        base = baseline_results.get((result["name"], result["size"]))
+        if base is None:
+            continue
+        wall_ratio = result["wall_s"] / base["wall_s"] if base["wall_s"] > 0 else np.inf
+        peak_ratio = result["peak_mb"] / base["peak_mb"] if base["peak_mb"] > 0 else 1.0
+        comparisons.append({
+            "name": result["name"],
+            "size": result["size"],
+            "wall_ratio": wall_ratio,
+            "peak_ratio": peak_ratio,
+            "regression": (
+                (wall_ratio > 1 + threshold and result["wall_s"] - base["wall_s"] > min_seconds)
+                or peak_ratio > 1 + threshold
+            ),
+        })
+    return comparisons
+
+
+def _write_compressed(data, filepath, level):
+    with open_run_file(filepath, "wb", level) as file:
+        for start in range(0, len(data), COMPRESSION_BLOCK_SIZE):
+            file.write(data[start:start + COMPRESSION_BLOCK_SIZE])
+
+
+def _read_chunks(filepath):
+    for _ in iter_run_chunks(filepath):
+        pass
+
+
+def benchmark_compression(filepaths, levels=COMPRESSION_LEVELS, output_dir=DEFAULT_DATA_DIR, repeats=1):
+    """
+    Measures compression ratio and throughput of every codec and level on run .csv files.
+
+    Writing streams the file through open_run_file() block by block, reading parses it chunk by chunk with
+    iter_run_chunks() (the loaders' path), so the peak memory shows that decompression stays bounded.
+    Throughputs are in MB of .csv per second, plain .csv is the baseline row.
+
+    :param filepaths: Run .csv files (real captures or prepare_dataset() ones, may be compressed already)
+    :return: List of {"file", "codec", "level", "ratio", "write_mb_s", "read_mb_s", "read_peak_mb"} results
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    results = []
+    for filepath in filepaths:
+        with open_run_file(filepath, "rb") as file:
+            data = file.read()
+        size_mb = len(data) / 1e6
+
+        for codec, codec_levels in [(None, (None,))] + list(levels.items()):
+            if codec == "zstd" and zstandard is None:
+                print("Skipping zstd (zstandard isn't installed)")
+                continue
+            for level in codec_levels:
+                output = os.path.join(
+                    output_dir, f"{run_name(filepath)}_{codec or 'csv'}{level or ''}.csv{compression_extension(codec)}"
+                )
+                write_s, _ = measure(lambda: _write_compressed(data, output, level), repeats)
+                read_s, read_peak_mb = measure(lambda: _read_chunks(output), repeats)
+                result = {
+                    "file": os.path.basename(filepath),
+                    "codec": codec or "none",
+                    "level": level,
+                    "ratio": len(data) / os.path.getsize(output),
+                    "write_mb_s": size_mb / write_s,
+                    "read_mb_s": size_mb / read_s,
+                    "read_peak_mb": read_peak_mb,
+                }
+                os.remove(output)
+                results.append(result)
+                print(f"{result['file']:>24} {result['codec']:>5} {str(level or '-'):>3}: ratio {result['ratio']:5.2f} "
+                      f"\t write {result['write_mb_s']:7.1f} MB/s \t read {result['read_mb_s']:6.1f} MB/s "
+                      f"\t read peak {read_peak_mb:6.1f} MB")
+    return results
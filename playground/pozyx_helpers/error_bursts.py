@@ -0,0 +1,205 @@
+# Import Python-native modules
+import os
+import csv
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from dateutil.tz import tzlocal
+
+# Import custom modules
+from .run_io import run_name, open_run_file
+
+# Columns of an error burst .csv file (a plain error file has "Timestamp (ms)" and "Error Message" only)
+ERROR_BURST_HEADER = ["First Timestamp", "Last Timestamp", "Error Code", "Error Message", "Count"]
+
+# Longest stretch of pulses (at ~62 Hz about a second) a burst goes on without re-reading the error code
+MAX_QUERY_INTERVAL = 64
+
+# A run of identical failed rangings: first and last pulse time, device error code (None when it couldn't be
+# read), message and number of pulses
+ErrorBurst = namedtuple("ErrorBurst", ["first_timestamp", "last_timestamp", "code", "message", "count"])
+
+
+class ErrorBurstAggregator(object):
+    """
+    Run-length encodes consecutive failed rangings with the same error code into ErrorBursts.
+
+    While a burst goes on, the error code only has to be read (a getErrorCode() round-trip to the device) on
+    the pulses needs_code() asks for: every pulse at first, then every 2, 4, ... up to max_query_interval pulses
+    as long as the code stays the same. Pulses in between are added with add_repeat(), so a code change is
+    noticed at most max_query_interval pulses late (those pulses are counted under the old code).
+    """
+
+    def __init__(self, max_query_interval=MAX_QUERY_INTERVAL):
+        self.max_query_interval = max_query_interval
+        self.bursts = []  # Closed bursts, oldest first
+        self.first_timestamp = None  # Open burst (None when there is none)
+        self.last_timestamp = None
+        self.code = None
+        self.message = None
+        self.count = 0
+        self.query_interval = 1  # Pulses between two error code reads of the open burst
+        self.next_query = 0  # Count of the open burst at which the code is read again
+
+    @property
+    def in_burst(self):
+        return self.count > 0
+
+    def needs_code(self):
+        """
+        Returns True when the error code of the next failed ranging has to be read from the device.
+        """
+        return self.count == 0 or self.count >= self.next_query
+
+    def add_error(self, timestamp, code, message):
+        """
+        Adds a failed ranging whose error code was read (needs_code() was True).
+
+        :return: The burst it closed (the code changed), or None
+        """
+        if self.in_burst and code == self.code:
+            self.query_interval = min(self.query_interval * 2, self.max_query_interval)
+            self._extend(timestamp)
+            self.next_query = self.count + self.query_interval
+            return None
+
+        closed = self.close()
+        self.first_timestamp = self.last_timestamp = timestamp
+        self.code = code
+        self.message = message
+        self.count = 1
+        self.query_interval = 1
+        self.next_query = 1
+        return closed
+
+    def add_repeat(self, timestamp):
+        """
+        Adds a failed ranging to the open burst without reading its error code (needs_code() was False).
+        """
+        self._extend(timestamp)
+
+    def _extend(self, timestamp):
+        self.last_timestamp = timestamp
+        self.count += 1
+
+    def close(self):
+        """
+        Ends the open burst (on a successful ranging or at the end of the run).
+
+        :return: The closed ErrorBurst, or None if there was no open burst
+        """
+        if not self.in_burst:
+            return None
+        burst = ErrorBurst(self.first_timestamp, self.last_timestamp, self.code, self.message, self.count)
+        self.bursts.append(burst)
+        self.count = 0
+        return burst
+
+
+def error_burst_row(burst):
+    """
+    Returns the .csv row of an ErrorBurst (an unread error code is left empty).
+    """
+    code = "" if burst.code is None else burst.code
+    return [burst.first_timestamp, burst.last_timestamp, code, burst.message, burst.count]
+
+
+def convertErrorBurstsToCSV(bursts, filename="error.csv"):
+    """
+    Writes ErrorBursts to an error burst .csv file.
+    """
+    with open_run_file(filename, "w") as file:
+        writer = csv.writer(file)
+        writer.writerow(ERROR_BURST_HEADER)
+        writer.writerows(error_burst_row(burst) for burst in bursts)
+
+
+def wall_clock_to_epoch_ms(stamps):
+    """
+    Converts wall-clock error stamps (str(datetime.now()), naive local time) to ms since the epoch, the basis
+    of datetime.now().timestamp().
+
+    :param stamps: Series of wall-clock stamps
+    :return: float64 array of ms since the epoch
+    """
+    wall_clock = pd.to_datetime(stamps, format="ISO8601")  # str(datetime) drops zero microseconds
+    # Stamps in the repeated hour at the end of DST are taken as standard time
+    wall_clock = wall_clock.dt.tz_localize(
+        tzlocal(), ambiguous=np.zeros(len(wall_clock), dtype=bool), nonexistent="shift_forward"
+    )
+    return (wall_clock - pd.Timestamp(0, tz="UTC")).dt.total_seconds().to_numpy() * 1000.0
+
+
+def epoch_ms_to_wall_clock(epoch_ms):
+    """
+    Converts ms since the epoch back to naive local wall-clock times (see wall_clock_to_epoch_ms()).
+    """
+    wall_clock = pd.to_datetime(np.asarray(epoch_ms, dtype=np.float64), unit="ms", utc=True)
+    return wall_clock.tz_convert(tzlocal()).tz_localize(None).round("us")
+
+
+def is_error_burst_file(errorfile):
+    """
+    Returns True if an error .csv file holds ErrorBursts rather than one row per failed ranging.
+    """
+    with open_run_file(errorfile) as file:
+        header = next(csv.reader(file), [])
+    return header == ERROR_BURST_HEADER
+
+
+def expand_error_bursts(df):
+    """
+    Expands error bursts back to one row per failed ranging, spread evenly from the first to the last
+    timestamp of each burst.
+
+    :param df: DataFrame of an error burst file (ERROR_BURST_HEADER columns)
+    :return: DataFrame with "Timestamp (ms)" and "Error Message" columns, like a plain error file
+    """
+    counts = df["Count"].to_numpy(dtype=np.int64)
+    first = df["First Timestamp"]
+    last = df["Last Timestamp"]
+    is_wall_clock = len(df) > 0 and not pd.api.types.is_numeric_dtype(first)
+    if is_wall_clock:
+        # Pozyx1DCapture stamps errors with the wall clock, interpolate in ms since the epoch
+        first = wall_clock_to_epoch_ms(first)
+        last = wall_clock_to_epoch_ms(last)
+    first = np.asarray(first, dtype=np.float64)
+    last = np.asarray(last, dtype=np.float64)
+
+    # Position of every pulse within its burst, 0 for the first and 1 for the last
+    burst_index = np.repeat(np.arange(len(df)), counts)
+    starts = np.cumsum(counts) - counts
+    positions = np.arange(counts.sum()) - starts[burst_index]
+    fractions = positions / np.maximum(counts[burst_index] - 1, 1)
+    timestamps = first[burst_index] + fractions * (last - first)[burst_index]
+
+    if is_wall_clock:
+        timestamps = epoch_ms_to_wall_clock(timestamps)
+    messages = df["Error Message"].to_numpy()[burst_index]
+    return pd.DataFrame({"Timestamp (ms)": timestamps, "Error Message": messages})
+
+
+def read_error_file(errorfile):
+    """
+    Reads an error .csv file as one row per failed ranging, expanding it if it holds error bursts.
+
+    :return: DataFrame of the timestamp and error message columns
+    """
+    burst_file = is_error_burst_file(errorfile)
+    with open_run_file(errorfile) as file:
+        if burst_file:
+            return expand_error_bursts(pd.read_csv(file))
+        return pd.read_csv(file, usecols=[0, 1])
+
+
+def expand_error_burst_file(burstfile, output_file=None):
+    """
+    Expands an error burst .csv file to a plain error file with one row per failed ranging.
+
+    :param output_file: Defaults to <burst file>_expanded.csv next to the input
+    :return: Path of the expanded file
+    """
+    if output_file is None:
+        output_file = os.path.join(os.path.dirname(burstfile), run_name(burstfile) + "_expanded.csv")
+    read_error_file(burstfile).to_csv(output_file, index=False)
+    return output_file
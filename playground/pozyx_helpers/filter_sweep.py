@@ -0,0 +1,243 @@
+# Import Python-native modules
+import os
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from scipy.signal import correlate, correlation_lags
+
+# Import custom modules
+from .run_io import load_run, run_name
+from .resampling import estimate_sample_rate
+from .filters import filter_run
+from .kalman import kalman_smooth
+from .outliers import hampel_filter
+from .spectral_analysis import compute_spectrum
+from .ground_truth import align_ground_truth
+
+# Filter methods a sweep configuration can use
+SWEEP_METHODS = ("iir", "kalman", "median", "fft")
+
+# Metrics results can be ranked by (lag is ranked by its absolute value)
+RANK_METRICS = ("rmse", "max_error", "lag_ms")
+
+# Lags beyond this are not searched for when scoring
+MAX_LAG_MS = 1000
+
+# Run and ground truth loaded once per worker process
+_worker_data = {}
+
+
+def default_grid():
+    """
+    Returns the default grid of filter configurations (one dict per configuration).
+    """
+    configs = []
+    for order in (2, 4, 6):
+        for cutoff in (1, 2, 5, 10, 15):
+            configs.append({"method": "iir", "filter_type": "lowpass", "order": order, "cutoff": cutoff})
+    for measurement_var in (25, 100, 400):
+        for accel_var in (1e3, 1e4, 1e5, 1e6):
+            for smooth in (False, True):
+                configs.append(
+                    {"method": "kalman", "measurement_var": measurement_var, "accel_var": accel_var, "smooth": smooth}
+                )
+    # n_sigmas = 0 replaces every sample by its window median (a plain rolling median)
+    for window in (5, 9, 15, 31):
+        for n_sigmas in (0, 3):
+            configs.append({"method": "median", "window": window, "n_sigmas": n_sigmas})
+    # Keep the FFT bins whose PSD is at least this fraction of the largest one (w/o DC offset)
+    for psd_fraction in (0.001, 0.01, 0.05, 0.1):
+        configs.append({"method": "fft", "psd_fraction": psd_fraction})
+    return configs
+
+
+def config_key(config):
+    """
+    Returns a stable string identifying a configuration (used as the cache key).
+    """
+    return json.dumps(config, sort_keys=True)
+
+
+def apply_config(timesteps, distances, config):
+    """
+    Filters a run with one sweep configuration.
+
+    :return: (timesteps (ms), filtered distances (mm)), the timesteps are uniform for resampling methods
+    """
+    method = config["method"]
+    if method == "iir":
+        return filter_run(timesteps, distances, config["filter_type"], config["order"], config["cutoff"])
+    if method == "kalman":
+        filtered, smoothed, _ = kalman_smooth(timesteps, distances, config["measurement_var"], config["accel_var"])
+        return timesteps, smoothed if config["smooth"] else filtered
+    if method == "median":
+        return timesteps, hampel_filter(distances, config["window"], config["n_sigmas"])[0]
+    if method == "fft":
+        spectrum = compute_spectrum(timesteps, distances, workers=1)
+        psd_wo_dc = spectrum.psd(dc=False)
+        mask = spectrum.frequency_mask(psd_threshold=config["psd_fraction"] * psd_wo_dc[1:].max())
+        return spectrum.filtered_signal(mask)
+    raise ValueError(f"Invalid sweep method '{method}', expected one of {SWEEP_METHODS}")
+
+
+def estimate_lag(timesteps, values, reference_timesteps, reference_values, max_lag_ms=MAX_LAG_MS):
+    """
+    Estimates how far (ms) a signal lags a reference signal from their cross-correlation.
+
+    :return: Lag (ms), positive when the signal is late, or None when the reference is constant
+    """
+    fs = estimate_sample_rate(timesteps)
+    grid = np.arange(timesteps[0], timesteps[-1], 1000.0 / fs)
+    signal = np.interp(grid, timesteps, values)
+    reference = np.interp(grid, reference_timesteps, reference_values)
+    signal -= signal.mean()
+    reference -= reference.mean()
+    if not np.any(reference):
+        return None
+
+    correlation = correlate(signal, reference, mode="full", method="fft")
+    lags = correlation_lags(len(signal), len(reference), mode="full")
+    in_range = np.abs(lags) <= max_lag_ms * fs / 1000
+    best = np.argmax(correlation[in_range])
+    return float(lags[in_range][best] * 1000.0 / fs)
+
+
+def score_filtered(timesteps, distances, ground_truth_timesteps, ground_truth_distances):
+    """
+    Scores filtered distances against the ground truth, interpolated onto the filtered timesteps.
+
+    :return: Dictionary with "rmse" (mm), "max_error" (mm) and "lag_ms" (ms, None for a constant ground truth)
+    """
+    # Only score where the ground truth exists
+    overlap, ground_truth = align_ground_truth(timesteps, ground_truth_timesteps, ground_truth_distances)
+    timesteps = timesteps[overlap]
+    distances = distances[overlap]
+    if len(timesteps) < 2:
+        raise ValueError("The run and the ground truth don't overlap in time")
+
+    errors = distances - ground_truth
+    return {
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "max_error": float(np.max(np.abs(errors))),
+        "lag_ms": estimate_lag(timesteps, distances, ground_truth_timesteps, ground_truth_distances),
+    }
+
+
+def _file_fingerprint(filepath):
+    """
+    Identifies a file version, so cached results of an edited file are not reused.
+    """
+    stat = os.stat(filepath)
+    return f"{os.path.abspath(filepath)}:{stat.st_mtime_ns}:{stat.st_size}"
+
+
+def _init_worker(run_path, ground_truth_path):
+    """
+    Loads the run and the ground truth once per worker process.
+    """
+    _worker_data["run"] = load_run(run_path)
+    _worker_data["ground_truth"] = load_run(ground_truth_path)
+
+
+def _evaluate(config):
+    """
+    Filters and scores one configuration in a worker process.
+    """
+    start_time = time.perf_counter()
+    result = {"config": config}
+    try:
+        timesteps, distances = apply_config(*_worker_data["run"], config)
+        result.update(score_filtered(np.asarray(timesteps), np.asarray(distances), *_worker_data["ground_truth"]))
+    except ValueError as e:
+        result["error"] = str(e)
+    result["elapsed_s"] = time.perf_counter() - start_time
+    return result
+
+
+def load_cached_results(cache_path, fingerprint):
+    """
+    Reads the results of a previous (possibly interrupted) sweep from a JSON lines cache.
+
+    Records of other run/ground truth versions, failed configurations (written by older sweeps) and a
+    truncated last line are ignored.
+
+    :return: Dictionary of config key -> result
+    """
+    results = {}
+    if not os.path.exists(cache_path):
+        return results
+
+    with open(cache_path) as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get("fingerprint") == fingerprint and "error" not in record:
+                results[config_key(record["config"])] = record
+    return results
+
+
+def rank_results(results, rank_by="rmse"):
+    """
+    Sorts sweep results from best to worst by one metric (failed configurations last).
+    """
+    if rank_by not in RANK_METRICS:
+        raise ValueError(f"Invalid rank metric '{rank_by}', expected one of {RANK_METRICS}")
+
+    def sort_key(result):
+        value = result.get(rank_by)
+        if value is None:
+            return (1, 0.0)
+        return (0, abs(value))
+
+    return sorted(results, key=sort_key)
+
+
+def sweep_filters(run_path, ground_truth_path, configs=None, cache_path=None, workers=None, rank_by="rmse"):
+    """
+    Evaluates a grid of filter configurations on a run across a process pool, scored against ground truth.
+
+    Every scored configuration is appended to a JSON lines cache right away, so an interrupted sweep
+    resumes where it stopped and only evaluates the missing configurations. Failed configurations aren't
+    cached, so they are tried again by the next sweep (e.g. after fixing their cause).
+
+    :param run_path: Run .csv (or .npy) file
+    :param ground_truth_path: Ground truth .csv file (timesteps (ms), distances (mm))
+    :param configs: List of configuration dicts (defaults to default_grid())
+    :param cache_path: JSON lines cache (defaults to <run name>_sweep.jsonl next to the run)
+    :param workers: Number of worker processes (defaults to the number of CPUs)
+    :param rank_by: One of RANK_METRICS
+    :return: Results ranked from best to worst
+    """
+    if configs is None:
+        configs = default_grid()
+    if cache_path is None:
+        cache_path = os.path.join(os.path.dirname(run_path), run_name(run_path) + "_sweep.jsonl")
+
+    fingerprint = f"{_file_fingerprint(run_path)}|{_file_fingerprint(ground_truth_path)}"
+    results = load_cached_results(cache_path, fingerprint)
+    pending = [config for config in configs if config_key(config) not in results]
+    print(f"Sweep: {len(configs) - len(pending)} cached, {len(pending)} to evaluate")
+
+    if pending:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(run_path, ground_truth_path)
+        ) as executor, open(cache_path, "a+") as cache:
+            # Terminate a line left truncated by an interrupted sweep
+            if cache.tell() > 0:
+                cache.seek(cache.tell() - 1)
+                if cache.read(1) != "\n":
+                    cache.write("\n")
+
+            futures = [executor.submit(_evaluate, config) for config in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                result["fingerprint"] = fingerprint
+                if "error" not in result:
+                    cache.write(json.dumps(result) + "\n")
+                    cache.flush()
+                results[config_key(result["config"])] = result
+
+    return rank_results([results[config_key(config)] for config in configs], rank_by)
@@ -0,0 +1,88 @@
+# Import Python-native modules
+from functools import lru_cache
+import numpy as np
+from scipy.signal import butter, sosfiltfilt
+
+# Import custom modules
+from .resampling import estimate_sample_rate, resample_uniform
+
+# Filter types accepted by design_filter()
+FILTER_TYPES = ("lowpass", "highpass", "bandpass", "notch")
+
+# Quality factor (center / width) of a notch given by its center frequency only
+NOTCH_Q = 10.0
+
+# Maximum number of memoized filter designs
+FILTER_CACHE_SIZE = 64
+
+
+def _normalize_cutoff(filter_type, cutoff):
+    """
+    Returns the cutoff as a hashable float (lowpass, highpass) or a (low, high) tuple of floats.
+    """
+    if filter_type in ("lowpass", "highpass"):
+        return float(cutoff)
+
+    if filter_type == "notch" and np.ndim(cutoff) == 0:
+        # Center frequency only, the stop band is center / NOTCH_Q wide
+        half_width = float(cutoff) / (2 * NOTCH_Q)
+        return (float(cutoff) - half_width, float(cutoff) + half_width)
+
+    low, high = cutoff
+    if not 0 < low < high:
+        raise ValueError(f"Invalid {filter_type} cutoff {cutoff}, expected 0 < low < high")
+    return (float(low), float(high))
+
+
+@lru_cache(maxsize=FILTER_CACHE_SIZE)
+def _design_sos(filter_type, order, cutoff, fs):
+    btype = "bandstop" if filter_type == "notch" else filter_type
+    return butter(order, cutoff, btype=btype, output="sos", fs=fs)
+
+
+def design_filter(filter_type, order, cutoff, fs):
+    """
+    Designs a Butterworth filter as second-order sections (SOS).
+
+    SOS stay numerically stable at high orders where the transfer function (ba) form does not. Designs
+    are memoized by (type, order, cutoff, fs), so re-filtering with the same settings costs nothing.
+
+    :param filter_type: One of FILTER_TYPES
+    :param order: Filter order (band filters have twice as many poles)
+    :param cutoff: Cutoff (Hz) for low/high-pass, (low, high) (Hz) for band-pass and notch, or the center
+        frequency (Hz) of a notch
+    :param fs: Sample rate (Hz)
+    :return: SOS array of shape (sections, 6)
+    """
+    if filter_type not in FILTER_TYPES:
+        raise ValueError(f"Invalid filter type '{filter_type}', expected one of {FILTER_TYPES}")
+    # Copy of the cached design (scipy's sosfilt can't take read-only arrays)
+    return _design_sos(filter_type, int(order), _normalize_cutoff(filter_type, cutoff), float(fs)).copy()
+
+
+def apply_filter(values, filter_type, order, cutoff, fs, axis=-1):
+    """
+    Zero-phase filters a signal, or a 2-D batch of signals in one call, with sosfiltfilt.
+
+    Filtering forwards and backwards doubles the attenuation and cancels the phase lag, so filtered
+    distances line up in time with the raw ones.
+
+    :param values: 1-D signal, or 2-D array with one run per row (see axis)
+    :param axis: Axis along which the samples run
+    :return: Filtered array of the same shape
+    """
+    sos = design_filter(filter_type, order, cutoff, fs)
+    return sosfiltfilt(sos, np.asarray(values, dtype=np.float64), axis=axis)
+
+
+def filter_run(timesteps, distances, filter_type, order, cutoff, fs=None):
+    """
+    Resamples a jittery capture onto a uniform grid and zero-phase filters it.
+
+    :param fs: Sample rate (Hz) of the uniform grid, defaults to the estimated capture rate
+    :return: (uniform timesteps (ms), filtered distances (mm))
+    """
+    if fs is None:
+        fs = estimate_sample_rate(timesteps)
+    uniform_timesteps, uniform_distances = resample_uniform(timesteps, distances, fs=fs)
+    return uniform_timesteps, apply_filter(uniform_distances, filter_type, order, cutoff, fs)
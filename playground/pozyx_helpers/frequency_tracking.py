@@ -0,0 +1,84 @@
+# Import Python-native modules
+import numpy as np
+
+
+class SlidingDftTracker(object):
+    """
+    Tracks the dominant frequency of a live signal with a sliding DFT.
+
+    Each new sample updates the selected DFT bins of the last window_length samples in O(bins):
+        S_k(n) = (S_k(n - 1) + x(n) - x(n - N)) * exp(2j * pi * k / N)
+    so no full FFT is recomputed per sample. The bins are recomputed exactly every resync_interval
+    samples to stop floating point drift from accumulating.
+    """
+
+    def __init__(self, fs, window_length=256, bins=None, resync_interval=None):
+        """
+        :param fs: Nominal sample rate (Hz)
+        :param window_length: Number of samples (N) in the sliding window
+        :param bins: DFT bins to track, defaults to every bin except DC (1 .. N // 2)
+        :param resync_interval: Samples between exact recomputations (defaults to 100 * N)
+        """
+        self.fs = fs
+        self.window_length = window_length
+        self.bins = np.arange(1, window_length // 2 + 1) if bins is None else np.asarray(bins)
+        self.frequencies = self.bins * fs / window_length
+        self.resync_interval = 100 * window_length if resync_interval is None else resync_interval
+
+        self.twiddles = np.exp(2j * np.pi * self.bins / window_length)
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the window and the tracked bins.
+        """
+        self.buffer = np.zeros(self.window_length)  # Ring buffer of the last N samples
+        self.index = 0  # Position of the oldest sample in the ring buffer
+        self.num_samples = 0
+        self.spectrum = np.zeros(len(self.bins), dtype=np.complex128)
+
+    @property
+    def ready(self):
+        """
+        True once a whole window of samples has been seen.
+        """
+        return self.num_samples >= self.window_length
+
+    def update(self, sample):
+        """
+        Adds one sample and updates the tracked bins.
+        """
+        oldest = self.buffer[self.index]
+        self.buffer[self.index] = sample
+        self.index = (self.index + 1) % self.window_length
+        self.num_samples += 1
+
+        if self.num_samples % self.resync_interval == 0:
+            self.resync()
+        else:
+            self.spectrum = (self.spectrum + (sample - oldest)) * self.twiddles
+
+    def resync(self):
+        """
+        Recomputes the tracked bins exactly from the samples in the window.
+        """
+        window = np.roll(self.buffer, -self.index)  # Oldest sample first
+        n = np.arange(self.window_length)
+        kernel = np.exp(-2j * np.pi * np.outer(self.bins, n) / self.window_length)
+        self.spectrum = kernel @ window
+
+    def magnitudes(self):
+        """
+        Magnitudes of the tracked bins, normalized by the window length.
+        """
+        return np.abs(self.spectrum) / self.window_length
+
+    def dominant(self):
+        """
+        Returns (frequency (Hz), magnitude) of the strongest tracked bin, or (None, None) until ready.
+        """
+        if not self.ready:
+            return None, None
+        magnitudes = self.magnitudes()
+        index = np.argmax(magnitudes)
+        return self.frequencies[index], magnitudes[index]
@@ -0,0 +1,89 @@
+# Import Python-native modules
+import numpy as np
+
+# Ways of matching ground truth points to Pozyx samples in time
+ALIGN_METHODS = ("interp", "asof")
+
+# Percentiles of the absolute error reported by compute_error_metrics()
+ERROR_PERCENTILES = (50, 90, 95, 99)
+
+
+def align_ground_truth(timesteps, ground_truth_timesteps, ground_truth_distances, method="interp", tolerance_ms=None):
+    """
+    Matches a ground truth series to Pozyx sample times (vectorized, O(n log m)).
+
+    "interp" linearly interpolates the ground truth at each sample time. "asof" takes the latest ground truth
+    point at or before each sample time (a sorted as-of merge), optionally no older than tolerance_ms.
+    Samples outside the ground truth's time range (or beyond the tolerance) are not matched.
+
+    :param timesteps: Pozyx sample times (ms)
+    :param ground_truth_timesteps: Ground truth times (ms), sorted if they aren't already
+    :param ground_truth_distances: Ground truth distances (mm)
+    :param method: One of ALIGN_METHODS
+    :return: (boolean mask of the matched samples, ground truth distance of every matched sample)
+    """
+    if method not in ALIGN_METHODS:
+        raise ValueError(f"Invalid alignment method '{method}', expected one of {ALIGN_METHODS}")
+
+    timesteps = np.asarray(timesteps, dtype=np.float64)
+    ground_truth_timesteps = np.asarray(ground_truth_timesteps, dtype=np.float64)
+    ground_truth_distances = np.asarray(ground_truth_distances, dtype=np.float64)
+    if len(ground_truth_timesteps) == 0:
+        return np.zeros(len(timesteps), dtype=bool), np.empty(0)
+
+    if np.any(np.diff(ground_truth_timesteps) < 0):
+        order = np.argsort(ground_truth_timesteps, kind="stable")
+        ground_truth_timesteps = ground_truth_timesteps[order]
+        ground_truth_distances = ground_truth_distances[order]
+
+    if method == "interp":
+        matched = (timesteps >= ground_truth_timesteps[0]) & (timesteps <= ground_truth_timesteps[-1])
+        return matched, np.interp(timesteps[matched], ground_truth_timesteps, ground_truth_distances)
+
+    # Index of the latest ground truth point at or before each sample
+    indices = np.searchsorted(ground_truth_timesteps, timesteps, side="right") - 1
+    matched = indices >= 0
+    if tolerance_ms is not None:
+        matched &= timesteps - ground_truth_timesteps[np.maximum(indices, 0)] <= tolerance_ms
+    return matched, ground_truth_distances[indices[matched]]
+
+
+def compute_error_metrics(errors):
+    """
+    Summarizes per-sample errors (measured - ground truth).
+
+    :return: Dictionary with the sample count, bias (mean error), RMSE, MAE, max absolute error and the
+        ERROR_PERCENTILES of the absolute error (keys "p50", "p90", ...), all in mm
+    """
+    errors = np.asarray(errors, dtype=np.float64)
+    if len(errors) == 0:
+        raise ValueError("No samples were matched to the ground truth")
+
+    absolute_errors = np.abs(errors)
+    metrics = {
+        "count": len(errors),
+        "bias": float(errors.mean()),
+        "rmse": float(np.sqrt(np.mean(errors ** 2))),
+        "mae": float(absolute_errors.mean()),
+        "max_error": float(absolute_errors.max()),
+    }
+    for percentile, value in zip(ERROR_PERCENTILES, np.percentile(absolute_errors, ERROR_PERCENTILES)):
+        metrics[f"p{percentile}"] = float(value)
+    return metrics
+
+
+def compare_to_ground_truth(
+    timesteps, distances, ground_truth_timesteps, ground_truth_distances, method="interp", tolerance_ms=None
+):
+    """
+    Aligns a Pozyx run with a ground truth series and computes its per-sample errors and their summary.
+
+    :return: (timesteps of the matched samples (ms), their errors (mm), compute_error_metrics() dictionary)
+    """
+    timesteps = np.asarray(timesteps, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)
+    matched, ground_truth = align_ground_truth(
+        timesteps, ground_truth_timesteps, ground_truth_distances, method=method, tolerance_ms=tolerance_ms
+    )
+    errors = distances[matched] - ground_truth
+    return timesteps[matched], errors, compute_error_metrics(errors)
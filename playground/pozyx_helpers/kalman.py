@@ -0,0 +1,221 @@
+# Import Python-native modules
+import numpy as np
+
+# Import custom modules
+from .run_io import load_run
+
+# Default white-noise acceleration spectral density (mm^2 / s^3) for a hand-moved tag
+DEFAULT_ACCEL_VAR = 1e5
+
+# Default measurement noise variance (mm^2), use estimate_measurement_variance() on static captures
+DEFAULT_MEASUREMENT_VAR = 100.0
+
+# Initial velocity variance ((mm / s)^2), i.e. the velocity is unknown before the second sample
+INITIAL_VELOCITY_VAR = 1e6
+
+
+########################################
+# Shared predict/correct steps
+########################################
+# The state is (position (mm), velocity (mm/s)) and the covariance is kept as its three distinct entries,
+# so one step is a handful of float operations instead of small matrix products.
+
+
+def _predict(x0, x1, p00, p01, p11, dt, accel_var):
+    """
+    Propagates the state and covariance dt seconds ahead under white-noise acceleration.
+    """
+    dt2 = dt * dt
+    x0 = x0 + dt * x1
+    p00 = p00 + dt * (2 * p01 + dt * p11) + accel_var * dt2 * dt / 3
+    p01 = p01 + dt * p11 + accel_var * dt2 / 2
+    p11 = p11 + accel_var * dt
+    return x0, x1, p00, p01, p11
+
+
+def _correct(x0, x1, p00, p01, p11, z, measurement_var):
+    """
+    Corrects the predicted state with a distance measurement z.
+    """
+    s = p00 + measurement_var
+    k0 = p00 / s
+    k1 = p01 / s
+    residual = z - x0
+    x0 = x0 + k0 * residual
+    x1 = x1 + k1 * residual
+    p11 = p11 - k1 * p01
+    p01 = (1 - k0) * p01
+    p00 = (1 - k0) * p00
+    return x0, x1, p00, p01, p11
+
+
+class KalmanFilter1D(object):
+    """
+    Constant-velocity Kalman filter for a live Pozyx distance stream.
+
+    Each update predicts over the real interval since the previous good sample, so jittery timestamps
+    and dropped (error) pulses are handled by simply not calling update() for the error pulses: the next
+    good sample's longer interval grows the uncertainty accordingly. Updates are O(1).
+    """
+
+    def __init__(self, measurement_var=DEFAULT_MEASUREMENT_VAR, accel_var=DEFAULT_ACCEL_VAR):
+        """
+        :param measurement_var: Distance measurement noise variance (mm^2)
+        :param accel_var: White-noise acceleration spectral density (mm^2 / s^3)
+        """
+        self.measurement_var = measurement_var
+        self.accel_var = accel_var
+        self.reset()
+
+    def reset(self):
+        """
+        Forgets the state, the next update re-initializes it from its measurement.
+        """
+        self.timestamp = None
+        self.state = (0.0, 0.0, 0.0, 0.0, 0.0)  # (x0, x1, p00, p01, p11)
+
+    @property
+    def position(self):
+        """
+        Filtered distance (mm), or None before the first update.
+        """
+        return None if self.timestamp is None else self.state[0]
+
+    @property
+    def velocity(self):
+        """
+        Filtered velocity (mm/s), or None before the first update.
+        """
+        return None if self.timestamp is None else self.state[1]
+
+    def update(self, timestamp, distance):
+        """
+        Adds one good sample and returns the filtered distance (mm).
+
+        :param timestamp: Sample time (ms), out-of-order or repeated times are treated as dt = 0
+        :param distance: Measured distance (mm)
+        """
+        if self.timestamp is None:
+            self.timestamp = timestamp
+            self.state = (float(distance), 0.0, self.measurement_var, 0.0, INITIAL_VELOCITY_VAR)
+            return self.state[0]
+
+        dt = max(timestamp - self.timestamp, 0) / 1000
+        self.timestamp = timestamp
+        state = _predict(*self.state, dt, self.accel_var)
+        self.state = _correct(*state, distance, self.measurement_var)
+        return self.state[0]
+
+
+def _forward_pass(dts, z, measurement_var, accel_var):
+    """
+    Runs the filter over a whole run, returning the filtered and predicted states of every sample.
+    """
+    n = len(z)
+    filtered = [None] * n
+    predicted = [None] * n
+    filtered[0] = (z[0], 0.0, measurement_var, 0.0, INITIAL_VELOCITY_VAR)
+    for k in range(1, n):
+        predicted[k] = _predict(*filtered[k - 1], dts[k - 1], accel_var)
+        filtered[k] = _correct(*predicted[k], z[k], measurement_var)
+    return filtered, predicted
+
+
+def kalman_filter(timesteps, distances, measurement_var=DEFAULT_MEASUREMENT_VAR, accel_var=DEFAULT_ACCEL_VAR):
+    """
+    Filters a whole run forwards only, the same result as streaming it through KalmanFilter1D.
+
+    :param timesteps: Sample times (ms)
+    :param distances: Measured distances (mm)
+    :return: Filtered distances (mm)
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    if len(distances) == 0:
+        return np.empty(0)
+
+    dts = (np.maximum(np.diff(np.asarray(timesteps, dtype=np.float64)), 0) / 1000).tolist()
+    filtered, _ = _forward_pass(dts, distances.tolist(), measurement_var, accel_var)
+    return np.fromiter((state[0] for state in filtered), dtype=np.float64, count=len(filtered))
+
+
+def kalman_smooth(timesteps, distances, measurement_var=DEFAULT_MEASUREMENT_VAR, accel_var=DEFAULT_ACCEL_VAR):
+    """
+    Filters a whole run forwards and smooths it backwards (Rauch-Tung-Striebel) for offline use.
+
+    The forward pass gives the same result as streaming every sample through KalmanFilter1D, the backward
+    pass then uses later samples too, so the smoothed distances have no lag. Runs only hold good samples,
+    so error pulses are already skipped and show up as longer intervals.
+
+    :param timesteps: Sample times (ms)
+    :param distances: Measured distances (mm)
+    :return: (filtered distances (mm), smoothed distances (mm), smoothed velocities (mm/s))
+    """
+    timesteps = np.asarray(timesteps, dtype=np.float64)
+    distances = np.asarray(distances, dtype=np.float64)
+    n = len(distances)
+    if n == 0:
+        return np.empty(0), np.empty(0), np.empty(0)
+
+    # Interval terms for every step at once (plain floats in the loops below are faster than NumPy scalars)
+    dts = (np.maximum(np.diff(timesteps), 0) / 1000).tolist()
+    z = distances.tolist()
+
+    # Forward pass, keeping the predicted and filtered states for the backward pass
+    filtered, predicted = _forward_pass(dts, z, measurement_var, accel_var)
+
+    # Backward (RTS) pass: x_s[k] = x_f[k] + C (x_s[k + 1] - x_p[k + 1]), C = P_f[k] F^T P_p[k + 1]^-1
+    smoothed_x0 = [0.0] * n
+    smoothed_x1 = [0.0] * n
+    sx0, sx1 = filtered[-1][:2]
+    smoothed_x0[-1], smoothed_x1[-1] = sx0, sx1
+    for k in range(n - 2, -1, -1):
+        fx0, fx1, fp00, fp01, fp11 = filtered[k]
+        px0, px1, pp00, pp01, pp11 = predicted[k + 1]
+        dt = dts[k]
+
+        # P_f F^T with F = [[1, dt], [0, 1]]
+        a00 = fp00 + dt * fp01
+        a01 = fp01
+        a10 = fp01 + dt * fp11
+        a11 = fp11
+
+        # Inverse of the predicted covariance
+        det = pp00 * pp11 - pp01 * pp01
+        i00 = pp11 / det
+        i01 = -pp01 / det
+        i11 = pp00 / det
+
+        c00 = a00 * i00 + a01 * i01
+        c01 = a00 * i01 + a01 * i11
+        c10 = a10 * i00 + a11 * i01
+        c11 = a10 * i01 + a11 * i11
+
+        d0 = sx0 - px0
+        d1 = sx1 - px1
+        sx0 = fx0 + c00 * d0 + c01 * d1
+        sx1 = fx1 + c10 * d0 + c11 * d1
+        smoothed_x0[k], smoothed_x1[k] = sx0, sx1
+
+    filtered_distances = np.fromiter((state[0] for state in filtered), dtype=np.float64, count=n)
+    return filtered_distances, np.array(smoothed_x0), np.array(smoothed_x1)
+
+
+def estimate_measurement_variance(filepaths):
+    """
+    Estimates the distance measurement noise variance (mm^2) from static captures.
+
+    Half the variance of the first differences is used, so slow drift of the static distance doesn't
+    inflate the estimate. Runs are pooled by their number of differences.
+
+    :param filepaths: Run files captured with the tag and anchor held still
+    """
+    sum_squares = 0.0
+    count = 0
+    for filepath in filepaths:
+        _, distances = load_run(filepath)
+        differences = np.diff(distances)
+        sum_squares += np.sum((differences - differences.mean()) ** 2)
+        count += len(differences)
+    if count == 0:
+        raise ValueError("The static captures hold too few samples to estimate the measurement noise")
+    return sum_squares / count / 2
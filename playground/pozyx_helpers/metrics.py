@@ -0,0 +1,175 @@
+# Import Python-native modules
+import time
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+# Local-only by default, bind to "0.0.0.0" to let other hosts scrape
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9464
+
+# Content type of the text exposition format
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Weight of the newest pulse interval in the smoothed pulse interval
+PULSE_INTERVAL_SMOOTHING = 0.05
+
+# Error code label of failed rangings whose error code couldn't be read
+UNKNOWN_ERROR_CODE = "unknown"
+
+
+class CaptureMetrics(object):
+    """
+    Health counters of a capture that aren't kept by the capture itself: error counts per code, write latency
+    and the achieved pulse rate.
+
+    Only the capture thread updates them (plain ints, floats and a dict), the metrics server reads them without
+    locking, so scraping never blocks ranging.
+    """
+
+    def __init__(self):
+        self.start_time = time.time()
+        self.error_counts = {}  # Error code label -> number of failed rangings
+        self.num_writes = 0
+        self.write_seconds = 0.0  # Total time spent writing rows
+        self.last_write_seconds = 0.0
+        self.pulse_interval = None  # Smoothed time between pulses (s)
+        self.last_pulse_time = None  # perf_counter() of the last pulse
+
+    def record_pulse(self):
+        """
+        Updates the smoothed pulse interval, call once per pulse.
+        """
+        now = time.perf_counter()
+        if self.last_pulse_time is not None:
+            interval = now - self.last_pulse_time
+            self.pulse_interval = interval if self.pulse_interval is None else (
+                self.pulse_interval + PULSE_INTERVAL_SMOOTHING * (interval - self.pulse_interval)
+            )
+        self.last_pulse_time = now
+
+    @property
+    def pulse_rate(self):
+        """
+        Smoothed achieved pulses per second (0 before the second pulse).
+        """
+        interval = self.pulse_interval
+        return 1.0 / interval if interval else 0.0
+
+    def record_error(self, error_code=None):
+        """
+        Counts a failed ranging.
+
+        :param error_code: Device error code, None when it couldn't be read
+        """
+        label = UNKNOWN_ERROR_CODE if error_code is None else f"0x{error_code:02x}"
+        self.error_counts[label] = self.error_counts.get(label, 0) + 1
+
+    def record_write(self, seconds):
+        """
+        Records the latency of one row (or batch) write.
+        """
+        self.num_writes += 1
+        self.write_seconds += seconds
+        self.last_write_seconds = seconds
+
+
+def _metric(lines, name, metric_type, help_text, samples):
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {metric_type}")
+    for labels, value in samples:
+        lines.append(f"{name}{labels} {value}")
+
+
+def format_metrics(capture):
+    """
+    Renders the health of a capture (Pozyx1DCapture or Pozyx1dCapture) in the text exposition format.
+
+    The capture's attributes are read as they are, without locking, so a scrape may see one counter a pulse
+    ahead of another.
+
+    :return: Exposition text
+    """
+    metrics = capture.metrics
+    error_counts = metrics.error_counts.copy()  # One C-level copy, the capture thread may add codes meanwhile
+    num_pulses = capture.num_pozyx_pulses
+    uptime = time.time() - metrics.start_time
+
+    lines = []
+    _metric(lines, "pozyx_capture_info", "gauge", "Run and protocol of the capture.", [
+        (f'{{run="{capture.run_timestamp}",protocol="{capture.protocol_name.strip("_")}"}}', 1)
+    ])
+    _metric(lines, "pozyx_pulses_total", "counter", "Ranging attempts.", [("", num_pulses)])
+    _metric(lines, "pozyx_data_samples_total", "counter", "Successful rangings.", [("", capture.num_data_samples)])
+    _metric(lines, "pozyx_error_samples_total", "counter", "Failed rangings.", [("", capture.num_err_samples)])
+    _metric(lines, "pozyx_errors_total", "counter", "Failed rangings by device error code.", [
+        (f'{{code="{code}"}}', count) for code, count in sorted(error_counts.items())
+    ])
+    _metric(lines, "pozyx_pending_writes", "gauge", "Rows captured but not written to disk yet.", [
+        ("", capture.pending_writes)
+    ])
+    _metric(lines, "pozyx_write_latency_seconds", "summary", "Time spent writing rows to disk.", [
+        ("_count", metrics.num_writes), ("_sum", metrics.write_seconds)
+    ])
+    _metric(lines, "pozyx_last_write_latency_seconds", "gauge", "Latency of the last write.", [
+        ("", metrics.last_write_seconds)
+    ])
+    _metric(lines, "pozyx_pulse_rate_hz", "gauge", "Smoothed achieved pulse rate.", [("", metrics.pulse_rate)])
+    _metric(lines, "pozyx_average_pulse_rate_hz", "gauge", "Pulses per second since the start of the capture.", [
+        ("", num_pulses / uptime if uptime > 0 else 0.0)
+    ])
+    _metric(lines, "pozyx_uptime_seconds", "gauge", "Time since the start of the capture.", [("", uptime)])
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer(object):
+    """
+    Serves the metrics of a capture over HTTP (GET /metrics) from a daemon thread.
+    """
+
+    def __init__(self, capture, host=DEFAULT_METRICS_HOST, port=DEFAULT_METRICS_PORT):
+        """
+        :param port: Port to listen on (0 picks a free one, see address)
+        """
+        self.capture = capture
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] not in ("/", "/metrics"):
+                    handler.send_error(404)
+                    return
+                body = format_metrics(self.capture).encode("utf-8")
+                handler.send_response(200)
+                handler.send_header("Content-Type", METRICS_CONTENT_TYPE)
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, format, *args):
+                pass  # Don't interleave request logs with the capture's output
+
+        self.server = HTTPServer((host, port), MetricsHandler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="pozyx-metrics", daemon=True)
+
+    @property
+    def address(self):
+        """
+        (host, port) the server listens on.
+        """
+        return self.server.server_address[:2]
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def serve_metrics(capture, host=DEFAULT_METRICS_HOST, port=DEFAULT_METRICS_PORT):
+    """
+    Starts serving the metrics of a capture in the background.
+
+    :return: The running MetricsServer
+    """
+    return MetricsServer(capture, host, port).start()
@@ -0,0 +1,137 @@
+# Import Python-native modules
+from bisect import bisect_left, insort
+from collections import deque
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Default Hampel window length (samples, odd) and threshold (scaled MADs from the median)
+DEFAULT_WINDOW = 7
+DEFAULT_N_SIGMAS = 3.0
+
+# Scales the median absolute deviation (MAD) to a standard deviation for Gaussian noise
+MAD_SCALE = 1.4826
+
+# Windows evaluated per block in hampel_filter(), bounds the memory of the median copies
+BLOCK_SIZE = 1 << 16
+
+
+def _check_window(window):
+    if window < 3 or window % 2 == 0:
+        raise ValueError(f"Invalid Hampel window {window}, expected an odd length of at least 3")
+
+
+def hampel_filter(values, window=DEFAULT_WINDOW, n_sigmas=DEFAULT_N_SIGMAS):
+    """
+    Replaces outliers (e.g. multipath spikes) with the median of the centered window around them.
+
+    A sample is an outlier when it is more than n_sigmas * MAD_SCALE * MAD away from its window's median.
+    The medians come from a sliding-window view (no Python loop over the samples), windows at the ends of
+    the run are truncated to the samples that exist.
+
+    :param values: 1-D signal (e.g. distances (mm))
+    :param window: Window length (odd)
+    :param n_sigmas: Threshold in scaled MADs
+    :return: (filtered values, boolean mask of the replaced samples)
+    """
+    _check_window(window)
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    half = window // 2
+
+    medians = np.empty(n)
+    mads = np.empty(n)
+
+    # Full windows, a block of rows at a time
+    full_windows = sliding_window_view(values, window) if n >= window else np.empty((0, window))
+    for start in range(0, len(full_windows), BLOCK_SIZE):
+        block = full_windows[start:start + BLOCK_SIZE]
+        block_medians = np.median(block, axis=1)
+        medians[start + half:start + half + len(block)] = block_medians
+        mads[start + half:start + half + len(block)] = np.median(np.abs(block - block_medians[:, None]), axis=1)
+
+    # Truncated windows at the ends of the run (at most window - 1 samples)
+    edges = range(n) if n < window else list(range(half)) + list(range(n - half, n))
+    for i in edges:
+        truncated = values[max(0, i - half):i + half + 1]
+        medians[i] = np.median(truncated)
+        mads[i] = np.median(np.abs(truncated - medians[i]))
+
+    replaced = np.abs(values - medians) > n_sigmas * MAD_SCALE * mads
+    return np.where(replaced, medians, values), replaced
+
+
+def _sorted_median(sorted_values):
+    """
+    Median of an already sorted list (same result as np.median).
+    """
+    middle = len(sorted_values) // 2
+    if len(sorted_values) % 2:
+        return sorted_values[middle]
+    return (sorted_values[middle - 1] + sorted_values[middle]) / 2
+
+
+class HampelFilter(object):
+    """
+    Streaming Hampel filter giving the same output as hampel_filter().
+
+    The window is kept sorted (bisect insert/remove), so the median is read off in O(1) and the MAD only
+    sorts the window's deviations. The output is
+    centered, i.e. delayed by window // 2 samples: update() returns None until then, and flush() returns
+    the last window // 2 samples once the stream ends.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, n_sigmas=DEFAULT_N_SIGMAS):
+        """
+        :param window: Window length (odd)
+        :param n_sigmas: Threshold in scaled MADs
+        """
+        _check_window(window)
+        self.window = window
+        self.half = window // 2
+        self.n_sigmas = n_sigmas
+        self.reset()
+
+    def reset(self):
+        """
+        Clears the window and the counters.
+        """
+        self.samples = deque()  # Samples in arrival order
+        self.sorted_samples = []  # The same samples, sorted
+        self.num_samples = 0  # Samples received
+        self.num_emitted = 0  # Samples returned
+        self.num_replaced = 0  # Samples replaced by their window median
+
+    def update(self, sample):
+        """
+        Adds one sample and returns the filtered sample from window // 2 samples ago (or None).
+        """
+        sample = float(sample)
+        self.samples.append(sample)
+        insort(self.sorted_samples, sample)
+        self.num_samples += 1
+
+        if self.num_samples <= self.half:
+            return None
+        return self._emit(self.num_samples - 1 - self.half)
+
+    def flush(self):
+        """
+        Returns the filtered samples that are still delayed at the end of the stream.
+        """
+        return [self._emit(position) for position in range(self.num_emitted, self.num_samples)]
+
+    def _emit(self, position):
+        # Drop the samples that are outside the centered window of this position
+        while self.num_samples - len(self.samples) < position - self.half:
+            oldest = self.samples.popleft()
+            del self.sorted_samples[bisect_left(self.sorted_samples, oldest)]
+
+        median = _sorted_median(self.sorted_samples)
+        mad = _sorted_median(sorted(abs(value - median) for value in self.sorted_samples))
+
+        self.num_emitted += 1
+        sample = self.samples[position - (self.num_samples - len(self.samples))]
+        if abs(sample - median) > self.n_sigmas * MAD_SCALE * mad:
+            self.num_replaced += 1
+            return median
+        return sample
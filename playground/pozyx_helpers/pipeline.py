@@ -0,0 +1,233 @@
+# Import Python-native modules
+from collections import deque
+import numpy as np
+from scipy.signal import sosfilt, sosfilt_zi
+
+# Import custom modules
+from .filters import design_filter
+from .kalman import KalmanFilter1D, kalman_filter, DEFAULT_MEASUREMENT_VAR, DEFAULT_ACCEL_VAR
+from .outliers import HampelFilter, hampel_filter, DEFAULT_WINDOW, DEFAULT_N_SIGMAS
+
+
+class PipelineStage(object):
+    """
+    One stage of a FilterPipeline.
+
+    Every stage runs either vectorized over a whole run with process(), or sample by sample with update()
+    and a final flush(), and both modes give the same output. Stages pass (timestamp (ms), value) pairs on,
+    so stages that delay or drop samples keep their timestamps aligned.
+    """
+
+    def process(self, timesteps, values):
+        """
+        Filters a whole run, returns (timesteps, values).
+        """
+        raise NotImplementedError
+
+    def update(self, timestamp, value):
+        """
+        Filters one sample, returns the list of (timestamp, value) pairs that are ready (possibly empty).
+        """
+        raise NotImplementedError
+
+    def flush(self):
+        """
+        Returns the (timestamp, value) pairs still held back at the end of a stream.
+        """
+        return []
+
+    def reset(self):
+        """
+        Clears the streaming state.
+        """
+        pass
+
+
+class HampelStage(PipelineStage):
+    """
+    Outlier rejection (see outliers.hampel_filter), delayed by window // 2 samples when streaming.
+    """
+
+    def __init__(self, window=DEFAULT_WINDOW, n_sigmas=DEFAULT_N_SIGMAS):
+        self.window = window
+        self.n_sigmas = n_sigmas
+        self.hampel = HampelFilter(window, n_sigmas)
+        self.reset()
+
+    def process(self, timesteps, values):
+        return timesteps, hampel_filter(values, self.window, self.n_sigmas)[0]
+
+    def update(self, timestamp, value):
+        self.timestamps.append(timestamp)
+        value = self.hampel.update(value)
+        if value is None:
+            return []
+        return [(self.timestamps.popleft(), value)]
+
+    def flush(self):
+        values = self.hampel.flush()
+        timestamps, self.timestamps = self.timestamps, deque()
+        return list(zip(timestamps, values))
+
+    def reset(self):
+        self.hampel.reset()
+        self.timestamps = deque()  # Timestamps of the samples held back by the Hampel filter
+
+
+class IirStage(PipelineStage):
+    """
+    Causal SOS filter (see filters.design_filter) for a nominal sample rate.
+
+    Zero-phase filtering needs the whole run, so this stage runs forwards only in both modes, starting from
+    the steady state of the first value so the output doesn't ramp up from zero.
+    """
+
+    def __init__(self, filter_type, order, cutoff, fs):
+        self.sos = design_filter(filter_type, order, cutoff, fs)
+        self.zi = sosfilt_zi(self.sos)  # Steady-state section states for a unit input
+        self.reset()
+
+    def process(self, timesteps, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return timesteps, values
+        filtered, _ = sosfilt(self.sos, values, zi=self.zi * values[0])
+        return timesteps, filtered
+
+    def update(self, timestamp, value):
+        if self.state is None:
+            self.state = (self.zi * value).tolist()
+
+        # Direct form II transposed, one section at a time (what sosfilt computes)
+        for (b0, b1, b2, _, a1, a2), section_state in zip(self.coefficients, self.state):
+            output = b0 * value + section_state[0]
+            section_state[0] = b1 * value - a1 * output + section_state[1]
+            section_state[1] = b2 * value - a2 * output
+            value = output
+        return [(timestamp, value)]
+
+    def reset(self):
+        self.coefficients = self.sos.tolist()
+        self.state = None  # Section states, initialized from the first value
+
+
+class KalmanStage(PipelineStage):
+    """
+    Constant-velocity Kalman filter (see kalman.KalmanFilter1D), forwards only so it can run live.
+    """
+
+    def __init__(self, measurement_var=DEFAULT_MEASUREMENT_VAR, accel_var=DEFAULT_ACCEL_VAR):
+        self.kalman = KalmanFilter1D(measurement_var, accel_var)
+
+    def process(self, timesteps, values):
+        return timesteps, kalman_filter(timesteps, values, self.kalman.measurement_var, self.kalman.accel_var)
+
+    def update(self, timestamp, value):
+        return [(timestamp, self.kalman.update(timestamp, value))]
+
+    def reset(self):
+        self.kalman.reset()
+
+
+class DecimateStage(PipelineStage):
+    """
+    Keeps every factor-th sample (put a low-pass stage before it to avoid aliasing).
+    """
+
+    def __init__(self, factor):
+        self.factor = factor
+        self.reset()
+
+    def process(self, timesteps, values):
+        return timesteps[::self.factor], values[::self.factor]
+
+    def update(self, timestamp, value):
+        keep = self.num_samples % self.factor == 0
+        self.num_samples += 1
+        return [(timestamp, value)] if keep else []
+
+    def reset(self):
+        self.num_samples = 0
+
+
+class FilterPipeline(object):
+    """
+    Chains filter stages (e.g. outlier rejection -> IIR -> decimation).
+
+    The same pipeline runs vectorized over a whole run with process(), so it can be tuned offline, and
+    sample by sample with update() in the capture loop, where it gives the same output.
+    """
+
+    def __init__(self, stages):
+        """
+        :param stages: List of PipelineStage objects, applied in order
+        """
+        self.stages = list(stages)
+
+    def process(self, timesteps, values):
+        """
+        Runs every stage over a whole run.
+
+        :return: (timesteps (ms), filtered values)
+        """
+        timesteps = np.asarray(timesteps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        for stage in self.stages:
+            timesteps, values = stage.process(timesteps, values)
+        return timesteps, values
+
+    def update(self, timestamp, value):
+        """
+        Pushes one sample through every stage.
+
+        :return: List of (timestamp (ms), filtered value) pairs that came out of the last stage
+        """
+        samples = [(timestamp, value)]
+        for stage in self.stages:
+            samples = [output for sample in samples for output in stage.update(*sample)]
+        return samples
+
+    def flush(self):
+        """
+        Ends the stream, pushing the samples each stage still holds back through the stages after it.
+        """
+        samples = []
+        for stage in self.stages:
+            samples = [output for sample in samples for output in stage.update(*sample)] + stage.flush()
+        return samples
+
+    def reset(self):
+        """
+        Clears the streaming state of every stage.
+        """
+        for stage in self.stages:
+            stage.reset()
+
+
+def compare_batch_and_streaming(pipeline, timesteps, values):
+    """
+    Runs a pipeline over a run in both modes and returns the largest difference between their outputs.
+
+    Used to check that a pipeline tuned offline behaves the same when deployed live.
+
+    :return: (max absolute value difference, max absolute timestamp difference (ms))
+    """
+    batch_timesteps, batch_values = pipeline.process(timesteps, values)
+
+    pipeline.reset()
+    samples = []
+    for timestamp, value in zip(timesteps, values):
+        samples.extend(pipeline.update(timestamp, value))
+    samples.extend(pipeline.flush())
+    pipeline.reset()
+
+    if len(samples) != len(batch_values):
+        raise ValueError(f"Streaming gave {len(samples)} samples, batch gave {len(batch_values)}")
+    if len(samples) == 0:
+        return 0.0, 0.0
+
+    streamed_timesteps, streamed_values = np.array(samples).T
+    return (
+        float(np.max(np.abs(streamed_values - batch_values))),
+        float(np.max(np.abs(streamed_timesteps - batch_timesteps))),
+    )
@@ -0,0 +1,297 @@
+# Import Python-native modules
+import os
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# pyqtgraph is optional; only needed when the "pyqtgraph" backend is selected
+try:
+    import pyqtgraph as pg
+except ImportError:
+    pg = None
+
+# Environment variable used to select the interactive plotting backend
+PLOT_BACKEND_ENV_VAR = "POZYX_PLOT_BACKEND"
+DEFAULT_PLOT_BACKEND = "matplotlib"
+PLOT_BACKENDS = ("matplotlib", "pyqtgraph")
+
+# Colors shared by both backends (Matplotlib names -> RGB for pyqtgraph)
+COLOR_DICT = {
+    "blue": (0, 0, 255),
+    "green": (0, 128, 0),
+    "red": (255, 0, 0),
+    "purple": (128, 0, 128),
+    "orange": (255, 165, 0),
+    "black": (0, 0, 0),
+    "gray": (128, 128, 128),
+}
+
+
+def get_plot_backend_name(backend=None):
+    """
+    Returns the name of the plotting backend to use.
+
+    :param backend: Explicit backend name, otherwise the POZYX_PLOT_BACKEND environment variable is used
+    :return: One of PLOT_BACKENDS
+    """
+    if backend is None:
+        backend = os.environ.get(PLOT_BACKEND_ENV_VAR, DEFAULT_PLOT_BACKEND)
+    backend = backend.strip().lower()
+
+    if backend not in PLOT_BACKENDS:
+        raise ValueError(f"Invalid plot backend '{backend}', expected one of {PLOT_BACKENDS}")
+    if backend == "pyqtgraph" and pg is None:
+        raise ImportError("The 'pyqtgraph' plot backend requires pyqtgraph to be installed")
+
+    return backend
+
+
+def create_plot_pane(backend=None):
+    """
+    Creates a plot pane (a Qt widget plus a small plotting interface) for the selected backend.
+    """
+    if get_plot_backend_name(backend) == "pyqtgraph":
+        return PyqtgraphPlotPane()
+    return MatplotlibPlotPane()
+
+
+def apply_plot_ops(ax, ops):
+    """
+    Replays recorded plot operations onto a Matplotlib Axes object.
+    """
+    for op, args, kwargs in ops:
+        if op == "labels":
+            title, xlabel, ylabel, title_kwargs = args
+            ax.set_title(title, **title_kwargs)
+            ax.set_xlabel(xlabel)
+            ax.set_ylabel(ylabel)
+        elif op == "plot":
+            x, y = args
+            ax.plot(x, y, **kwargs)
+        elif op == "axhline":
+            ax.axhline(y=args[0], **kwargs)
+        elif op == "annotate":
+            text, y, above = args
+            ax.annotate(
+                text,
+                xy=(1, y),
+                xycoords=("axes fraction", "data"),
+                textcoords="offset points",
+                xytext=(-10, 10 if above else -10),
+                ha="right",
+            )
+        elif op == "image":
+            data, extent = args
+            ax.imshow(
+                data,
+                extent=extent,
+                origin="lower",
+                aspect="auto",
+                interpolation="nearest",
+                **kwargs,
+            )
+        elif op == "legend":
+            ax.legend(loc="upper left", bbox_to_anchor=(1, 1), fontsize="large")
+
+
+class PlotPane(object):
+    """
+    Backend-independent plotting interface used by the Qt windows.
+
+    Every call is recorded so that the pane can always be exported through Matplotlib,
+    regardless of which backend is used for interactive display.
+    """
+
+    def __init__(self):
+        self.widget = None
+        self.ops = []
+
+    def clear(self):
+        """
+        Removes everything from the pane.
+        """
+        self.ops = []
+        self._clear()
+
+    def set_labels(self, title, xlabel, ylabel, **title_kwargs):
+        """
+        Sets the title and the x and y labels.
+        """
+        self._record("labels", (title, xlabel, ylabel, title_kwargs), {})
+
+    def plot(self, x, y, color=None, label=None, linewidth=1):
+        """
+        Plots a line.
+        """
+        self._record("plot", (x, y), {"color": color, "label": label, "linewidth": linewidth})
+
+    def axhline(self, y, color=None, label=None, linewidth=1):
+        """
+        Plots a horizontal line across the whole pane.
+        """
+        self._record("axhline", (y,), {"color": color, "label": label, "linewidth": linewidth})
+
+    def annotate(self, text, y, above=False):
+        """
+        Writes text at the right edge of the pane, just above or below the given y value.
+        """
+        self._record("annotate", (text, y, above), {})
+
+    def image(self, data, extent, cmap="viridis"):
+        """
+        Shows a 2-D array (rows along y) stretched over extent = (x0, x1, y0, y1).
+        """
+        self._record("image", (data, extent), {"cmap": cmap})
+
+    def legend(self):
+        """
+        Adds a legend for the labelled lines.
+        """
+        self._record("legend", (), {})
+
+    def draw(self):
+        """
+        Redraws the pane.
+        """
+        pass
+
+    def render_to_axes(self, ax):
+        """
+        Replays the pane onto a Matplotlib Axes object.
+        """
+        apply_plot_ops(ax, self.ops)
+
+    def export_png(self, filename, dpi=200):
+        """
+        Saves the pane as a publication-quality .png file using Matplotlib.
+        """
+        figure = Figure(figsize=(10, 6))
+        FigureCanvasAgg(figure)
+        ax = figure.subplots()
+        self.render_to_axes(ax)
+        figure.savefig(filename, dpi=dpi, bbox_inches="tight")
+
+    def _record(self, op, args, kwargs):
+        self.ops.append((op, args, kwargs))
+        self._apply(op, args, kwargs)
+
+    def _clear(self):
+        raise NotImplementedError
+
+    def _apply(self, op, args, kwargs):
+        raise NotImplementedError
+
+
+class MatplotlibPlotPane(PlotPane):
+    """
+    Plot pane backed by a Matplotlib FigureCanvasQTAgg.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        # Imported here so that headless users of this module don't need Qt
+        from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+
+        self.figure = Figure()
+        self.canvas = FigureCanvas(self.figure)
+        self.ax = self.figure.subplots()
+        self.widget = self.canvas
+
+    def draw(self):
+        self.canvas.draw()
+
+    def export_png(self, filename, dpi=200):
+        self.figure.savefig(filename, dpi=dpi, bbox_inches="tight")
+
+    def _clear(self):
+        self.figure.clear()
+        self.ax = self.figure.subplots()
+
+    def _apply(self, op, args, kwargs):
+        apply_plot_ops(self.ax, [(op, args, kwargs)])
+
+
+class PyqtgraphPlotPane(PlotPane):
+    """
+    Plot pane backed by a pyqtgraph PlotWidget.
+
+    Lines are drawn with clip-to-view and peak downsampling, so runs with millions of samples
+    stay interactive.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        if pg is None:
+            raise ImportError("The 'pyqtgraph' plot backend requires pyqtgraph to be installed")
+
+        self.plot_widget = pg.PlotWidget()
+        self.plot_widget.showGrid(x=True, y=True, alpha=0.3)
+        self.plot_item = self.plot_widget.getPlotItem()
+        self.legend_item = None
+        # (item, label) pairs shown in the legend, in the order they were plotted
+        self.legend_entries = []
+        self.widget = self.plot_widget
+
+    def _clear(self):
+        self.plot_item.clear()
+        self.legend_entries = []
+        if self.legend_item is not None:
+            self.legend_item.clear()
+
+    def _apply(self, op, args, kwargs):
+        if op == "labels":
+            title, xlabel, ylabel, title_kwargs = args
+            size = title_kwargs.get("fontsize", 12)
+            bold = title_kwargs.get("fontweight") == "bold"
+            self.plot_item.setTitle(title, size=f"{size}pt", bold=bold)
+            self.plot_item.setLabel("bottom", xlabel)
+            self.plot_item.setLabel("left", ylabel)
+        elif op == "plot":
+            x, y = args
+            if kwargs["color"] is None:
+                # Cycle through colors like Matplotlib does for uncolored lines
+                color = pg.intColor(len(self.plot_item.listDataItems()), hues=10)
+            else:
+                color = COLOR_DICT.get(kwargs["color"], kwargs["color"])
+            pen = pg.mkPen(color, width=kwargs["linewidth"])
+            curve = self.plot_item.plot(x, y, pen=pen, name=kwargs["label"])
+            curve.setClipToView(True)
+            curve.setDownsampling(auto=True, method="peak")
+            if kwargs["label"]:
+                self.legend_entries.append((curve, kwargs["label"]))
+        elif op == "axhline":
+            pen = pg.mkPen(COLOR_DICT.get(kwargs["color"], kwargs["color"] or "w"), width=kwargs["linewidth"])
+            line = pg.InfiniteLine(pos=args[0], angle=0, pen=pen, movable=False, name=kwargs["label"])
+            self.plot_item.addItem(line)
+            if kwargs["label"]:
+                # The legend only draws samples for data items, so a line gets a proxy with the same pen
+                proxy = pg.PlotDataItem(pen=pen)
+                proxy.visibleChanged.connect(lambda: line.setVisible(proxy.isVisible()))
+                self.legend_entries.append((proxy, kwargs["label"]))
+        elif op == "annotate":
+            text, y, above = args
+            # An invisible horizontal line carrying a label pinned to the right edge of the view
+            line = pg.InfiniteLine(
+                pos=y,
+                angle=0,
+                pen=pg.mkPen(None),
+                movable=False,
+                label=text,
+                labelOpts={"position": 0.98, "anchors": [(1, 1)] if above else [(1, 0)]},
+            )
+            self.plot_item.addItem(line)
+        elif op == "image":
+            data, extent = args
+            image_item = pg.ImageItem(data.T)
+            image_item.setColorMap(pg.colormap.get(kwargs["cmap"]))
+            x0, x1, y0, y1 = extent
+            image_item.setRect(x0, y0, x1 - x0, y1 - y0)
+            self.plot_item.addItem(image_item)
+        elif op == "legend":
+            if self.legend_item is None:
+                self.legend_item = self.plot_item.addLegend()
+            # Rebuilt from our own entries: pyqtgraph skips lines and items plotted before the legend existed
+            self.legend_item.clear()
+            for item, label in self.legend_entries:
+                self.legend_item.addItem(item, label)
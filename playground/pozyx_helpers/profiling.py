@@ -0,0 +1,220 @@
+# Import Python-native modules
+import os
+import sys
+import io
+import time
+import atexit
+import cProfile
+import pstats
+import datetime
+import functools
+import threading
+import tracemalloc
+
+# Profiling is switched on by setting this environment variable (to anything but "" or "0") ...
+PROFILE_ENV_VAR = "POZYX_PROFILE"
+
+# ... or by passing this flag to any script (it is taken out of sys.argv before the script parses it)
+PROFILE_FLAG = "--profile"
+
+# Directory of the session profiles, overridden by the POZYX_PROFILE_DIR environment variable
+DEFAULT_PROFILE_DIR = "pozyx_profiles/"
+
+# Number of functions (and allocation sites) listed in the summary
+SUMMARY_TOP_N = 25
+
+# Every Nth call of a hook is run under tracemalloc (tracing slows allocations down several times)
+TRACEMALLOC_SAMPLE_INTERVAL = 50
+
+# Stack depth recorded for the sampled allocations
+TRACEMALLOC_FRAMES = 5
+
+
+def _profiling_requested():
+    if PROFILE_FLAG in sys.argv:
+        sys.argv.remove(PROFILE_FLAG)
+        return True
+    return os.environ.get(PROFILE_ENV_VAR, "") not in ("", "0")
+
+
+# Decided once at import, so that disabled hooks are the undecorated functions
+PROFILING_ENABLED = _profiling_requested()
+
+
+class HookStats(object):
+    """
+    Wall times and sampled memory peaks of one profiled function.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.total_time = 0.0  # s
+        self.max_time = 0.0  # s
+        self.sampled_calls = 0  # Calls run under tracemalloc
+        self.max_peak = 0  # Largest traced peak of a sampled call (bytes)
+        self.peak_snapshot = None  # Allocations left by that call
+
+    def update(self, elapsed):
+        self.calls += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+
+
+class ProfileSession(object):
+    """
+    Collects the profiles of the hooked functions for one process and writes them on exit.
+
+    Only the outermost hooked call (in any thread) runs under cProfile, calls nested in it are part of its
+    profile anyway. The session profile is <profile dir>/session_<start>_<pid>.prof (open it with pstats or
+    snakeviz), the summary of the hooks, the top functions and the top allocation sites goes next to it as
+    session_<start>_<pid>.txt.
+    """
+
+    def __init__(self, profile_dir=None, top_n=SUMMARY_TOP_N, sample_interval=TRACEMALLOC_SAMPLE_INTERVAL):
+        self.profile_dir = profile_dir or os.environ.get("POZYX_PROFILE_DIR", DEFAULT_PROFILE_DIR)
+        self.top_n = top_n
+        self.sample_interval = sample_interval
+        self.start = datetime.datetime.now()
+        self.profiler = cProfile.Profile()
+        self.profiler_lock = threading.Lock()  # Held while the profiler is enabled
+        self.stats_lock = threading.Lock()
+        self.hooks = {}  # Function name -> HookStats
+
+    def _hook_stats(self, name):
+        with self.stats_lock:
+            if name not in self.hooks:
+                self.hooks[name] = HookStats(name)
+            return self.hooks[name]
+
+    def call(self, name, function, args, kwargs):
+        """
+        Runs a hooked function, profiled if no other hooked call is.
+        """
+        hook = self._hook_stats(name)
+        if not self.profiler_lock.acquire(blocking=False):
+            # Nested (or concurrent) call, just time it
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                hook.update(time.perf_counter() - start_time)
+
+        sample = hook.calls % self.sample_interval == 0 and not tracemalloc.is_tracing()
+        try:
+            if sample:
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+            self.profiler.enable()
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start_time
+                self.profiler.disable()
+                hook.update(elapsed)
+                if sample:
+                    self._record_memory(hook)
+        finally:
+            self.profiler_lock.release()
+
+    def _record_memory(self, hook):
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot() if peak > hook.max_peak else None
+        tracemalloc.stop()
+        hook.sampled_calls += 1
+        if snapshot is not None:
+            hook.max_peak = peak
+            hook.peak_snapshot = snapshot.filter_traces(
+                (tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, __file__))
+            )
+
+    def summary(self):
+        """
+        Returns the text summary: per-hook times and memory, the top functions by cumulative time and the
+        top allocation sites of the hooks.
+        """
+        lines = [f"Profile session started {self.start:%Y-%m-%d %H:%M:%S} (pid {os.getpid()})", ""]
+        lines.append(f"{'Hook':<50} {'Calls':>8} {'Total (s)':>10} {'Mean (ms)':>10} {'Max (ms)':>10} {'Peak (MB)':>10}")
+        for hook in sorted(self.hooks.values(), key=lambda hook: hook.total_time, reverse=True):
+            mean_ms = hook.total_time / hook.calls * 1000 if hook.calls else 0.0
+            peak = f"{hook.max_peak / 1e6:10.2f}" if hook.sampled_calls else f"{'-':>10}"
+            lines.append(
+                f"{hook.name:<50} {hook.calls:>8d} {hook.total_time:>10.3f} {mean_ms:>10.3f} "
+                f"{hook.max_time * 1000:>10.3f} {peak}"
+            )
+
+        stream = io.StringIO()
+        try:
+            pstats.Stats(self.profiler, stream=stream).sort_stats("cumulative").print_stats(self.top_n)
+        except TypeError:
+            stream.write("No profiled calls\n")  # pstats can't load an empty profile
+        lines += ["", f"Top {self.top_n} functions by cumulative time:", stream.getvalue()]
+
+        for hook in self.hooks.values():
+            if hook.peak_snapshot is None:
+                continue
+            lines.append(f"Top allocation sites of {hook.name} (call with the largest peak):")
+            for statistic in hook.peak_snapshot.statistics("lineno")[:self.top_n]:
+                lines.append(f"    {statistic}")
+            lines.append("")
+        return "\n".join(lines)
+
+    def write(self):
+        """
+        Writes the session profile and summary.
+
+        :return: (profile file, summary file), or (None, None) if nothing was profiled
+        """
+        if not self.hooks:
+            return None, None
+        os.makedirs(self.profile_dir, exist_ok=True)
+        basename = os.path.join(self.profile_dir, f"session_{self.start:%Y-%m-%d_%H-%M-%S}_{os.getpid()}")
+        summary = self.summary()
+        try:
+            self.profiler.dump_stats(basename + ".prof")
+        except TypeError:
+            pass  # Empty profile
+        with open(basename + ".txt", "w") as file:
+            file.write(summary)
+        return basename + ".prof", basename + ".txt"
+
+
+# Session of this process (only created when profiling is enabled)
+_session = None
+
+
+def get_session():
+    """
+    Returns the profile session of this process, created (and written at exit) on first use.
+    """
+    global _session
+    if _session is None:
+        _session = ProfileSession()
+        atexit.register(_write_session)
+    return _session
+
+
+def _write_session():
+    profile_file, summary_file = _session.write()
+    if summary_file is not None:
+        print(f"---> Profile: {profile_file}")
+        print(f"---> Profile summary: {summary_file}")
+
+
+def profiled(function):
+    """
+    Decorator hooking a function (or method) into the profile session.
+
+    When profiling is disabled the function is returned as is, so the hooks cost nothing. Don't use it on
+    generator functions, only their creation would be profiled.
+    """
+    if not PROFILING_ENABLED:
+        return function
+
+    name = f"{function.__module__}.{function.__qualname__}"
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        return get_session().call(name, function, args, kwargs)
+
+    return wrapper
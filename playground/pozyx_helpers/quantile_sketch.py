@@ -0,0 +1,239 @@
+# Import Python-native modules
+import numpy as np
+
+# Accuracy parameter of QuantileSketch (rank error is roughly 1.7 / k, memory grows linearly with k)
+DEFAULT_SKETCH_K = 200
+
+# Each level below the top keeps this fraction of the capacity of the level above it
+LEVEL_CAPACITY_RATIO = 2.0 / 3.0
+MIN_LEVEL_CAPACITY = 2
+
+# Percentiles reported by default
+DEFAULT_PERCENTILES = (1, 5, 25, 50, 75, 95, 99)
+
+
+class QuantileSketch(object):
+    """
+    Compact, mergeable quantile sketch (KLL) of a stream of values.
+
+    Values enter level 0; when the sketch is full, the lowest level over its capacity is sorted and every
+    other value (random offset) moves up one level with twice the weight. Memory stays around 4 * k values however long the stream is,
+    count / min / max are exact, and sketches of separate chunks or runs merge level by level.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K, seed=None):
+        self.k = k
+        self.rng = np.random.default_rng(seed)
+        self.levels = [np.empty(0)]  # levels[h] holds values of weight 2 ** h
+        self.pending = []  # Single updates not yet added to level 0
+        self.pending_capacity = self._total_capacity()  # Pending values that fit before level 0 must be compacted
+        self.count = 0
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    @classmethod
+    def from_values(cls, values, k=DEFAULT_SKETCH_K):
+        """
+        Creates the sketch of an array of values.
+        """
+        sketch = cls(k)
+        sketch.update_batch(values)
+        return sketch
+
+    def _capacity(self, level):
+        depth = len(self.levels) - 1 - level
+        return max(MIN_LEVEL_CAPACITY, int(np.ceil(self.k * LEVEL_CAPACITY_RATIO ** depth)))
+
+    def _flush_pending(self):
+        if self.pending:
+            self.levels[0] = np.concatenate((self.levels[0], self.pending))
+            self.pending = []
+
+    def _compress(self):
+        """
+        Compacts the lowest over-capacity level until the sketch fits its total capacity (lazy KLL, so the
+        small low levels don't get compacted on every few updates).
+        """
+        while True:
+            sizes = [len(values) for values in self.levels]
+            capacities = [self._capacity(level) for level in range(len(self.levels))]
+            if sum(sizes) <= sum(capacities):
+                break
+            level = next(h for h in range(len(self.levels)) if sizes[h] >= capacities[h])
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+
+            values = np.sort(self.levels[level])
+            # An odd value out stays on this level, taken from a random end so neither tail is favoured
+            if len(values) % 2:
+                if self.rng.integers(2):
+                    values, kept = values[1:], values[:1]
+                else:
+                    values, kept = values[:-1], values[-1:]
+            else:
+                kept = np.empty(0)
+
+            self.levels[level] = kept
+            self.levels[level + 1] = np.concatenate((self.levels[level + 1], values[self.rng.integers(2)::2]))
+        self.pending_capacity = self._total_capacity() - sum(len(values) for values in self.levels)
+
+    def _total_capacity(self):
+        return sum(self._capacity(level) for level in range(len(self.levels)))
+
+    def update(self, value):
+        """
+        Adds one value.
+        """
+        self.pending.append(value)
+        self.count += 1
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+        # Buffer at least k single updates, so they are compacted in batches
+        if len(self.pending) > max(self.pending_capacity, self.k):
+            self._flush_pending()
+            self._compress()
+
+    def update_batch(self, values):
+        """
+        Adds a chunk of values (vectorized).
+        """
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+        self._flush_pending()
+        self.levels[0] = np.concatenate((self.levels[0], values))
+        self.count += len(values)
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        self._compress()
+
+    def merge(self, other):
+        """
+        Merges another sketch into this one.
+        """
+        if other.count == 0:
+            return
+        self._flush_pending()
+        other._flush_pending()
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, values in enumerate(other.levels):
+            self.levels[level] = np.concatenate((self.levels[level], values))
+        self.count += other.count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+
+    def quantiles(self, fractions):
+        """
+        Estimates quantiles (fractions between 0 and 1, NaN for an empty sketch).
+        """
+        fractions = np.asarray(fractions, dtype=np.float64)
+        if self.count == 0:
+            return np.full(fractions.shape, np.nan)
+        self._flush_pending()
+
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 2.0 ** h) for h, level in enumerate(self.levels)])
+        order = np.argsort(values, kind="stable")
+        values = values[order]
+        cumulative_weights = np.cumsum(weights[order])
+
+        # Smallest value whose cumulative weight reaches the requested rank, the extremes are exact
+        indices = np.searchsorted(cumulative_weights, fractions * cumulative_weights[-1], side="left")
+        estimates = values[np.clip(indices, 0, len(values) - 1)]
+        estimates = np.where(fractions <= 0, self.minimum, estimates)
+        return np.where(fractions >= 1, self.maximum, estimates)
+
+    def quantile(self, fraction):
+        return float(self.quantiles([fraction])[0])
+
+    def percentiles(self, percentiles=DEFAULT_PERCENTILES):
+        """
+        :return: Dictionary of percentile -> estimated value
+        """
+        return dict(zip(percentiles, self.quantiles(np.asarray(percentiles) / 100.0).tolist()))
+
+    @property
+    def num_retained(self):
+        """
+        Number of values the sketch currently holds.
+        """
+        return len(self.pending) + sum(len(level) for level in self.levels)
+
+    def to_dict(self):
+        self._flush_pending()
+        return {
+            "k": self.k,
+            "count": self.count,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "levels": [level.tolist() for level in self.levels],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.count = data["count"]
+        sketch.minimum = data["minimum"]
+        sketch.maximum = data["maximum"]
+        sketch.levels = [np.asarray(level, dtype=np.float64) for level in data["levels"]]
+        sketch.pending_capacity = sketch._total_capacity() - sum(len(values) for values in sketch.levels)
+        return sketch
+
+
+class RunDistributions(object):
+    """
+    Quantile sketches of the distances and of the intervals between consecutive samples of a run.
+
+    Steps back in time (a device counter wrap, rows out of order) aren't sample intervals and are skipped.
+    """
+
+    def __init__(self, k=DEFAULT_SKETCH_K):
+        self.distances = QuantileSketch(k)
+        self.intervals = QuantileSketch(k)
+        self.last_timestamp = None  # Timestamp of the previous sample (ms), for the next interval
+
+    def update(self, timestamp, distance):
+        """
+        Adds one sample.
+        """
+        self.distances.update(distance)
+        if self.last_timestamp is not None and timestamp >= self.last_timestamp:
+            self.intervals.update(timestamp - self.last_timestamp)
+        self.last_timestamp = timestamp
+
+    def update_batch(self, timesteps, distances):
+        """
+        Adds a chunk of samples, the interval to the previous chunk included.
+        """
+        timesteps = np.asarray(timesteps, dtype=np.float64)
+        if len(timesteps) == 0:
+            return
+        self.distances.update_batch(distances)
+        previous = [] if self.last_timestamp is None else [self.last_timestamp]
+        intervals = np.diff(timesteps, prepend=previous)
+        self.intervals.update_batch(intervals[intervals >= 0])
+        self.last_timestamp = float(timesteps[-1])
+
+    def merge(self, other):
+        """
+        Merges the distributions of another run (no interval is counted between the runs).
+        """
+        self.distances.merge(other.distances)
+        self.intervals.merge(other.intervals)
+
+    def to_dict(self):
+        return {
+            "distances": self.distances.to_dict(),
+            "intervals": self.intervals.to_dict(),
+            "last_timestamp": self.last_timestamp,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        distributions = cls()
+        distributions.distances = QuantileSketch.from_dict(data["distances"])
+        distributions.intervals = QuantileSketch.from_dict(data["intervals"])
+        distributions.last_timestamp = data["last_timestamp"]
+        return distributions
@@ -0,0 +1,208 @@
+# Import Python-native modules
+import os
+import re
+import time
+import datetime
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Import Pozyx-specific modules
+from pypozyx import POZYX_SUCCESS, POZYX_FAILURE
+from pypozyx.definitions.constants import ERROR_MESSAGES, POZYX_ERROR_GENERAL
+
+# Import custom modules
+from .run_io import iter_run_chunks, DEFAULT_CHUNK_SIZE
+from .error_bursts import read_error_file
+
+# Prefix the capture classes put in front of the device's error message
+RECORDED_ERROR_PREFIX = "ERROR Ranging, local "
+
+# Message recorded when the capture couldn't read the error code (getErrorCode() fails on replay)
+UNRETRIEVED_ERROR_MESSAGE = "ERROR Ranging, couldn't retrieve local error"
+
+# Start of a run as encoded in its file name (data_<run timestamp>_<protocol>.csv)
+RUN_TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"
+
+# Error message -> error code, to hand back the recorded code on replay
+ERROR_CODES_BY_MESSAGE = {message: code for code, message in ERROR_MESSAGES.items()}
+
+# One replayed pulse: a sample (error is None) or a failed ranging (distance is None)
+ReplayEvent = namedtuple("ReplayEvent", ["timestamp", "distance", "error"])
+
+
+def run_start_from_filename(filepath):
+    """
+    Returns the start of a capture encoded in its file name, or None.
+    """
+    match = re.search(r"\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}", os.path.basename(filepath))
+    if match is None:
+        return None
+    return datetime.datetime.strptime(match.group(0), RUN_TIMESTAMP_FORMAT)
+
+
+def load_error_events(errorfile, datafile=None):
+    """
+    Loads the failed rangings of an error .csv file onto the timeline of its data file.
+
+    Error files store either ms since the start of the run (PozyxClasses) or wall-clock times
+    (Pozyx1DCapture). Wall-clock times are taken relative to the run start in the data file's name,
+    or to the first error when the name doesn't have one.
+
+    :return: (timestamps (ms), error messages), sorted by time
+    """
+    df = read_error_file(errorfile)  # Error burst files are expanded to one row per failed ranging
+    if len(df) == 0:
+        return np.empty(0), []
+    stamps = df[df.columns[0]]
+    messages = df[df.columns[1]].astype(str).tolist()
+
+    if pd.api.types.is_numeric_dtype(stamps):
+        timestamps = stamps.to_numpy(dtype=np.float64)
+    else:
+        wall_clock = pd.to_datetime(stamps, format="ISO8601")  # str(datetime) drops zero microseconds
+        run_start = run_start_from_filename(datafile) if datafile else None
+        origin = wall_clock.iloc[0] if run_start is None else pd.Timestamp(run_start)
+        timestamps = ((wall_clock - origin).dt.total_seconds() * 1000.0).to_numpy()
+
+    order = np.argsort(timestamps, kind="stable")
+    return timestamps[order], [messages[i] for i in order]
+
+
+def iter_replay_events(datafile, errorfile=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Yields the samples of a run and its failed rangings in time order, reading the run chunksize rows at a time.
+
+    On equal timestamps the sample comes first.
+    """
+    error_timestamps, error_messages = (
+        load_error_events(errorfile, datafile) if errorfile else (np.empty(0), [])
+    )
+    next_error = 0
+
+    for timesteps, distances in iter_run_chunks(datafile, chunksize):
+        # Errors up to the end of this chunk (searchsorted keeps it vectorized)
+        end = next_error + np.searchsorted(error_timestamps[next_error:], timesteps[-1], side="right")
+        chunk_errors = error_timestamps[next_error:end]
+        positions = np.searchsorted(timesteps, chunk_errors, side="right")  # Errors go after equal samples
+
+        sample_index = 0
+        for error_index, position in enumerate(positions.tolist()):
+            for timestamp, distance in zip(timesteps[sample_index:position].tolist(), distances[sample_index:position].tolist()):
+                yield ReplayEvent(timestamp, distance, None)
+            sample_index = position
+            yield ReplayEvent(float(chunk_errors[error_index]), None, error_messages[next_error + error_index])
+        for timestamp, distance in zip(timesteps[sample_index:].tolist(), distances[sample_index:].tolist()):
+            yield ReplayEvent(timestamp, distance, None)
+        next_error = end
+
+    # Errors after the last sample
+    for error_index in range(next_error, len(error_messages)):
+        yield ReplayEvent(float(error_timestamps[error_index]), None, error_messages[error_index])
+
+
+class ReplayClock(object):
+    """
+    Paces replayed events to their recorded timestamps.
+    """
+
+    def __init__(self, speed=1.0):
+        """
+        :param speed: 1.0 for real time, N for N times faster, None (or 0) for as fast as possible
+        """
+        self.speed = speed
+        self.first_timestamp = None
+        self.start_time = None
+
+    def wait(self, timestamp):
+        """
+        Sleeps until the event with this timestamp (ms) is due.
+        """
+        if not self.speed:
+            return
+        if self.first_timestamp is None:
+            self.first_timestamp = timestamp
+            self.start_time = time.perf_counter()
+            return
+        due = self.start_time + (timestamp - self.first_timestamp) / 1000.0 / self.speed
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def replay_events(datafile, errorfile=None, speed=1.0, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Replays a capture as an iterator of ReplayEvents at its recorded pace (see ReplayClock for speed).
+    """
+    clock = ReplayClock(speed)
+    for event in iter_replay_events(datafile, errorfile, chunksize):
+        clock.wait(event.timestamp)
+        yield event
+
+
+class ReplayPozyxSerial(object):
+    """
+    Stands in for a PozyxSerial, replaying a recorded capture to the capture classes (doRanging() etc.).
+
+    Every doRanging() call returns the next recorded pulse: a sample fills the DeviceRange, a recorded error
+    fails and is handed back by getErrorCode() / getErrorMessage(). finished is set as soon as the last
+    recorded pulse has been returned, further doRanging() calls fail.
+    """
+
+    def __init__(self, datafile, errorfile=None, speed=1.0, chunksize=DEFAULT_CHUNK_SIZE):
+        """
+        :param datafile: Recorded data_*.csv (or .npy) file
+        :param errorfile: Matching error_*.csv file (None replays the samples only)
+        :param speed: 1.0 for real time, N for N times faster, None (or 0) for as fast as possible
+        """
+        self.datafile = datafile
+        self.errorfile = errorfile
+        self.speed = speed
+        self.events = iter_replay_events(datafile, errorfile, chunksize)
+        self.clock = ReplayClock(speed)
+        self.next_event = next(self.events, None)  # Read ahead, so finished is known right after the last pulse
+        self.protocol = None
+        self.error_message = None  # Message of the last failed ranging
+        self.num_events = 0
+        self.finished = self.next_event is None
+
+    def printDeviceInfo(self, remote_id=None):
+        print(f"Replay device {remote_id}: '{self.datafile}' (errors: '{self.errorfile}', speed: {self.speed or 'max'})")
+
+    def setRangingProtocol(self, protocol, remote_id=None):
+        self.protocol = protocol
+        return POZYX_SUCCESS
+
+    def doRanging(self, destination_id, device_range, remote_id=None):
+        event = self.next_event
+        if event is None:
+            self.error_message = "Replay finished"
+            return POZYX_FAILURE
+
+        self.next_event = next(self.events, None)
+        self.finished = self.next_event is None
+        self.clock.wait(event.timestamp)
+        self.num_events += 1
+        if event.error is not None:
+            self.error_message = event.error
+            return POZYX_FAILURE
+
+        device_range.timestamp = int(event.timestamp)
+        device_range.distance = int(event.distance)
+        device_range.RSS = 0  # Not recorded
+        return POZYX_SUCCESS
+
+    def getErrorCode(self, error_code, remote_id=None):
+        if self.error_message == UNRETRIEVED_ERROR_MESSAGE:
+            return POZYX_FAILURE
+        error_code.value = ERROR_CODES_BY_MESSAGE.get(self.getErrorMessage(error_code), POZYX_ERROR_GENERAL)
+        return POZYX_SUCCESS
+
+    def getErrorMessage(self, error_code):
+        """
+        Returns the recorded message of the last failed ranging (without the prefix the capture adds again).
+        """
+        message = self.error_message or ""
+        if message.startswith(RECORDED_ERROR_PREFIX):
+            message = message[len(RECORDED_ERROR_PREFIX):]
+        return message
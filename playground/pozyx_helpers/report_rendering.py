@@ -0,0 +1,136 @@
+# Import Python-native modules
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Import custom modules
+from .run_io import load_run, run_name
+from .spectral_analysis import compute_spectrum
+
+
+def compute_deviation_stats(distances):
+    """
+    Computes the mean and the value that deviates the most from it (as drawn by QtSinglePlotWindow).
+
+    :return: (mean, max_deviation, min_deviation, diff_line)
+    """
+    data_mean = distances.mean()
+    data_max_deviation = distances.max() - data_mean
+    data_min_deviation = data_mean - distances.min()
+
+    # Plot the deviation line above or below the mean, whichever deviates more
+    if data_max_deviation < data_min_deviation:
+        diff_line = data_mean - data_min_deviation
+    else:
+        diff_line = data_mean + data_max_deviation
+
+    return data_mean, data_max_deviation, data_min_deviation, diff_line
+
+
+def _new_axes(title, xlabel, ylabel):
+    """
+    Creates a stand-alone Agg figure (no pyplot global state) with a single set of axes.
+    """
+    figure = Figure(figsize=(10, 6))
+    FigureCanvasAgg(figure)
+    ax = figure.subplots()
+    ax.set_title(title, fontsize=16, fontweight="bold")
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    return figure, ax
+
+
+def _save(figure, output_dir, name, suffix, dpi):
+    filename = os.path.join(output_dir, f"{name}_{suffix}.png")
+    figure.savefig(filename, dpi=dpi, bbox_inches="tight")
+    return filename
+
+
+def render_run_report(filepath, output_dir, dpi=100):
+    """
+    Renders every report figure for a single run file.
+
+    :return: List of the .png files written
+    """
+    timesteps, distances = load_run(filepath)
+    name = run_name(filepath)
+    filenames = []
+
+    # Raw data
+    figure, ax = _new_axes(f"1-D Pozyx Data ({name})", "Timesteps (ms)", "Distance (mm)")
+    ax.plot(timesteps, distances, color="blue", linewidth=1)
+    filenames.append(_save(figure, output_dir, name, "raw", dpi))
+
+    # Mean / max deviation overlay
+    data_mean, _, _, diff_line = compute_deviation_stats(distances)
+    figure, ax = _new_axes(f"Mean and Max Deviation ({name})", "Timesteps (ms)", "Distance (mm)")
+    ax.plot(timesteps, distances, color="blue", label="Pozyx Data", linewidth=1)
+    ax.axhline(y=data_mean, color="green", label="Mean", linewidth=1)
+    ax.axhline(y=diff_line, color="red", label="Max Deviation", linewidth=1)
+    ax.annotate(f"Mean: {data_mean:.2f}", xy=(1, data_mean), xycoords=("axes fraction", "data"),
+                textcoords="offset points", xytext=(-10, -10), ha="right")
+    ax.annotate(f"Deviation Value: {diff_line:.2f} || Difference: {abs(diff_line - data_mean):.2f}",
+                xy=(1, diff_line), xycoords=("axes fraction", "data"),
+                textcoords="offset points", xytext=(-10, 10), ha="right")
+    ax.legend(loc="upper left", bbox_to_anchor=(1, 1), fontsize="large")
+    filenames.append(_save(figure, output_dir, name, "deviation", dpi))
+
+    # FFT of the signal without its DC offset (single worker, the pool already uses every CPU)
+    spectrum = compute_spectrum(timesteps, distances, workers=1)
+    frequencies = spectrum.frequencies
+    magnitudes = spectrum.magnitude(dc=False)
+    phases = spectrum.phase(dc=False)
+    psd = spectrum.psd(dc=False)
+
+    for suffix, title, ylabel, values in (
+        ("fft_magnitude", "Magnitude Spectrum w/o DC Offset", "Magnitude", magnitudes),
+        ("fft_phase", "Phase Spectrum w/o DC Offset", "Phase (radians)", phases),
+        ("psd", "Power Spectral Density (w/o DC Offset)", "PSD", psd),
+    ):
+        figure, ax = _new_axes(f"{title} ({name})", "Frequency (Hz)", ylabel)
+        ax.plot(frequencies, values, linewidth=1)
+        filenames.append(_save(figure, output_dir, name, suffix, dpi))
+
+    return filenames
+
+
+def _init_worker():
+    """
+    Forces the Agg backend in every worker process.
+    """
+    matplotlib.use("Agg")
+
+
+def render_reports(filepaths, output_dir, workers=None, dpi=100):
+    """
+    Renders the report figures for many runs across a process pool.
+
+    Matplotlib keeps global state, so runs are spread over processes rather than threads.
+
+    :param filepaths: List of run files (see run_io.find_run_files())
+    :param output_dir: Directory the .png files are written to
+    :param workers: Number of worker processes (defaults to the number of CPUs)
+    :param dpi: Resolution of the written figures
+    :return: (list of written files, figures per second)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    start_time = time.perf_counter()
+    written = []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        futures = [
+            executor.submit(render_run_report, filepath, output_dir, dpi)
+            for filepath in filepaths
+        ]
+        for filepath, future in zip(filepaths, futures):
+            try:
+                written.extend(future.result())
+            except Exception as e:
+                print(f"Failed to render report for '{filepath}': {e}")
+    elapsed = time.perf_counter() - start_time
+
+    figures_per_second = len(written) / elapsed if elapsed > 0 else 0.0
+    return written, figures_per_second
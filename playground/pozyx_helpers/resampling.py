@@ -0,0 +1,150 @@
+# Import Python-native modules
+from fractions import Fraction
+import numpy as np
+from scipy.signal import lombscargle, resample_poly
+
+# Resampling methods accepted by resample_uniform()
+RESAMPLE_METHODS = ("linear", "polyphase")
+
+# Intervals longer than this many median intervals count as gaps (dropped pulses)
+GAP_FACTOR = 1.5
+
+
+def estimate_sample_rate(timesteps):
+    """
+    Estimates the true sample rate of a capture from its timesteps.
+
+    The median interval is used, so jitter and dropped pulses don't bias the estimate.
+
+    :param timesteps: Sample times (ms)
+    :return: Sample rate (Hz)
+    """
+    intervals = np.diff(timesteps)
+    intervals = intervals[intervals > 0]
+    if len(intervals) == 0:
+        raise ValueError("At least two distinct timesteps are needed to estimate the sample rate")
+    return 1000.0 / np.median(intervals)
+
+
+def find_gaps(timesteps, factor=GAP_FACTOR):
+    """
+    Returns the indices i where the interval timesteps[i] -> timesteps[i + 1] is a gap.
+    """
+    intervals = np.diff(timesteps)
+    return np.flatnonzero(intervals > factor * np.median(intervals))
+
+
+def resample_uniform(timesteps, values, fs=None, method="linear"):
+    """
+    Resamples a jittery capture onto a uniform time grid.
+
+    "linear" interpolates straight onto the target grid. "polyphase" interpolates onto a grid at the
+    capture's own rate and then changes rate with an anti-aliased polyphase filter (scipy resample_poly).
+
+    :param timesteps: Sample times (ms), increasing
+    :param values: Sample values
+    :param fs: Target sample rate (Hz), defaults to the estimated capture rate
+    :param method: One of RESAMPLE_METHODS
+    :return: (uniform timesteps (ms), resampled values)
+    """
+    if method not in RESAMPLE_METHODS:
+        raise ValueError(f"Invalid resampling method '{method}', expected one of {RESAMPLE_METHODS}")
+
+    timesteps = np.asarray(timesteps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    native_fs = estimate_sample_rate(timesteps)
+    if fs is None:
+        fs = native_fs
+
+    duration_ms = timesteps[-1] - timesteps[0]
+
+    if method == "linear":
+        uniform_timesteps = timesteps[0] + np.arange(int(duration_ms * fs / 1000) + 1) * (1000.0 / fs)
+        return uniform_timesteps, np.interp(uniform_timesteps, timesteps, values)
+
+    # Uniform grid at the native rate, then a rational rate change
+    native_timesteps = timesteps[0] + np.arange(int(duration_ms * native_fs / 1000) + 1) * (1000.0 / native_fs)
+    native_values = np.interp(native_timesteps, timesteps, values)
+
+    ratio = Fraction(fs / native_fs).limit_denominator(64)
+    if ratio == 1:
+        return native_timesteps, native_values
+
+    # Remove the mean so the filter's edge effects don't pull the ends towards zero
+    mean = native_values.mean()
+    resampled = resample_poly(native_values - mean, ratio.numerator, ratio.denominator) + mean
+    fs = native_fs * ratio.numerator / ratio.denominator
+    uniform_timesteps = timesteps[0] + np.arange(len(resampled)) * (1000.0 / fs)
+    return uniform_timesteps, resampled
+
+
+class StreamingResampler(object):
+    """
+    Linear resampling onto a uniform grid, one chunk at a time.
+
+    The grid starts at the first sample like resample_uniform(method="linear"), and the last sample of each
+    chunk is kept to interpolate across the chunk boundary, so the chunks together give the same output as
+    resampling the whole run at once.
+    """
+
+    def __init__(self, fs):
+        """
+        :param fs: Target sample rate (Hz)
+        """
+        self.fs = fs
+        self.origin = None  # Time of the first sample (ms), where the grid starts
+        self.next_index = 0  # Grid index of the next output sample
+        self.last_timestep = None  # Last sample of the previous chunk
+        self.last_value = None
+
+    def update(self, timesteps, values):
+        """
+        :param timesteps: Sample times (ms) of the next chunk, increasing
+        :param values: Sample values of the next chunk
+        :return: (uniform timesteps (ms), resampled values) up to the last sample of the chunk
+        """
+        timesteps = np.asarray(timesteps, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(timesteps) == 0:
+            return np.empty(0), np.empty(0)
+        if self.last_timestep is not None:
+            timesteps = np.concatenate(([self.last_timestep], timesteps))
+            values = np.concatenate(([self.last_value], values))
+        if self.origin is None:
+            self.origin = timesteps[0]
+
+        last_index = int((timesteps[-1] - self.origin) * self.fs / 1000)
+        uniform_timesteps = self.origin + np.arange(self.next_index, last_index + 1) * (1000.0 / self.fs)
+        self.next_index = max(self.next_index, last_index + 1)
+        self.last_timestep = timesteps[-1]
+        self.last_value = values[-1]
+        return uniform_timesteps, np.interp(uniform_timesteps, timesteps, values)
+
+
+def lomb_scargle(timesteps, values, frequencies=None, max_frequencies=4096):
+    """
+    Lomb-Scargle periodogram for gappy captures (no resampling needed).
+
+    The cost is O(samples * frequencies), so for long runs pass the frequencies of interest.
+
+    :param timesteps: Sample times (ms)
+    :param values: Sample values
+    :param frequencies: Frequencies to evaluate (Hz), defaults to steps of 1 / duration up to the Nyquist
+        rate (at most max_frequencies of them, coarser steps can miss narrow peaks)
+    :return: (frequencies (Hz), amplitude at each frequency)
+    """
+    timesteps = np.asarray(timesteps, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+
+    if frequencies is None:
+        nyquist = estimate_sample_rate(timesteps) / 2
+        resolution = 1000.0 / (timesteps[-1] - timesteps[0])
+        frequencies = np.arange(resolution, nyquist, resolution)
+        if len(frequencies) > max_frequencies:
+            frequencies = np.linspace(resolution, nyquist, max_frequencies)
+
+    times_s = (timesteps - timesteps[0]) / 1000
+    power = lombscargle(times_s, values - values.mean(), 2 * np.pi * frequencies)
+
+    # Unnormalized power is A**2 * N / 4 for a sinusoid of amplitude A
+    return frequencies, np.sqrt(4 * power / len(values))
@@ -0,0 +1,207 @@
+# Import Python-native modules
+import io
+import os
+import gzip
+import contextlib
+import numpy as np
+import pandas as pd
+
+# zstandard is optional; only needed for .zst run files
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Import custom modules
+from .profiling import profiled
+
+# Number of rows read at a time by the chunked readers
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+# Run files are compressed on the fly when their name ends with one of these (e.g. data_<run>.csv.gz)
+COMPRESSION_EXTENSIONS = {".gz": "gzip", ".zst": "zstd"}
+
+# Compression levels used when writing, gzip 6 and zstd 3 are both tools' own defaults
+DEFAULT_COMPRESSION_LEVELS = {"gzip": 6, "zstd": 3}
+
+# Extensions of run files: .csv (plain or compressed) and binary .npy
+RUN_FILE_EXTENSIONS = (".csv", ".npy") + tuple(".csv" + extension for extension in COMPRESSION_EXTENSIONS)
+
+# Name suffixes of files derived from a run (rebuilt timelines, expanded error bursts, Allan deviation tables,
+# live filter pipeline output), skipped when looking for runs in a directory
+DERIVED_RUN_SUFFIXES = ("_timeline", "_expanded", "_allan", "_pipeline")
+
+
+def is_binary_run(filepath):
+    """
+    Returns True for binary runs: .npy files holding an (n, 2) float64 array of timesteps and distances.
+    """
+    return filepath.endswith(".npy")
+
+
+def run_compression(filepath):
+    """
+    Returns the compression of a run file from its extension ("gzip", "zstd"), or None.
+    """
+    return COMPRESSION_EXTENSIONS.get(os.path.splitext(filepath)[1])
+
+
+def compression_extension(compression):
+    """
+    Returns the file extension of a compression ("gzip" -> ".gz", "zstd" -> ".zst", None -> "").
+    """
+    if compression is None:
+        return ""
+    for extension, name in COMPRESSION_EXTENSIONS.items():
+        if name == compression:
+            return extension
+    raise ValueError(f"Invalid compression '{compression}', expected one of {tuple(COMPRESSION_EXTENSIONS.values())}")
+
+
+def open_run_file(filepath, mode="r", level=None):
+    """
+    Opens a run file like open(), compressing or decompressing it on the fly when its extension asks for it.
+
+    Compressed files are streamed, so reading them only ever holds a block of the decompressed data. Text mode
+    is the default (with newline="", as the csv module expects).
+
+    :param mode: "r", "w" or "a", with "b" for binary
+    :param level: Compression level when writing (defaults to DEFAULT_COMPRESSION_LEVELS)
+    """
+    compression = run_compression(filepath)
+    binary = "b" in mode
+    if compression is None:
+        return open(filepath, mode) if binary else open(filepath, mode, newline="")
+
+    access = mode.replace("b", "").replace("t", "")
+    if level is None:
+        level = DEFAULT_COMPRESSION_LEVELS[compression]
+    if compression == "gzip":
+        file = gzip.open(filepath, access + "b", compresslevel=level)
+    elif zstandard is None:
+        raise ImportError("Reading and writing .zst run files requires the zstandard package")
+    elif access == "r":
+        # Appended runs hold several frames, read them all
+        file = io.BufferedReader(zstandard.ZstdDecompressor().stream_reader(
+            open(filepath, "rb"), read_across_frames=True, closefd=True
+        ))
+    else:
+        file = zstandard.ZstdCompressor(level=level).stream_writer(open(filepath, access + "b"), closefd=True)
+    return file if binary else io.TextIOWrapper(file, newline="")
+
+
+def _csv_source(filepath):
+    # pd.read_csv() is fastest on a path, compressed runs are streamed through open_run_file()
+    if run_compression(filepath) is None:
+        return contextlib.nullcontext(filepath)
+    return open_run_file(filepath)
+
+
+def run_data_size(filepath):
+    """
+    Returns the size of the (decompressed) data of a run file in bytes.
+    """
+    if run_compression(filepath) is None:
+        return os.path.getsize(filepath)
+    size = 0
+    with open_run_file(filepath, "rb") as file:
+        while True:
+            block = file.read(16 * 1024 * 1024)
+            if not block:
+                return size
+            size += len(block)
+
+
+@profiled
+def load_run(filepath):
+    """
+    Loads the first two columns (timesteps and distances) of a Pozyx run file.
+
+    :param filepath: Path to a run .csv (.csv.gz, .csv.zst or binary .npy) file
+    :return: (timesteps, distances) as float64 NumPy arrays
+    """
+    if is_binary_run(filepath):
+        data = np.load(filepath)
+        return data[:, 0].astype(np.float64), data[:, 1].astype(np.float64)
+
+    with _csv_source(filepath) as source:
+        df = pd.read_csv(source, usecols=[0, 1])
+    timesteps = df[df.columns[0]].to_numpy(dtype=np.float64)
+    distances = df[df.columns[1]].to_numpy(dtype=np.float64)
+    return timesteps, distances
+
+
+def iter_run_chunks(filepath, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Yields (timesteps, distances) chunks of a run file so that memory stays bounded.
+
+    Binary .npy runs are memory-mapped, .csv runs are parsed (and decompressed) chunksize rows at a time.
+    """
+    if is_binary_run(filepath):
+        data = np.load(filepath, mmap_mode="r")
+        for start in range(0, len(data), chunksize):
+            chunk = np.asarray(data[start:start + chunksize], dtype=np.float64)
+            yield chunk[:, 0], chunk[:, 1]
+        return
+
+    with _csv_source(filepath) as source:
+        for df in pd.read_csv(source, usecols=[0, 1], chunksize=chunksize):
+            yield (
+                df[df.columns[0]].to_numpy(dtype=np.float64),
+                df[df.columns[1]].to_numpy(dtype=np.float64),
+            )
+
+
+def run_name(filepath):
+    """
+    Returns the name of a run file without its directory and extension (compression extension included).
+    """
+    name = os.path.basename(filepath)
+    if run_compression(name) is not None:
+        name = os.path.splitext(name)[0]
+    return os.path.splitext(name)[0]
+
+
+def is_run_file(filepath):
+    """
+    Returns True for recorded or generated run files, False for other files and files derived from a run.
+    """
+    if not filepath.endswith(RUN_FILE_EXTENSIONS):
+        return False
+    return not run_name(filepath).endswith(DERIVED_RUN_SUFFIXES)
+
+
+def find_run_files(paths):
+    """
+    Expands directories into the run files they contain (sorted, see is_run_file()), files are kept as given.
+    """
+    filepaths = []
+    for path in paths:
+        if os.path.isdir(path):
+            filepaths.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path)
+                if is_run_file(name) and os.path.isfile(os.path.join(path, name))
+            ))
+        else:
+            filepaths.append(path)
+    return filepaths
+
+
+def count_run_rows(filepath, block_size=64 * 1024 * 1024):
+    """
+    Counts the samples of a run file without parsing it (newlines of a .csv after its header).
+    """
+    if is_binary_run(filepath):
+        return len(np.load(filepath, mmap_mode="r"))
+
+    num_lines, last_byte = 0, b"\n"
+    with open_run_file(filepath, "rb") as file:
+        while True:
+            block = file.read(block_size)
+            if not block:
+                break
+            num_lines += block.count(b"\n")
+            last_byte = block[-1:]
+    if last_byte != b"\n":
+        num_lines += 1  # Last row without a trailing newline
+    return max(num_lines - 1, 0)
@@ -0,0 +1,326 @@
+# Import Python-native modules
+import io
+import os
+import json
+import numpy as np
+import pandas as pd
+
+# Import custom modules
+from .quantile_sketch import RunDistributions
+from .run_io import (
+    is_binary_run, iter_run_chunks, open_run_file, run_compression, run_data_size, DEFAULT_CHUNK_SIZE
+)
+from .profiling import profiled
+
+# Suffix of the statistics sidecar written next to a run file
+STATS_SIDECAR_SUFFIX = ".stats.json"
+
+# Bytes parsed at a time when following a run file
+READ_BLOCK_SIZE = 64 * 1024 * 1024
+
+
+class RunningStats(object):
+    """
+    Single-pass, mergeable count / mean / variance / min / max of a distance stream.
+
+    Samples are added one at a time with Welford's update or a chunk at a time, and two accumulators
+    (e.g. of separate chunks or runs) merge exactly with Chan et al.'s parallel formula, so nothing has
+    to be re-read to update the statistics.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared differences from the mean
+        self.minimum = np.inf
+        self.maximum = -np.inf
+
+    @classmethod
+    def from_values(cls, values):
+        """
+        Creates the statistics of an array of values.
+        """
+        stats = cls()
+        stats.update_batch(values)
+        return stats
+
+    def update(self, value):
+        """
+        Adds one sample (Welford's update).
+        """
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def update_batch(self, values):
+        """
+        Adds a chunk of samples (vectorized, then merged).
+        """
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        chunk = RunningStats()
+        chunk.count = len(values)
+        chunk.mean = float(values.mean())
+        chunk.m2 = float(np.sum((values - chunk.mean) ** 2))
+        chunk.minimum = float(values.min())
+        chunk.maximum = float(values.max())
+        self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Merges the statistics of another accumulator into this one.
+        """
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def variance(self):
+        """
+        Sample variance (NaN for fewer than two samples).
+        """
+        return self.m2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.variance)
+
+    @property
+    def max_deviation(self):
+        """
+        How far the maximum lies above the mean.
+        """
+        return self.maximum - self.mean
+
+    @property
+    def min_deviation(self):
+        """
+        How far the minimum lies below the mean.
+        """
+        return self.mean - self.minimum
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data["count"]
+        stats.mean = data["mean"]
+        stats.m2 = data["m2"]
+        stats.minimum = data["minimum"]
+        stats.maximum = data["maximum"]
+        return stats
+
+
+def _skip_to(file, offset):
+    # Decompressing readers can't always seek, read up to the offset instead
+    if file.seekable():
+        file.seek(offset)
+        return
+    while offset > 0:
+        skipped = len(file.read(min(offset, READ_BLOCK_SIZE)))
+        if skipped == 0:
+            break
+        offset -= skipped
+
+
+class RunTail(object):
+    """
+    Follows a run .csv file that is still being written, parsing only the rows appended since the last read.
+
+    Statistics and quantile sketches (distances and sample intervals) are updated as rows arrive. Only complete lines are consumed, so a row
+    that is half written is picked up by the next read. Offsets of compressed runs count decompressed bytes, so
+    every read of those decompresses the file up to the offset again.
+    """
+
+    def __init__(self, filepath, keep_data=True, offset=0, stats=None, distributions=None):
+        """
+        :param filepath: Run .csv file
+        :param keep_data: Keep the timesteps and distances (False only keeps the statistics)
+        :param offset: Byte offset to start reading from (0 reads the header first)
+        :param stats: RunningStats of the rows before offset
+        :param distributions: RunDistributions of the rows before offset
+        """
+        self.filepath = filepath
+        self.keep_data = keep_data
+        self.offset = offset
+        self.stats = RunningStats() if stats is None else stats
+        self.distributions = RunDistributions() if distributions is None else distributions
+        self.timestep_chunks = []
+        self.distance_chunks = []
+
+    def reset(self):
+        """
+        Forgets the rows read so far, the next read starts over from the header.
+        """
+        self.offset = 0
+        self.stats = RunningStats()
+        self.distributions = RunDistributions()
+        self.timestep_chunks = []
+        self.distance_chunks = []
+
+    @property
+    def timesteps(self):
+        self.timestep_chunks = [np.concatenate(self.timestep_chunks)] if self.timestep_chunks else []
+        return self.timestep_chunks[0] if self.timestep_chunks else np.empty(0)
+
+    @property
+    def distances(self):
+        self.distance_chunks = [np.concatenate(self.distance_chunks)] if self.distance_chunks else []
+        return self.distance_chunks[0] if self.distance_chunks else np.empty(0)
+
+    @profiled
+    def read_new(self):
+        """
+        Reads the rows appended since the last read, READ_BLOCK_SIZE bytes at a time.
+
+        :return: Number of new rows
+        """
+        if run_compression(self.filepath) is None and os.path.getsize(self.filepath) < self.offset:
+            # The file was rewritten, start over
+            self.reset()
+
+        num_rows = 0
+        with open_run_file(self.filepath, "rb") as file:
+            _skip_to(file, self.offset)
+            data = b""
+            while True:
+                block = file.read(READ_BLOCK_SIZE)
+                data += block
+                end = data.rfind(b"\n") + 1  # Only consume complete lines, the rest waits for the next block
+                if end > 0:
+                    num_rows += self._parse(data[:end])
+                    self.offset += end
+                    data = data[end:]
+                if len(block) < READ_BLOCK_SIZE:
+                    break
+        return num_rows
+
+    def _parse(self, data):
+        if self.offset == 0:
+            data = data[data.find(b"\n") + 1:]  # Skip the header
+        if not data.strip():
+            return 0
+
+        df = pd.read_csv(io.BytesIO(data), header=None, usecols=[0, 1])
+        timesteps = df[0].to_numpy(dtype=np.float64)
+        distances = df[1].to_numpy(dtype=np.float64)
+        self.stats.update_batch(distances)
+        self.distributions.update_batch(timesteps, distances)
+        if self.keep_data:
+            self.timestep_chunks.append(timesteps)
+            self.distance_chunks.append(distances)
+        return len(distances)
+
+
+def stats_sidecar_path(filepath):
+    return filepath + STATS_SIDECAR_SUFFIX
+
+
+def _read_header(filepath):
+    with open_run_file(filepath, "rb") as file:
+        return file.readline().decode(errors="replace").strip()
+
+
+def save_run_stats(filepath, stats, offset=None, distributions=None):
+    """
+    Persists the statistics of a run next to it (<run>.stats.json).
+
+    :param offset: Byte offset of the rows the statistics cover (defaults to the whole file)
+    :param distributions: RunDistributions of the same rows (saved along when given)
+    """
+    sidecar = {
+        "header": _read_header(filepath),
+        "offset": run_data_size(filepath) if offset is None else offset,
+        "file_size": os.path.getsize(filepath),  # On disk, to tell whether a compressed run changed
+        "stats": stats.to_dict(),
+    }
+    if distributions is not None:
+        sidecar["distributions"] = distributions.to_dict()
+    with open(stats_sidecar_path(filepath), "w") as file:
+        json.dump(sidecar, file)
+
+
+def _update_sidecar(filepath):
+    """
+    Brings the sidecar of a run .csv file up to date, only parsing the rows it doesn't cover yet.
+
+    :return: RunTail holding the statistics and distributions of the whole file
+    """
+    offset, stats, distributions = 0, None, None
+    compressed = run_compression(filepath) is not None
+    try:
+        with open(stats_sidecar_path(filepath)) as file:
+            sidecar = json.load(file)
+        if compressed:
+            # Compressed runs can't be sized without decompressing them, they are only reused unchanged
+            valid = sidecar.get("file_size") == os.path.getsize(filepath)
+        else:
+            valid = sidecar["offset"] <= os.path.getsize(filepath)
+        if valid and sidecar["header"] == _read_header(filepath):
+            offset = sidecar["offset"]
+            stats = RunningStats.from_dict(sidecar["stats"])
+            distributions = RunDistributions.from_dict(sidecar["distributions"])
+    except (OSError, ValueError, KeyError):
+        offset, stats, distributions = 0, None, None
+
+    tail = RunTail(filepath, keep_data=False, offset=offset, stats=stats, distributions=distributions)
+    if compressed and stats is not None:
+        return tail
+    if tail.read_new() or stats is None:
+        save_run_stats(filepath, tail.stats, tail.offset, tail.distributions)
+    return tail
+
+
+def update_run_stats(filepath):
+    """
+    Returns the statistics of a run .csv file, only parsing the rows the sidecar doesn't cover yet.
+
+    The sidecar is written on the first call and brought up to date on later calls, so the statistics
+    of a finished run cost nothing and those of a growing run only cost its new rows.
+    """
+    return _update_sidecar(filepath).stats
+
+
+def update_run_distributions(filepath):
+    """
+    Returns the RunDistributions of a run .csv file through its sidecar (see update_run_stats()).
+    """
+    return _update_sidecar(filepath).distributions
+
+
+def merge_run_distributions(filepaths, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Merges the distance and sample interval sketches of many runs, without keeping their raw data.
+
+    .csv runs reuse their sidecars, binary .npy runs are sketched chunksize rows at a time.
+
+    :return: RunDistributions of all runs
+    """
+    merged = RunDistributions()
+    for filepath in filepaths:
+        if is_binary_run(filepath):
+            distributions = RunDistributions()
+            for timesteps, distances in iter_run_chunks(filepath, chunksize):
+                distributions.update_batch(timesteps, distances)
+        else:
+            distributions = update_run_distributions(filepath)
+        merged.merge(distributions)
+    return merged
@@ -0,0 +1,414 @@
+# Import Python-native modules
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy import fft as sp_fft
+from scipy.signal import get_window
+
+# Import custom modules
+from .run_io import load_run, iter_run_chunks, run_name, DEFAULT_CHUNK_SIZE
+from .resampling import estimate_sample_rate, resample_uniform, StreamingResampler
+from .outliers import hampel_filter
+from .profiling import profiled
+
+# Number of FFT worker threads (-1 uses every CPU), overridable with POZYX_FFT_WORKERS
+DEFAULT_FFT_WORKERS = int(os.environ.get("POZYX_FFT_WORKERS", "-1"))
+
+# Band mask modes accepted by Spectrum.frequency_mask()
+BAND_MODES = ("pass", "stop")
+
+# Ways of bringing runs to a common length in BatchSpectra
+BATCH_LENGTH_MODES = ("trim", "pad")
+
+# Maximum number of memoized spectra kept by load_spectrum()
+SPECTRUM_CACHE_SIZE = 16
+_spectrum_cache = OrderedDict()
+
+
+class Spectrum(object):
+    """
+    One-sided spectrum of a real Pozyx signal computed from a single rfft.
+
+    Captures are jittery, so the signal is first resampled onto a uniform grid at the estimated sample
+    rate (unless resample is None) and the frequency axis is in Hz.
+
+    The spectrum without the DC offset is derived from the same transform: removing the mean from
+    the n samples subtracts mean * (transform of n ones) from every bin, which is only bin 0 when no
+    zero padding is used and a closed-form Dirichlet kernel otherwise.
+
+    With reject_outliers, spikes are replaced by their Hampel window median before anything else.
+    """
+
+    def __init__(self, timesteps, distances, pad=True, workers=None, resample="linear", reject_outliers=False):
+        self.num_replaced = 0  # Outliers replaced before the transform
+        if reject_outliers:
+            distances, replaced = hampel_filter(distances)
+            self.num_replaced = int(np.count_nonzero(replaced))
+
+        self.timesteps = timesteps  # Raw sample times (ms)
+        self.distances = distances  # Raw distances (mm), w/o outliers when rejected
+        self.fs = estimate_sample_rate(timesteps)  # Estimated sample rate (Hz)
+
+        # Uniformly spaced signal that is actually transformed
+        if resample is None:
+            self.uniform_timesteps, self.uniform_distances = timesteps, distances
+        else:
+            self.uniform_timesteps, self.uniform_distances = resample_uniform(
+                timesteps, distances, self.fs, method=resample
+            )
+
+        self.n = len(self.uniform_distances)  # Number of samples
+        self.nfft = sp_fft.next_fast_len(self.n, real=True) if pad else self.n  # Transform length
+        self.mean = self.uniform_distances.mean()
+
+        if workers is None:
+            workers = DEFAULT_FFT_WORKERS
+
+        # One real-input FFT for the whole signal (n // 2 + 1 positive frequency bins)
+        self.transformed = sp_fft.rfft(self.uniform_distances, n=self.nfft, workers=workers)
+        self.frequencies = sp_fft.rfftfreq(self.nfft, 1 / self.fs)
+
+        self._transformed_wo_dc = None
+
+    @property
+    def transformed_wo_dc(self):
+        """
+        Spectrum of (distances - mean), derived from the cached transform.
+        """
+        if self._transformed_wo_dc is None:
+            if self.nfft == self.n:
+                dc_kernel = np.zeros(len(self.transformed))
+                dc_kernel[0] = self.n
+            else:
+                # Sum of exp(-2j*pi*k*m/nfft) over the n unpadded samples m
+                k = np.arange(len(self.transformed))
+                dc_kernel = np.empty(len(k), dtype=np.complex128)
+                dc_kernel[0] = self.n
+                w = np.exp(-2j * np.pi * k[1:] / self.nfft)
+                w_n = np.exp(-2j * np.pi * k[1:] * self.n / self.nfft)
+                dc_kernel[1:] = (1 - w_n) / (1 - w)
+            self._transformed_wo_dc = self.transformed - self.mean * dc_kernel
+        return self._transformed_wo_dc
+
+    def _select(self, dc):
+        return self.transformed if dc else self.transformed_wo_dc
+
+    def magnitude(self, dc=True):
+        """
+        Magnitudes normalized by the number of samples.
+        """
+        return np.abs(self._select(dc)) / self.n
+
+    def phase(self, dc=True):
+        """
+        Phases in radians.
+        """
+        return np.angle(self._select(dc))
+
+    def psd(self, dc=False):
+        """
+        Power spectral density as the squared normalized magnitude.
+        """
+        return np.square(self.magnitude(dc))
+
+    def frequency_mask(self, psd_threshold=None, band=None, band_mode="pass"):
+        """
+        Builds a boolean mask of the bins to keep.
+
+        The DC bin is always kept, so the filtered signal keeps its offset.
+
+        :param psd_threshold: Keep only bins whose PSD (w/o DC offset) is above this value
+        :param band: (low, high) frequencies (Hz) of a band mask
+        :param band_mode: "pass" keeps the band, "stop" removes it
+        """
+        mask = np.ones(len(self.transformed), dtype=bool)
+        if psd_threshold:
+            mask &= self.psd(dc=False) > psd_threshold
+        if band is not None:
+            if band_mode not in BAND_MODES:
+                raise ValueError(f"Invalid band mode '{band_mode}', expected one of {BAND_MODES}")
+            in_band = (self.frequencies >= band[0]) & (self.frequencies <= band[1])
+            mask &= in_band if band_mode == "pass" else ~in_band
+        mask[0] = True
+        return mask
+
+    def filtered_signal(self, mask):
+        """
+        Rebuilds the time signal from the masked cached spectrum with a single irfft.
+
+        The mask is applied to the spectrum w/o DC offset and the mean is added back afterwards, so the
+        step into the zero padding doesn't ring through the filtered signal.
+
+        :return: (uniform timesteps (ms), filtered distances (mm))
+        """
+        filtered = sp_fft.irfft(self.transformed_wo_dc * mask, n=self.nfft)[: self.n] + self.mean
+        return self.uniform_timesteps, filtered
+
+    def max_magnitude(self, dc=False):
+        """
+        Returns the largest magnitude and the frequency it occurs at.
+        """
+        magnitudes = self.magnitude(dc)
+        index = np.argmax(magnitudes)
+        return magnitudes[index], self.frequencies[index]
+
+
+def compute_spectrum(timesteps, distances, pad=True, workers=None, resample="linear", reject_outliers=False):
+    """
+    Computes the Spectrum of a signal.
+
+    :param timesteps: Sample times (ms)
+    :param distances: Distances (mm)
+    :param pad: Zero pad to scipy.fft.next_fast_len
+    :param workers: Number of FFT worker threads (defaults to DEFAULT_FFT_WORKERS)
+    :param resample: Resampling method (see resampling.RESAMPLE_METHODS), or None to use the samples as-is
+    :param reject_outliers: Replace spikes with their Hampel window median first (see outliers.hampel_filter)
+    """
+    return Spectrum(
+        np.asarray(timesteps, dtype=np.float64),
+        np.asarray(distances, dtype=np.float64),
+        pad=pad,
+        workers=workers,
+        resample=resample,
+        reject_outliers=reject_outliers,
+    )
+
+
+@profiled
+def load_spectrum(filepath, pad=True, workers=None, resample="linear", reject_outliers=False):
+    """
+    Loads a run file and computes its Spectrum, memoized per (file, parameters).
+
+    The cache key includes the file's modification time and size, so edited files are recomputed.
+    """
+    stat = os.stat(filepath)
+    key = (os.path.abspath(filepath), stat.st_mtime_ns, stat.st_size, pad, resample, reject_outliers)
+
+    if key in _spectrum_cache:
+        _spectrum_cache.move_to_end(key)
+        return _spectrum_cache[key]
+
+    timesteps, distances = load_run(filepath)
+    spectrum = compute_spectrum(
+        timesteps, distances, pad=pad, workers=workers, resample=resample, reject_outliers=reject_outliers
+    )
+
+    _spectrum_cache[key] = spectrum
+    if len(_spectrum_cache) > SPECTRUM_CACHE_SIZE:
+        _spectrum_cache.popitem(last=False)
+
+    return spectrum
+
+
+class StreamingWelch(object):
+    """
+    Welch-averaged PSD and STFT spectrogram computed over overlapping segments of a stream.
+
+    Samples are consumed chunk by chunk: only the tail of the last chunk (less than one segment) is
+    kept between updates. The spectrogram holds at most 2 * max_columns time columns; whenever it
+    fills up, neighbouring columns are averaged together, so memory is bounded for runs of any length.
+    """
+
+    def __init__(self, fs, nperseg=256, noverlap=None, window="hann", max_columns=512, workers=None):
+        if noverlap is None:
+            noverlap = nperseg // 2
+        if not 0 <= noverlap < nperseg:
+            raise ValueError("noverlap must be smaller than nperseg")
+
+        self.fs = fs  # Sample rate (Hz)
+        self.nperseg = nperseg  # Samples per segment
+        self.step = nperseg - noverlap  # Samples between segment starts
+        self.max_columns = max_columns
+        self.workers = DEFAULT_FFT_WORKERS if workers is None else workers
+
+        self.window = get_window(window, nperseg)
+        self.frequencies = sp_fft.rfftfreq(nperseg, 1 / fs)
+
+        # Density scaling (matches scipy.signal.welch), doubled for the one-sided spectrum
+        self.scale = np.full(len(self.frequencies), 2 / (fs * np.sum(self.window ** 2)))
+        self.scale[0] /= 2
+        if nperseg % 2 == 0:
+            self.scale[-1] /= 2
+
+        self.carry = np.empty(0)  # Samples not yet part of a complete segment
+        self.num_samples = 0
+        self.num_segments = 0
+        self.psd_sum = np.zeros(len(self.frequencies))
+
+        self.columns = []  # Spectrogram columns, each the mean of self.group segments
+        self.group = 1
+        self.pending_sum = np.zeros(len(self.frequencies))
+        self.pending_count = 0
+
+    def update(self, values):
+        """
+        Consumes a chunk of samples, processing every segment that is now complete.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        self.num_samples += len(values)
+        buffer = np.concatenate((self.carry, values))
+        if len(buffer) < self.nperseg:
+            self.carry = buffer
+            return
+
+        segments = sliding_window_view(buffer, self.nperseg)[:: self.step]
+        self.carry = buffer[len(segments) * self.step:].copy()
+
+        # Remove each segment's mean (constant detrend), window, and transform all segments at once
+        segments = (segments - segments.mean(axis=1, keepdims=True)) * self.window
+        powers = np.square(np.abs(sp_fft.rfft(segments, axis=1, workers=self.workers))) * self.scale
+
+        self.psd_sum += powers.sum(axis=0)
+        self.num_segments += len(powers)
+        self._add_columns(powers)
+
+    def _add_columns(self, powers):
+        # Top up the partially filled column first
+        take = min(self.group - self.pending_count, len(powers))
+        self.pending_sum += powers[:take].sum(axis=0)
+        self.pending_count += take
+        powers = powers[take:]
+        if self.pending_count == self.group:
+            self.columns.append(self.pending_sum / self.group)
+            self.pending_sum = np.zeros(len(self.frequencies))
+            self.pending_count = 0
+
+        # Whole columns in one reshape, the remainder starts a new pending column
+        num_full = len(powers) // self.group
+        if num_full:
+            full = powers[: num_full * self.group].reshape(num_full, self.group, -1).mean(axis=1)
+            self.columns.extend(full)
+        remainder = powers[num_full * self.group:]
+        self.pending_sum += remainder.sum(axis=0)
+        self.pending_count += len(remainder)
+
+        # Halve the time resolution whenever the spectrogram is full
+        while len(self.columns) >= 2 * self.max_columns:
+            merged = np.asarray(self.columns[: len(self.columns) // 2 * 2])
+            merged = merged.reshape(-1, 2, len(self.frequencies)).mean(axis=1)
+            leftover = self.columns[len(self.columns) // 2 * 2:]
+            self.columns = list(merged)
+            self.group *= 2
+            if leftover:
+                # An odd column out counts as half of the next (doubled) column
+                self.pending_sum += leftover[0] * (self.group // 2)
+                self.pending_count += self.group // 2
+
+    def psd(self):
+        """
+        Returns (frequencies, Welch-averaged PSD).
+        """
+        if self.num_segments == 0:
+            raise ValueError(f"Not enough samples for a single segment of {self.nperseg} samples")
+        return self.frequencies, self.psd_sum / self.num_segments
+
+    def spectrogram(self):
+        """
+        Returns (times in seconds, frequencies, power array of shape (frequencies, times)).
+        """
+        columns = list(self.columns)
+        counts = [self.group] * len(columns)
+        if self.pending_count:
+            columns.append(self.pending_sum / self.pending_count)
+            counts.append(self.pending_count)
+        if not columns:
+            raise ValueError(f"Not enough samples for a single segment of {self.nperseg} samples")
+
+        # Center of each column: the mean of the segment centers it averages
+        starts = np.arange(len(columns)) * self.group * self.step
+        times = (starts + (np.asarray(counts) - 1) * self.step / 2 + self.nperseg / 2) / self.fs
+        return times, self.frequencies, np.asarray(columns).T
+
+
+def stream_welch(
+    filepath, nperseg=256, noverlap=None, max_columns=512, chunksize=DEFAULT_CHUNK_SIZE, resample=True
+):
+    """
+    Streams a run file (CSV chunks or a memory-mapped .npy) through a StreamingWelch.
+
+    The sample rate is estimated from the first chunk.
+
+    :param resample: Linearly resample the jittery samples onto a uniform grid at that rate first (see
+                     resampling.StreamingResampler), False to use the samples as-is
+    """
+    welch = None
+    resampler = None
+    for timesteps, distances in iter_run_chunks(filepath, chunksize):
+        if welch is None:
+            fs = estimate_sample_rate(timesteps)
+            welch = StreamingWelch(fs, nperseg=nperseg, noverlap=noverlap, max_columns=max_columns)
+            resampler = StreamingResampler(fs) if resample else None
+        if resampler is not None:
+            timesteps, distances = resampler.update(timesteps, distances)
+        welch.update(distances)
+
+    if welch is None:
+        raise ValueError(f"No samples in '{filepath}'")
+    return welch
+
+
+class BatchSpectra(object):
+    """
+    Spectra (without DC offset) of many runs computed in one 2-D rfft.
+
+    Every run is resampled to a common sample rate, then all runs are trimmed to the shortest run
+    or zero padded to the longest, and transformed together along axis 1.
+    """
+
+    def __init__(self, runs, names=None, length="trim", fs=None, workers=None):
+        if length not in BATCH_LENGTH_MODES:
+            raise ValueError(f"Invalid length mode '{length}', expected one of {BATCH_LENGTH_MODES}")
+        if not runs:
+            raise ValueError("At least one run is needed")
+
+        self.names = names if names is not None else [f"Run {i}" for i in range(len(runs))]
+        self.length = length
+
+        # Common sample rate (Hz): the median of the runs' own rates
+        if fs is None:
+            fs = np.median([estimate_sample_rate(timesteps) for timesteps, _ in runs])
+        self.fs = fs
+
+        resampled = [resample_uniform(timesteps, distances, fs)[1] for timesteps, distances in runs]
+        lengths = np.array([len(distances) for distances in resampled])
+        self.n = lengths.min() if length == "trim" else lengths.max()
+
+        # Stack the mean-removed runs into one (runs, samples) array, zero padded where too short
+        batch = np.zeros((len(resampled), self.n))
+        for i, distances in enumerate(resampled):
+            samples = distances[: self.n]
+            batch[i, : len(samples)] = samples - samples.mean()
+        self.samples_per_run = np.minimum(lengths, self.n)
+
+        if workers is None:
+            workers = DEFAULT_FFT_WORKERS
+        self.nfft = sp_fft.next_fast_len(self.n, real=True)
+        self.transformed = sp_fft.rfft(batch, n=self.nfft, axis=1, workers=workers)
+        self.frequencies = sp_fft.rfftfreq(self.nfft, 1 / fs)
+
+    def magnitudes(self):
+        """
+        Magnitudes normalized by each run's number of samples, shape (runs, frequencies).
+        """
+        return np.abs(self.transformed) / self.samples_per_run[:, np.newaxis]
+
+    def max_magnitudes(self):
+        """
+        Returns the largest magnitude of every run and the frequencies they occur at.
+        """
+        magnitudes = self.magnitudes()
+        indices = np.argmax(magnitudes, axis=1)
+        return magnitudes[np.arange(len(indices)), indices], self.frequencies[indices]
+
+
+def load_batch_spectra(filepaths, length="trim", fs=None, workers=None, load_threads=8):
+    """
+    Loads many run files (in parallel threads) and computes their BatchSpectra.
+    """
+    with ThreadPoolExecutor(max_workers=load_threads) as executor:
+        runs = list(executor.map(load_run, filepaths))
+
+    names = [run_name(filepath) for filepath in filepaths]
+    return BatchSpectra(runs, names=names, length=length, fs=fs, workers=workers)
@@ -0,0 +1,141 @@
+# Import Python-native modules
+import os
+import time
+import numpy as np
+
+# Import custom modules
+from .run_io import is_binary_run, DEFAULT_CHUNK_SIZE
+
+# Header of generated .csv runs (same as the capture scripts write)
+CSV_HEADER = "Timestamp (ms),Distance (mm)\n"
+
+# (frequency (Hz), amplitude (mm)) of the default motion: slow sway plus a faster vibration
+DEFAULT_TONES = ((0.2, 150.0), (3.0, 20.0))
+
+
+class SyntheticRunGenerator(object):
+    """
+    Generates realistic Pozyx ranging runs with NumPy, one chunk at a time.
+
+    Distances are a multi-tone motion around a base distance plus Gaussian noise, with multipath spikes
+    (always longer, the signal took a detour) on a fraction of the samples. Dropouts are bursts of failed
+    pulses, so they show up as gaps in the timestamps, and every timestamp jitters around its pulse time.
+    Like real captures, timestamps and distances are whole milliseconds and millimetres.
+
+    The random draws of every chunk depend only on the seed and the chunk's position, but a chunk's pulse offset
+    (first_pulse) is where the previous chunk's dropouts left off, so chunks are generated in sequence (see
+    chunks()). Regenerating a chunk with the same position and first_pulse gives the same samples.
+    """
+
+    def __init__(self,
+                 sample_rate=62.0,
+                 base_distance=1800.0,
+                 tones=DEFAULT_TONES,
+                 noise_std=5.0,
+                 spike_rate=0.002,
+                 spike_scale=300.0,
+                 dropout_rate=0.005,
+                 dropout_length=3.0,
+                 jitter_std_ms=1.0,
+                 seed=0,
+    ):
+        """
+        :param sample_rate: Pulse rate (Hz)
+        :param base_distance: Distance the motion is centered on (mm)
+        :param tones: (frequency (Hz), amplitude (mm)) pairs of the motion
+        :param noise_std: Standard deviation of the Gaussian noise (mm)
+        :param spike_rate: Fraction of the samples hit by a multipath spike
+        :param spike_scale: Mean extra distance of a spike (mm, exponentially distributed)
+        :param dropout_rate: Probability that a burst of failed pulses follows a sample
+        :param dropout_length: Mean number of failed pulses per burst
+        :param jitter_std_ms: Standard deviation of the timestamp jitter (ms)
+        :param seed: Random seed
+        """
+        self.sample_rate = sample_rate
+        self.base_distance = base_distance
+        self.tones = tones
+        self.noise_std = noise_std
+        self.spike_rate = spike_rate
+        self.spike_scale = spike_scale
+        self.dropout_rate = dropout_rate
+        self.dropout_length = dropout_length
+        self.jitter_std_ms = jitter_std_ms
+        self.seed = seed
+
+    def generate_chunk(self, chunk_index, first_pulse, num_samples):
+        """
+        Generates one chunk of samples.
+
+        :param chunk_index: Position of the chunk (selects its random stream)
+        :param first_pulse: Pulse index the chunk starts at (the last pulse of the previous chunk + 1)
+        :param num_samples: Number of recorded samples
+        :return: (timesteps (ms), distances (mm), index of the pulse after the chunk), int64 arrays
+        """
+        rng = np.random.default_rng([self.seed, chunk_index])
+
+        # Pulse index of every recorded sample, skipping the pulses lost in dropout bursts
+        skips = np.where(
+            rng.random(num_samples) < self.dropout_rate, rng.geometric(1.0 / self.dropout_length, num_samples), 0
+        )
+        pulses = first_pulse + np.arange(num_samples) + np.cumsum(skips) - skips
+        next_pulse = int(pulses[-1] + skips[-1] + 1) if num_samples else first_pulse
+
+        times = pulses / self.sample_rate  # (s)
+        distances = np.full(num_samples, self.base_distance)
+        for frequency, amplitude in self.tones:
+            distances += amplitude * np.sin(2 * np.pi * frequency * times)
+        distances += rng.normal(0.0, self.noise_std, num_samples)
+        spikes = rng.random(num_samples) < self.spike_rate
+        distances[spikes] += rng.exponential(self.spike_scale, np.count_nonzero(spikes))
+
+        timesteps = np.rint(times * 1000.0 + rng.normal(0.0, self.jitter_std_ms, num_samples)).astype(np.int64)
+        return timesteps, np.rint(distances).astype(np.int64), next_pulse
+
+    def chunks(self, num_samples, chunksize=DEFAULT_CHUNK_SIZE):
+        """
+        Yields (timesteps, distances) chunks of a run of num_samples recorded samples.
+        """
+        next_pulse = 0
+        for chunk_index, start in enumerate(range(0, num_samples, chunksize)):
+            timesteps, distances, next_pulse = self.generate_chunk(
+                chunk_index, next_pulse, min(chunksize, num_samples - start)
+            )
+            yield timesteps, distances
+
+
+def format_csv_rows(timesteps, distances):
+    """
+    Formats integer samples as .csv rows in one string operation (much faster than csv.writer or np.savetxt).
+    """
+    values = np.column_stack((timesteps, distances)).ravel().tolist()
+    return ("%d,%d\n" * len(timesteps)) % tuple(values)
+
+
+def write_synthetic_run(filepath, num_samples, generator=None, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Streams a synthetic run to a .csv (or binary .npy) file chunk by chunk, so memory stays bounded.
+
+    :param generator: SyntheticRunGenerator (defaults to its default settings)
+    :return: (number of bytes written, seconds taken)
+    """
+    if generator is None:
+        generator = SyntheticRunGenerator()
+    start_time = time.perf_counter()
+
+    if is_binary_run(filepath):
+        # Same (n, 2) float64 layout load_run() and iter_run_chunks() read
+        data = np.lib.format.open_memmap(filepath, mode="w+", dtype=np.float64, shape=(num_samples, 2))
+        start = 0
+        for timesteps, distances in generator.chunks(num_samples, chunksize):
+            data[start:start + len(timesteps), 0] = timesteps
+            data[start:start + len(timesteps), 1] = distances
+            start += len(timesteps)
+        data.flush()
+        del data
+    else:
+        with open(filepath, "w", newline="") as file:
+            file.write(CSV_HEADER)
+            for timesteps, distances in generator.chunks(num_samples, chunksize):
+                file.write(format_csv_rows(timesteps, distances))
+
+    return os.path.getsize(filepath), time.perf_counter() - start_time
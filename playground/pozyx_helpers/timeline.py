@@ -0,0 +1,275 @@
+# Import Python-native modules
+import os
+import numpy as np
+import pandas as pd
+
+# Import custom modules
+from .run_io import run_name
+from .error_bursts import read_error_file, wall_clock_to_epoch_ms
+
+# The device's millisecond counter (DeviceRange.timestamp) is a uint32 and wraps around after ~49.7 days
+DEVICE_TIMESTAMP_MODULUS = 2 ** 32
+
+# Column names of the device and host timestamps in the run files of both capture classes
+DEVICE_TIMESTAMP_COLUMNS = ("Pozyx Timestamp (ms)", "Timestamp (ms)")
+HOST_TIMESTAMP_COLUMNS = ("Host Timestamp (ms)", "Timestep (ms)")
+
+
+class TimestampUnwrapper(object):
+    """
+    Unwraps a device timestamp counter, one chunk (or sample) at a time.
+
+    A step back by more than half the counter range is a wrap; every wrap so far adds one modulus.
+    """
+
+    def __init__(self, modulus=DEVICE_TIMESTAMP_MODULUS):
+        self.modulus = modulus
+        self.previous = None  # Last raw timestamp
+        self.num_wraps = 0
+
+    def unwrap(self, timestamps):
+        """
+        :param timestamps: Raw device timestamps (ms)
+        :return: Unwrapped int64 timestamps (ms)
+        """
+        timestamps = np.asarray(timestamps, dtype=np.int64)
+        if len(timestamps) == 0:
+            return timestamps
+
+        previous = timestamps[0] if self.previous is None else self.previous
+        steps = np.diff(timestamps, prepend=previous)
+        wraps = self.num_wraps + np.cumsum(steps < -self.modulus // 2)
+        self.previous = int(timestamps[-1])
+        self.num_wraps = int(wraps[-1])
+        return timestamps + wraps * self.modulus
+
+    def unwrap_sample(self, timestamp):
+        """
+        Unwraps a single raw device timestamp (ms), cheaper than unwrap() in a per-pulse loop.
+        """
+        timestamp = int(timestamp)
+        if self.previous is not None and timestamp - self.previous < -self.modulus // 2:
+            self.num_wraps += 1
+        self.previous = timestamp
+        return timestamp + self.num_wraps * self.modulus
+
+
+def unwrap_device_timestamps(timestamps, modulus=DEVICE_TIMESTAMP_MODULUS):
+    """
+    Unwraps a whole series of device timestamps (see TimestampUnwrapper).
+    """
+    return TimestampUnwrapper(modulus).unwrap(timestamps)
+
+
+class ClockRegression(object):
+    """
+    Streaming least-squares fit of host time against device time: host = intercept + slope * device.
+
+    slope - 1 is the drift of the device clock against the host clock, the intercept their offset. Like
+    RunningStats, the fit is kept as means and co-moments that update per sample or per chunk and merge
+    exactly. Times are taken relative to the first pair, so epoch-sized host times don't cost precision.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.device_origin = None  # First (device, host) pair, subtracted from every pair
+        self.host_origin = None
+        self.device_mean = 0.0  # Relative to the origins
+        self.host_mean = 0.0
+        self.device_m2 = 0.0  # Sum of squared device deviations
+        self.co_moment = 0.0  # Sum of device * host deviation products
+
+    def _set_origin(self, device_time, host_time):
+        if self.device_origin is None:
+            self.device_origin = float(device_time)
+            self.host_origin = float(host_time)
+
+    def update(self, device_time, host_time):
+        """
+        Adds one (device, host) timestamp pair (ms).
+        """
+        self._set_origin(device_time, host_time)
+        device_time -= self.device_origin
+        host_time -= self.host_origin
+
+        self.count += 1
+        device_delta = device_time - self.device_mean
+        self.device_mean += device_delta / self.count
+        self.host_mean += (host_time - self.host_mean) / self.count
+        self.device_m2 += device_delta * (device_time - self.device_mean)
+        self.co_moment += device_delta * (host_time - self.host_mean)
+
+    def update_batch(self, device_times, host_times):
+        """
+        Adds a chunk of timestamp pairs (vectorized, then merged).
+        """
+        device_times = np.asarray(device_times, dtype=np.float64)
+        host_times = np.asarray(host_times, dtype=np.float64)
+        if len(device_times) == 0:
+            return
+        self._set_origin(device_times[0], host_times[0])
+
+        chunk = ClockRegression()
+        chunk.device_origin = self.device_origin
+        chunk.host_origin = self.host_origin
+        chunk.count = len(device_times)
+        device_times = device_times - self.device_origin
+        host_times = host_times - self.host_origin
+        chunk.device_mean = float(device_times.mean())
+        chunk.host_mean = float(host_times.mean())
+        device_deviations = device_times - chunk.device_mean
+        chunk.device_m2 = float(np.dot(device_deviations, device_deviations))
+        chunk.co_moment = float(np.dot(device_deviations, host_times - chunk.host_mean))
+        self.merge(chunk)
+
+    def merge(self, other):
+        """
+        Merges the fit of another chunk into this one.
+        """
+        if other.count == 0:
+            return
+        self._set_origin(other.device_origin, other.host_origin)
+        # Means of the other fit relative to this fit's origins
+        other_device_mean = other.device_mean + (other.device_origin - self.device_origin)
+        other_host_mean = other.host_mean + (other.host_origin - self.host_origin)
+
+        count = self.count + other.count
+        device_delta = other_device_mean - self.device_mean
+        host_delta = other_host_mean - self.host_mean
+        weight = self.count * other.count / count
+        self.device_m2 += other.device_m2 + device_delta * device_delta * weight
+        self.co_moment += other.co_moment + device_delta * host_delta * weight
+        self.device_mean += device_delta * other.count / count
+        self.host_mean += host_delta * other.count / count
+        self.count = count
+
+    @property
+    def slope(self):
+        """
+        Host ms per device ms (1.0 when the device time doesn't vary yet).
+        """
+        return self.co_moment / self.device_m2 if self.device_m2 > 0 else 1.0
+
+    @property
+    def intercept(self):
+        return self.host_origin + self.host_mean - self.slope * (self.device_origin + self.device_mean)
+
+    @property
+    def drift_ppm(self):
+        """
+        How much faster the host clock runs than the device clock (parts per million).
+        """
+        return (self.slope - 1.0) * 1e6
+
+    def device_to_host(self, device_times):
+        """
+        Maps device times (ms, unwrapped) onto the host clock (ms).
+        """
+        device_times = np.asarray(device_times, dtype=np.float64)
+        return self.host_origin + self.host_mean + self.slope * (device_times - self.device_origin - self.device_mean)
+
+
+def build_timeline(device_timestamps, host_timestamps, error_host_timestamps=None,
+                   modulus=DEVICE_TIMESTAMP_MODULUS):
+    """
+    Joins samples (device and host stamped) and errors (host stamped only) on one monotonic timeline.
+
+    The device counter is unwrapped and mapped onto the host clock with the fitted drift and offset, so
+    samples keep the device's precise spacing while errors fall in between them. The timeline is in int64
+    ms from the first sample.
+
+    :param device_timestamps: Raw device timestamps of the samples (ms, may wrap)
+    :param host_timestamps: Host timestamps of the same samples (ms)
+    :param error_host_timestamps: Host timestamps of the failed rangings (ms)
+    :return: (sample times, error times, ClockRegression), times as int64 ms
+    """
+    device_times = unwrap_device_timestamps(device_timestamps, modulus)
+    regression = ClockRegression()
+    regression.update_batch(device_times, host_timestamps)
+
+    if len(device_times) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), regression
+
+    host_times = regression.device_to_host(device_times)
+    origin = host_times[0]
+    sample_times = np.maximum.accumulate(np.rint(host_times - origin).astype(np.int64))
+
+    if error_host_timestamps is None:
+        error_times = np.empty(0, dtype=np.int64)
+    else:
+        error_times = np.sort(np.rint(np.asarray(error_host_timestamps, dtype=np.float64) - origin).astype(np.int64))
+    return sample_times, error_times, regression
+
+
+def merge_timeline(sample_times, error_times):
+    """
+    Merges sample and error times into one sorted timeline (samples first on ties).
+
+    :return: (times, boolean mask of the errors)
+    """
+    times = np.concatenate((sample_times, error_times))
+    is_error = np.concatenate((np.zeros(len(sample_times), dtype=bool), np.ones(len(error_times), dtype=bool)))
+    order = np.argsort(times, kind="stable")
+    return times[order], is_error[order]
+
+
+def _find_column(df, candidates):
+    for column in candidates:
+        if column in df.columns:
+            return column
+    return None
+
+
+def load_error_host_times(errorfile):
+    """
+    Loads the host timestamps (ms) and messages of an error .csv file.
+
+    PozyxClasses stores ms since its start (the same basis as its "Timestep (ms)" column), Pozyx1DCapture
+    stores local wall-clock times, returned as ms since the epoch (the basis of its "Host Timestamp (ms)" column).
+    """
+    df = read_error_file(errorfile)  # Error burst files are expanded to one row per failed ranging
+    stamps = df[df.columns[0]]
+    messages = df[df.columns[1]].astype(str).to_numpy()
+    if len(df) == 0 or pd.api.types.is_numeric_dtype(stamps):
+        return stamps.to_numpy(dtype=np.float64), messages
+    return wall_clock_to_epoch_ms(stamps), messages
+
+
+def rebuild_run_timeline(datafile, errorfile=None, output_dir=None, modulus=DEVICE_TIMESTAMP_MODULUS):
+    """
+    Rebuilds the timeline of a capture that recorded device and host timestamps, and writes it as
+    <run>_timeline.csv (and <error run>_timeline.csv) with one "Timestamp (ms)" column the viewers and
+    FFTs can use directly.
+
+    :param output_dir: Directory of the output files (defaults to the directory of each input file)
+    :return: (timeline data file, timeline error file or None, ClockRegression)
+    """
+    df = pd.read_csv(datafile)
+    device_column = _find_column(df, DEVICE_TIMESTAMP_COLUMNS)
+    host_column = _find_column(df, HOST_TIMESTAMP_COLUMNS)
+    if device_column is None or host_column is None or device_column == host_column:
+        raise ValueError(f"'{datafile}' doesn't have both device and host timestamp columns")
+
+    error_host_times, error_messages = (None, None) if errorfile is None else load_error_host_times(errorfile)
+    sample_times, error_times, regression = build_timeline(
+        df[device_column].to_numpy(), df[host_column].to_numpy(dtype=np.float64), error_host_times, modulus
+    )
+
+    def output_path(filepath):
+        directory = os.path.dirname(filepath) if output_dir is None else output_dir
+        return os.path.join(directory, run_name(filepath) + "_timeline.csv")
+
+    timeline_datafile = output_path(datafile)
+    pd.DataFrame({"Timestamp (ms)": sample_times, "Distance (mm)": df["Distance (mm)"].to_numpy()}).to_csv(
+        timeline_datafile, index=False
+    )
+
+    timeline_errorfile = None
+    if errorfile is not None:
+        # build_timeline() sorts the error times, keep their messages in the same order
+        order = np.argsort(error_host_times, kind="stable")
+        timeline_errorfile = output_path(errorfile)
+        pd.DataFrame({"Timestamp (ms)": error_times, "Error Message": error_messages[order]}).to_csv(
+            timeline_errorfile, index=False
+        )
+    return timeline_datafile, timeline_errorfile, regression
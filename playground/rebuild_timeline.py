@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+"""
+Rebuilds one monotonic timeline for the samples and errors of a capture that recorded device and host timestamps
+(PozyxClasses runs, or Pozyx1DCapture runs with a "Host Timestamp (ms)" column). The device counter is unwrapped
+and its drift and offset against the host clock are fitted, then <run>_timeline.csv (and <error run>_timeline.csv)
+are written next to the inputs.
+
+Example:
+    python rebuild_timeline.py pozyx_ranging_runs/data_2024-03-01_12-00-00_PRECISION.csv \
+        --errors pozyx_error_runs/error_2024-03-01_12-00-00_PRECISION.csv
+"""
+
+# Import Python-native modules
+import argparse
+
+# Import custom modules
+from pozyx_helpers.timeline import rebuild_run_timeline
+from pozyx_helpers.supplemental_functions import nice_print
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Device/host timeline reconstruction for Pozyx captures")
+    parser.add_argument("datafile", help="Run .csv file with device and host timestamps")
+    parser.add_argument("--errors", default=None, help="Matching error .csv file")
+    parser.add_argument("--output-dir", default=None, help="Directory for the timeline files (defaults to the inputs')")
+    args = parser.parse_args()
+
+    timeline_datafile, timeline_errorfile, regression = rebuild_run_timeline(
+        args.datafile, args.errors, args.output_dir
+    )
+
+    nice_print(f"Timeline of '{args.datafile}'")
+    print(f"Samples: {regression.count}")
+    print(f"Drift (host vs. device): {regression.drift_ppm:.1f} ppm")
+    print(f"Host clock at device time 0: {regression.intercept:.1f} ms")
+    print(f"---> Run timeline: {timeline_datafile}")
+    if timeline_errorfile is not None:
+        print(f"---> Error timeline: {timeline_errorfile}")
@@ -0,0 +1,34 @@
+#!/usr/bin/env python
+"""
+Renders .png report figures (raw data, mean/max deviation, FFT magnitude/phase and PSD) for a list of Pozyx runs
+without opening any windows.
+
+Example:
+    python render_reports.py pozyx_ranging_runs/ --output-dir reports/ --workers 8
+"""
+
+# Import Python-native modules
+import argparse
+
+# Import custom modules
+from pozyx_helpers.report_rendering import render_reports
+from pozyx_helpers.run_io import find_run_files
+from pozyx_helpers.supplemental_functions import nice_print
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless report rendering for Pozyx runs")
+    parser.add_argument("runs", nargs="+", help="Run files (.csv, .csv.gz, .csv.zst, .npy) or directories containing them")
+    parser.add_argument("--output-dir", default="reports/", help="Directory for the .png files")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--dpi", type=int, default=100, help="Resolution of the figures")
+    args = parser.parse_args()
+
+    # Expand directories into the run files they contain (derived timeline / expanded error files are skipped)
+    filepaths = find_run_files(args.runs)
+
+    written, figures_per_second = render_reports(
+        filepaths, args.output_dir, workers=args.workers, dpi=args.dpi
+    )
+
+    nice_print(f"Rendered {len(written)} figures for {len(filepaths)} runs into '{args.output_dir}'")
+    print(f"Figures per second: {figures_per_second:.2f}")
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+"""
+Replays a recorded capture (data_*.csv plus its error_*.csv) through the live capture pipeline, in place of a
+connected Pozyx. Runs in real time, N times faster or as fast as possible (to benchmark the downstream stages
+against real traffic patterns).
+
+Example:
+    python replay_run.py pozyx_ranging_runs/data_2024-03-01_12-00-00_PRECISION.csv \
+        --errors pozyx_error_runs/error_2024-03-01_12-00-00_PRECISION.csv --speed 10 --pipeline
+"""
+
+# Import Python-native modules
+import argparse
+import contextlib
+import os
+import time
+
+# Import Pozyx-specific modules
+from pypozyx import PozyxConstants
+
+# Import custom modules
+from pozyx_helpers.Pozyx1DCapture import Pozyx1DCapture, convertDataListsToCSV, convertErrorListsToCSV
+from pozyx_helpers.replay import ReplayPozyxSerial
+from pozyx_helpers.supplemental_functions import nice_print
+from pozyx_helpers.frequency_tracking import SlidingDftTracker
+from pozyx_helpers.kalman import KalmanFilter1D
+from pozyx_helpers.pipeline import FilterPipeline, HampelStage, IirStage, DecimateStage
+from pozyx_helpers.running_stats import save_run_stats
+from pozyx_helpers.metrics import serve_metrics, DEFAULT_METRICS_HOST
+from pozyx_helpers.error_bursts import ErrorBurstAggregator, convertErrorBurstsToCSV
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a recorded Pozyx capture through the capture pipeline")
+    parser.add_argument("datafile", help="Recorded data .csv (.csv.gz, .csv.zst or .npy) file")
+    parser.add_argument("--errors", default=None, help="Matching error .csv file")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Replay speed: 1 for real time, N for N times faster, 0 for as fast as possible")
+    parser.add_argument("--sample-rate", type=float, default=62, help="Nominal pulse rate of the capture (Hz)")
+    parser.add_argument("--track-frequency", action="store_true", help="Run the live dominant frequency tracker")
+    parser.add_argument("--kalman", action="store_true", help="Run the live Kalman filter")
+    parser.add_argument("--pipeline", action="store_true", help="Run the live filter pipeline")
+    parser.add_argument("--output-dir", default="pozyx_replay_runs/", help="Directory for the re-captured files")
+    parser.add_argument("--quiet", action="store_true", help="Don't print every pulse")
+    parser.add_argument("--aggregate-errors", action="store_true",
+                        help="Record runs of identical errors as bursts (backing off error code queries)")
+    parser.add_argument("--compression", choices=("gzip", "zstd"), default=None,
+                        help="Write the re-captured files compressed (.csv.gz / .csv.zst)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve the capture metrics on this port")
+    parser.add_argument("--metrics-host", default=DEFAULT_METRICS_HOST, help="Address the metrics are served on")
+    args = parser.parse_args()
+
+    filter_pipeline = None
+    if args.pipeline:
+        filter_pipeline = FilterPipeline(
+            [HampelStage(), IirStage("lowpass", 4, 5, args.sample_rate), DecimateStage(2)]
+        )
+
+    pozyx = ReplayPozyxSerial(args.datafile, args.errors, speed=args.speed)
+    pozyx1d = Pozyx1DCapture(
+        pozyx=pozyx,
+        destination_id=None,
+        protocol=PozyxConstants.RANGE_PROTOCOL_PRECISION,
+        data_dir=args.output_dir,
+        error_dir=args.output_dir,
+        frequency_tracker=SlidingDftTracker(fs=args.sample_rate) if args.track_frequency else None,
+        kalman_filter=KalmanFilter1D() if args.kalman else None,
+        filter_pipeline=filter_pipeline,
+        error_bursts=ErrorBurstAggregator() if args.aggregate_errors else None,
+        compression=args.compression,
+    )
+    if args.metrics_port is not None:
+        metrics_server = serve_metrics(pozyx1d, args.metrics_host, args.metrics_port)
+        print(f"Serving metrics on http://{metrics_server.address[0]}:{metrics_server.address[1]}/metrics")
+
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(open(os.devnull, "w")) if args.quiet else contextlib.nullcontext():
+        pozyx1d.setup()
+        while not pozyx.finished:
+            pozyx1d.loop()
+    elapsed = time.perf_counter() - start_time
+
+    num_pulses = pozyx.num_events
+    nice_print(f"Replayed {num_pulses} pulses in {elapsed:.2f} s ({num_pulses / elapsed:.0f} pulses/s)")
+    print(f"Data samples: {pozyx1d.num_data_samples} \t Error samples: {pozyx1d.num_err_samples}")
+
+    if pozyx1d.timestamp_list:
+        convertDataListsToCSV(
+            pozyx1d.timestamp_list, pozyx1d.data_list, pozyx1d.datafile, pozyx1d.host_timestamp_list,
+            filtered_data_list=pozyx1d.filtered_data_list if pozyx1d.kalman_filter is not None else None,
+        )
+        save_run_stats(pozyx1d.datafile, pozyx1d.stats, distributions=pozyx1d.distributions)
+    if filter_pipeline is not None:
+        pozyx1d.flush_filter_pipeline()
+        if pozyx1d.pipeline_timestamp_list:
+            convertDataListsToCSV(pozyx1d.pipeline_timestamp_list, pozyx1d.pipeline_data_list, pozyx1d.pipelinefile)
+            print(f"---> Pipeline file: {pozyx1d.pipelinefile}")
+    if pozyx1d.error_bursts is not None:
+        pozyx1d.error_bursts.close()
+        convertErrorBurstsToCSV(pozyx1d.error_bursts.bursts, pozyx1d.errorfile)
+        print(f"Error bursts: {len(pozyx1d.error_bursts.bursts)}")
+    else:
+        convertErrorListsToCSV(pozyx1d.error_timestamp_list, pozyx1d.error_list, pozyx1d.errorfile)
+    print(f"---> Run file: {pozyx1d.datafile}")
+    print(f"---> Error file: {pozyx1d.errorfile}")
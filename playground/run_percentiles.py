@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+"""
+Prints distance and sample interval percentiles of Pozyx runs from mergeable quantile sketches.
+
+Each .csv run (plain or compressed) is sketched once into its <run>.stats.json sidecar (later calls only read rows appended since),
+so percentiles across many long runs never need their raw data in memory.
+
+Example:
+    python run_percentiles.py pozyx_ranging_runs/ --per-run --percentiles 50 95 99
+"""
+
+# Import Python-native modules
+import argparse
+
+# Import custom modules
+from pozyx_helpers.quantile_sketch import DEFAULT_PERCENTILES
+from pozyx_helpers.running_stats import merge_run_distributions
+from pozyx_helpers.run_io import find_run_files
+from pozyx_helpers.supplemental_functions import nice_print
+
+
+def print_percentiles(title, distributions, percentiles):
+    nice_print(title)
+    print(f"Samples: {distributions.distances.count}")
+    print(f"{'Percentile':>10} {'Distance (mm)':>15} {'Interval (ms)':>15}")
+    distance_percentiles = distributions.distances.percentiles(percentiles)
+    interval_percentiles = distributions.intervals.percentiles(percentiles)
+    for percentile in percentiles:
+        print(f"{percentile:>10g} {distance_percentiles[percentile]:>15.2f} {interval_percentiles[percentile]:>15.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distance and sample interval percentiles of Pozyx runs")
+    parser.add_argument("runs", nargs="+", help="Run files (.csv, .csv.gz, .csv.zst, .npy) or directories containing them")
+    parser.add_argument("--percentiles", type=float, nargs="+", default=list(DEFAULT_PERCENTILES),
+                        help="Percentiles to print")
+    parser.add_argument("--per-run", action="store_true", help="Also print the percentiles of every run")
+    args = parser.parse_args()
+
+    # Expand directories into the run files they contain (derived timeline / expanded error files are skipped)
+    filepaths = find_run_files(args.runs)
+
+    if args.per_run:
+        for filepath in filepaths:
+            print_percentiles(f"Run '{filepath}'", merge_run_distributions([filepath]), args.percentiles)
+
+    print_percentiles(f"All {len(filepaths)} runs", merge_run_distributions(filepaths), args.percentiles)
@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Sweeps a grid of filter configurations (IIR order/cutoff, Kalman noise, median window, FFT threshold) over a Pozyx run
+and ranks them against a ground truth file by RMSE, max error or lag.
+
+Scored configurations are cached in a JSON lines file, so an interrupted sweep resumes where it stopped (failed
+configurations are tried again).
+
+Example:
+    python sweep_filters.py pozyx_ranging_runs/data.csv ground_truth.csv --workers 8 --rank-by rmse
+"""
+
+# Import Python-native modules
+import argparse
+
+# Import custom modules
+from pozyx_helpers.filter_sweep import sweep_filters, RANK_METRICS
+from pozyx_helpers.supplemental_functions import nice_print
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Filter parameter sweep against ground truth")
+    parser.add_argument("run", help="Run .csv file")
+    parser.add_argument("ground_truth", help="Ground truth .csv file")
+    parser.add_argument("--cache", default=None, help="JSON lines cache (defaults to <run>_sweep.jsonl)")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--rank-by", choices=RANK_METRICS, default="rmse", help="Metric to rank by")
+    parser.add_argument("--top", type=int, default=10, help="Number of configurations to print")
+    args = parser.parse_args()
+
+    results = sweep_filters(
+        args.run, args.ground_truth, cache_path=args.cache, workers=args.workers, rank_by=args.rank_by
+    )
+
+    nice_print(f"Top {min(args.top, len(results))} of {len(results)} configurations by {args.rank_by}")
+    for rank, result in enumerate(results[: args.top], start=1):
+        if "error" in result:
+            print(f"{rank:3d}. {result['config']} -> failed: {result['error']}")
+            continue
+        lag = "n/a" if result["lag_ms"] is None else f"{result['lag_ms']:.1f} ms"
+        print(
+            f"{rank:3d}. RMSE: {result['rmse']:.2f} mm \t Max Error: {result['max_error']:.2f} mm \t "
+            + f"Lag: {lag} \t {result['config']}"
+        )
@@ -0,0 +1,63 @@
+# Import Python-native modules
+import numpy as np
+import pytest
+
+# Import custom modules
+from pozyx_helpers.pipeline import (
+    FilterPipeline,
+    HampelStage,
+    IirStage,
+    KalmanStage,
+    DecimateStage,
+    compare_batch_and_streaming,
+)
+
+# Pulse rate of the synthetic run (Hz)
+SAMPLE_RATE = 62
+
+
+def synthetic_run(num_samples=2000, seed=0):
+    """
+    Returns (timesteps (ms), distances (mm)) of a swaying tag with noise and a few multipath spikes.
+    """
+    rng = np.random.default_rng(seed)
+    timesteps = np.arange(num_samples) * 1000.0 / SAMPLE_RATE
+    distances = 1800.0 + 150.0 * np.sin(2 * np.pi * 0.2 * timesteps / 1000.0) + rng.normal(0.0, 5.0, num_samples)
+    spikes = rng.choice(num_samples, size=num_samples // 100, replace=False)
+    distances[spikes] += 300.0
+    return timesteps, distances
+
+
+def stream(pipeline, timesteps, values):
+    samples = []
+    for timestamp, value in zip(timesteps, values):
+        samples.extend(pipeline.update(timestamp, value))
+    samples.extend(pipeline.flush())
+    return np.array(samples).reshape(-1, 2).T
+
+
+@pytest.mark.parametrize("stages", [
+    lambda: [HampelStage()],
+    lambda: [IirStage("lowpass", 4, 5, SAMPLE_RATE)],
+    lambda: [KalmanStage()],
+    lambda: [DecimateStage(3)],
+    lambda: [HampelStage(), IirStage("lowpass", 4, 5, SAMPLE_RATE), KalmanStage(), DecimateStage(2)],
+])
+def test_batch_and_streaming_match(stages):
+    timesteps, distances = synthetic_run()
+
+    batch_timesteps, batch_values = FilterPipeline(stages()).process(timesteps, distances)
+    streamed_timesteps, streamed_values = stream(FilterPipeline(stages()), timesteps, distances)
+
+    assert len(batch_values) > 0
+    np.testing.assert_allclose(streamed_timesteps, batch_timesteps, rtol=0, atol=1e-9)
+    np.testing.assert_allclose(streamed_values, batch_values, rtol=0, atol=1e-9)
+
+
+def test_compare_batch_and_streaming_resets_the_pipeline():
+    timesteps, distances = synthetic_run()
+    pipeline = FilterPipeline([HampelStage(), IirStage("lowpass", 4, 5, SAMPLE_RATE), DecimateStage(2)])
+
+    assert compare_batch_and_streaming(pipeline, timesteps, distances) == pytest.approx((0.0, 0.0), abs=1e-9)
+    # A second comparison starts from a clean state too
+    assert compare_batch_and_streaming(pipeline, timesteps, distances) == pytest.approx((0.0, 0.0), abs=1e-9)